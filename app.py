@@ -1,23 +1,26 @@
 import streamlit as st
-from PIL import Image
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
-from supabase import create_client
-from datetime import datetime
-import numpy as np
-import hashlib
-
-# ✅ Load environment variables
-load_dotenv()  # Changed from .env.local to work with Railway
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-STREAMLIT_PASSWORD = os.getenv("STREAMLIT_PASSWORD", "")
+from memory_core import config, get_memory, namespace_scope, session_scope
+from memory_core.history import ChatHistory, session_id
+from memory_core.namespaces import for_password
+from memory_core.profiling import maybe_profile
+
+# ✅ Page Config
+st.set_page_config(
+    page_title="Corval.ai Memory Assistant", 
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+# ✅ Load environment variables (memory_core.config reads .env, works with Railway)
+STREAMLIT_PASSWORD = config.STREAMLIT_PASSWORD
 
 # ✅ Simple password protection (optional)
 def check_password():
-    if not STREAMLIT_PASSWORD:
+    if "namespace" not in st.session_state:
+        st.session_state.namespace = None  # MEMORY_DEFAULT_NAMESPACE
+
+    if not STREAMLIT_PASSWORD and not config.NAMESPACE_PASSWORDS:
         return True  # No password required
     
     if "authenticated" not in st.session_state:
@@ -27,38 +30,17 @@ def check_password():
         st.title("🔐 Access Required")
         password = st.text_input("Enter password:", type="password")
         if st.button("Login"):
-            if password == STREAMLIT_PASSWORD:
+            namespace = for_password(password)
+            if namespace:
+                # Each password opens its own namespace of memories
                 st.session_state.authenticated = True
+                st.session_state.namespace = namespace
                 st.rerun()
             else:
                 st.error("Incorrect password")
         return False
     return True
 
-# ✅ Validate environment variables
-if not OPENAI_API_KEY or not SUPABASE_URL or not SUPABASE_KEY:
-    st.error("❌ Missing API keys. Check environment variables.")
-    st.stop()
-
-# ✅ Check authentication
-if not check_password():
-    st.stop()
-
-# ✅ Initialize clients
-try:
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-except Exception as e:
-    st.error(f"❌ Failed to initialize clients: {e}")
-    st.stop()
-
-# ✅ Page Config
-st.set_page_config(
-    page_title="Corval.ai Memory Assistant", 
-    layout="wide",
-    initial_sidebar_state="collapsed"
-)
-
 # ✅ Enhanced UI Styling (same as before but optimized)
 st.markdown("""
     <style>
@@ -284,39 +266,71 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# ✅ Helper function for similarity search fallback
-def cosine_similarity(a, b):
-    """Calculate cosine similarity between two vectors"""
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+# ✅ Validate environment variables
+if config.missing_settings():
+    st.error("❌ Missing API keys. Check environment variables.")
+    st.stop()
 
-def fallback_search(query_embedding, threshold=0.2, limit=5):
-    """Fallback search when RPC function doesn't work"""
-    try:
-        result = supabase.table("project_memory").select("id, content, embedding").execute()
-        
-        if not result.data:
-            return []
-        
-        matches = []
-        for item in result.data:
-            if item['embedding']:
-                similarity = cosine_similarity(query_embedding, item['embedding'])
-                if similarity > threshold:
-                    matches.append({
-                        'id': item['id'],
-                        'content': item['content'],
-                        'similarity': similarity
-                    })
-        
-        matches.sort(key=lambda x: x['similarity'], reverse=True)
-        return matches[:limit]
-    
-    except Exception as e:
-        return []
+# ✅ Check authentication
+if not check_password():
+    st.stop()
+
+# ✅ Warm-up - build the index and prime caches in the background, once per process
+@st.cache_resource(show_spinner=False)
+def start_warmup():
+    get_memory().warm_up()
+    return True
+
+start_warmup()
+
+# ✅ Startup check - the warm-up thread probes the backend, so the first paint
+# never waits on the network; warn loudly once it reports a problem instead
+# of silently degrading to a full-table scan
+def warmup_banner(status):
+    if status.get("degraded"):
+        st.warning(f"⚠️ Warm-up failed ({', '.join(status['errors'])}); answers may be slow or fail.")
+    elif not status["ready"]:
+        st.info("⏳ Warming up the memory index. Your first answer may take a few extra seconds.")
+    if (status.get("check") or {}).get("rpc") is False:
+        st.warning("⚠️ Vector search function `match_project_memory` is unavailable, so every question scans the whole table. Apply `supabase/migrations` to fix this.")
+
+@st.fragment(run_every="2s")
+def poll_warmup():
+    status = get_memory().ready()
+    if status["ready"] or status.get("degraded"):
+        st.session_state.warmup_status = status
+        st.rerun()
+    warmup_banner(status)
+
+if "warmup_status" in st.session_state:
+    warmup_banner(st.session_state.warmup_status)
+else:
+    poll_warmup()
 
 # ✅ Initialize Session State
+if "session_id" not in st.session_state:
+    # Kept in the URL so a reload resumes the conversation; upstream OpenAI
+    # calls are also fair-queued per session. A sid from another namespace
+    # starts a fresh session.
+    st.session_state.session_id = session_id(st.query_params.get("sid"), st.session_state.namespace)
+    st.query_params["sid"] = st.session_state.session_id
 if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = ChatHistory(st.session_state.session_id, st.session_state.namespace)
+if "history_window" not in st.session_state:
+    st.session_state.history_window = 10
+
+
+def render_message(msg):
+    if msg.role == "user":
+        return f'<div class="chat-message-wrapper"><div class="user-message"><strong>You:</strong> {msg.text}</div></div>'
+    if msg.role == "assistant":
+        if msg.memory_ids:
+            found_memories_text = f" (Found {len(msg.memory_ids)} relevant memories)"
+        else:
+            found_memories_text = f" (No relevant memories found)"
+        return f'<div class="chat-message-wrapper"><div class="ai-message"><strong>🤖 AI:</strong> {msg.text}\n\n💡 *{found_memories_text}*</div></div>'
+    return f'<div class="chat-message-wrapper"><div class="system-message">{msg.text}</div></div>'
+
 
 # ✅ Logo - Multiple path attempts for deployment
 logo_paths = [
@@ -326,14 +340,20 @@ logo_paths = [
     "assets/corval_logo.png"  # Assets folder
 ]
 
-logo_found = False
+@st.cache_resource(show_spinner=False)
+def get_logo_path():
+    """Resolve the logo location once per process"""
+    for logo_path in logo_paths:
+        if os.path.exists(logo_path):
+            return logo_path
+    return None
+
+logo_path = get_logo_path()
+logo_found = logo_path is not None
 st.markdown('<div class="logo-container">', unsafe_allow_html=True)
 
-for logo_path in logo_paths:
-    if os.path.exists(logo_path):
-        st.image(logo_path, width=250)  # Made bigger
-        logo_found = True
-        break
+if logo_found:
+    st.image(logo_path, width=250)  # Made bigger
 
 if not logo_found:
     # Enhanced fallback with brand colors
@@ -356,8 +376,8 @@ st.markdown("""
 
 # ✅ Stats with error handling
 try:
-    count_result = supabase.table("project_memory").select("id", count="exact").execute()
-    memory_count = count_result.count if count_result.count else 0
+    with namespace_scope(st.session_state.namespace):
+        memory_count = get_memory().count()
     
     st.markdown(f"""
     <div class="stats-container">
@@ -377,8 +397,26 @@ except Exception:
 # ✅ Chat Display
 st.markdown('<div class="chat-container">', unsafe_allow_html=True)
 if st.session_state.chat_history:
-    for msg in st.session_state.chat_history[-10:]:
-        st.markdown(msg, unsafe_allow_html=True)
+    history = st.session_state.chat_history
+    if len(history) > st.session_state.history_window:
+        if st.button(f"⬆️ Show earlier messages ({len(history) - st.session_state.history_window} more)", key="show_earlier"):
+            st.session_state.history_window += 10
+            st.rerun()
+    for msg in history.window(st.session_state.history_window):
+        st.markdown(render_message(msg), unsafe_allow_html=True)
+    # Direct lookups are answered with the matching memory; offer the full answer
+    if st.session_state.get("expand_question"):
+        if st.button("✨ Expand with AI", key="expand_ai"):
+            with st.spinner('🤔 Thinking...'), namespace_scope(st.session_state.namespace), session_scope(st.session_state.session_id):
+                try:
+                    result = get_memory().answer(st.session_state.expand_question, mode="generate")
+                    st.session_state.chat_history.append(
+                        "assistant", result["answer"], [m["id"] for m in result["memories"]]
+                    )
+                except Exception:
+                    st.session_state.chat_history.append("system", "❌ Unable to process query")
+            st.session_state.expand_question = None
+            st.rerun()
 else:
     st.markdown("""
     <div class="empty-state">
@@ -410,116 +448,52 @@ st.markdown('</div>', unsafe_allow_html=True)
 
 # ✅ Process Input with production error handling
 if submit_btn and user_input.strip():
-    st.session_state.chat_history.append(
-        f'<div class="chat-message-wrapper"><div class="user-message"><strong>You:</strong> {user_input}</div></div>'
-    )
+    st.session_state.chat_history.append("user", user_input)
     
-    with st.spinner('🤔 Thinking...'):
+    profiling = maybe_profile(
+        st.session_state.get("profile_next"), "add" if user_input.lower().startswith("add:") else "answer",
+        st.session_state.session_id,
+    )
+    with st.spinner('🤔 Thinking...'), namespace_scope(st.session_state.namespace), session_scope(st.session_state.session_id), profiling as profile:
         try:
             if user_input.lower().startswith("add:"):
                 content = user_input[4:].strip()
                 
                 if content:
                     try:
-                        embedding_response = openai_client.embeddings.create(
-                            model="text-embedding-3-small",
-                            input=content
-                        )
-                        embedding = embedding_response.data[0].embedding
-                        
-                        result = supabase.table("project_memory").insert({
-                            "content": content,
-                            "embedding": embedding,
-                            "created_at": datetime.utcnow().isoformat()
-                        }).execute()
-                        
-                        if result.data:
-                            response_text = f"✅ Memory added successfully!"
-                            st.session_state.chat_history.append(
-                                f'<div class="chat-message-wrapper"><div class="system-message">{response_text}</div></div>'
-                            )
-                        else:
-                            st.session_state.chat_history.append(
-                                f'<div class="chat-message-wrapper"><div class="system-message">❌ Failed to store memory</div></div>'
-                            )
+                        get_memory().add(content)
+                        st.session_state.chat_history.append("system", "✅ Memory added successfully!")
                     except Exception:
-                        st.session_state.chat_history.append(
-                            f'<div class="chat-message-wrapper"><div class="system-message">❌ Error creating embedding</div></div>'
-                        )
+                        st.session_state.chat_history.append("system", "❌ Failed to store memory")
                 else:
-                    st.session_state.chat_history.append(
-                        f'<div class="chat-message-wrapper"><div class="system-message">❌ Please provide content after "add:"</div></div>'
-                    )
-            else:
+                    st.session_state.chat_history.append("system", '❌ Please provide content after "add:"')
+            elif user_input.lower().startswith("forget:"):
+                target = user_input[7:].strip()
                 try:
-                    query_embedding_response = openai_client.embeddings.create(
-                        model="text-embedding-3-small",
-                        input=user_input
-                    )
-                    query_embedding = query_embedding_response.data[0].embedding
-                    
-                    context_items = []
-                    
-                    # Try RPC function first, fallback silently
-                    try:
-                        context_result = supabase.rpc("match_project_memory", {
-                            "query_embedding": query_embedding,
-                            "match_threshold": 0.2,
-                            "match_count": 5
-                        }).execute()
-                        
-                        context_items = context_result.data if context_result.data else []
-                        
-                    except:
-                        context_items = fallback_search(query_embedding)
-                    
-                    context = "\n".join([item['content'] for item in context_items])
-                    
-                    if context:
-                        prompt = f"""You are a helpful AI assistant with access to the user's stored memories.
-
-User Question: {user_input}
-
-Relevant Memories:
-{context}
-
-Please provide a helpful answer based on the user's question and the relevant memories above."""
-                        
-                        found_memories_text = f" (Found {len(context_items)} relevant memories)"
+                    forgotten = get_memory().forget(target) if target else []
+                    if forgotten:
+                        st.session_state.chat_history.append("system", f'🗑️ Forgot: "{forgotten[0]["content"][:50]}"')
                     else:
-                        prompt = f"""You are a helpful AI assistant. The user asked: {user_input}
-
-No relevant memories were found in the database. Please provide a helpful general response and suggest they might want to add relevant information to their memory first."""
-                        
-                        found_memories_text = f" (No relevant memories found)"
-                    
-                    chat_response = openai_client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=[
-                            {"role": "system", "content": "You are a helpful AI assistant that helps users with their questions and manages their stored memories."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        max_tokens=500,
-                        temperature=0.7
-                    )
-                    
-                    response_text = chat_response.choices[0].message.content
-                    response_text += f"\n\n💡 *{found_memories_text}*"
-                    
+                        st.session_state.chat_history.append("system", "❌ No matching memory to forget")
+                except Exception:
+                    st.session_state.chat_history.append("system", "❌ Failed to forget memory")
+            else:
+                try:
+                    result = get_memory().answer(user_input)
                     st.session_state.chat_history.append(
-                        f'<div class="chat-message-wrapper"><div class="ai-message"><strong>🤖 AI:</strong> {response_text}</div></div>'
+                        "assistant", result["answer"], [m["id"] for m in result["memories"]]
                     )
+                    st.session_state.expand_question = user_input if result.get("mode") == "extractive" else None
                     
                 except Exception:
-                    st.session_state.chat_history.append(
-                        f'<div class="chat-message-wrapper"><div class="system-message">❌ Unable to process query</div></div>'
-                    )
+                    st.session_state.chat_history.append("system", "❌ Unable to process query")
         
         except Exception:
-            st.session_state.chat_history.append(
-                f'<div class="chat-message-wrapper"><div class="system-message">❌ Something went wrong</div></div>'
-            )
+            st.session_state.chat_history.append("system", "❌ Something went wrong")
     
+    if profile is not None:
+        st.session_state.last_profile = profile
+        st.session_state.profile_next = False
     st.rerun()
 
 # ✅ Compact sections at bottom
@@ -529,29 +503,36 @@ with col1:
     with st.expander("🔧 Debug"):
         if st.button("Test DB", key="test_db"):
             try:
-                result = supabase.table("project_memory").select("id").limit(1).execute()
-                st.success(f"✅ Connected ({len(result.data)} records)")
-                try:
-                    test_embedding = [0.1] * 1536
-                    rpc_result = supabase.rpc("match_project_memory", {
-                        "query_embedding": test_embedding,
-                        "match_threshold": 0.1,
-                        "match_count": 1
-                    }).execute()
+                report = get_memory().check()
+                st.success(f"✅ Connected ({report['records']} records)")
+                if report["rpc"]:
                     st.success("✅ RPC works!")
-                except:
-                    st.info("💡 Using fallback (works fine)")
+                else:
+                    st.warning(f"⚠️ RPC missing, using slow fallback: {report.get('rpc_error')}")
             except Exception:
                 st.error("❌ DB Error")
 
+        st.checkbox("🔬 Profile next request", key="profile_next")
+        profile = st.session_state.get("last_profile")
+        if profile is not None:
+            st.caption(
+                f"Last profile: {profile.label} in {profile.seconds:.2f}s, {profile.samples} stack samples\n\n"
+                f"`{profile.stats_path}` • `{profile.collapsed_path}`"
+            )
+            st.table(profile.top[:15])
+
 with col2:
     with st.expander("💡 Help"):
-        st.markdown("**Add:** `add: note` • **Ask:** natural questions • **Tip:** Press Enter to send")
+        st.markdown("**Add:** `add: note` • **Forget:** `forget: note` • **Ask:** natural questions • **Tip:** Press Enter to send")
 
 # ✅ Clear Chat Button
 if st.session_state.chat_history:
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
         if st.button("🗑️ Clear Chat", use_container_width=True):
-            st.session_state.chat_history = []
+            st.session_state.chat_history.clear()
+            with namespace_scope(st.session_state.namespace), session_scope(st.session_state.session_id):
+                get_memory().end_conversation()
+            st.session_state.expand_question = None
+            st.session_state.history_window = 10
             st.rerun()
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""Payload size and decode time per embedding for each wire format.
+
+Usage:
+    python benchmarks/codec.py --dim 1536 --iterations 2000
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_core.codec import decode_embedding, parse_vector, to_pgvector  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    vector = rng.standard_normal(args.dim).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+
+    # What each hop carries today vs with the codec
+    openai_json = json.dumps(vector.tolist())
+    openai_b64 = json.dumps(base64.b64encode(vector.tobytes()).decode())
+    pg_json = json.dumps(vector.tolist())
+    pg_text = json.dumps(to_pgvector(vector))
+
+    cases = [
+        ("openai float list", openai_json, lambda: np.asarray(json.loads(openai_json), dtype=np.float32)),
+        ("openai base64", openai_b64, lambda: decode_embedding(json.loads(openai_b64))),
+        ("pgvector json list", pg_json, lambda: np.asarray(json.loads(pg_json), dtype=np.float32)),
+        ("pgvector text (json.loads)", pg_text, lambda: np.asarray(json.loads(json.loads(pg_text)), dtype=np.float32)),
+        ("pgvector text (codec)", pg_text, lambda: parse_vector(json.loads(pg_text))),
+    ]
+    print(f"{'format':<28} {'bytes':>8} {'decode us':>10} {'max err':>10}")
+    for name, payload, decode in cases:
+        seconds = timeit.timeit(decode, number=args.iterations) / args.iterations
+        error = float(np.abs(decode() - vector).max())
+        print(f"{name:<28} {len(payload):>8} {seconds * 1e6:>10.1f} {error:>10.2e}")
+
+    seconds = timeit.timeit(lambda: to_pgvector(vector), number=args.iterations) / args.iterations
+    print(f"\nencode to_pgvector: {seconds * 1e6:.1f} us/vector")
+
+
+if __name__ == "__main__":
+    main()
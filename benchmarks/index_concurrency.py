@@ -0,0 +1,162 @@
+"""Concurrency stress test for LocalIndex: snapshot reads during appends, merges and compactions.
+
+Usage:
+    python benchmarks/index_concurrency.py --rows 50000 --readers 8 --writers 2 --seconds 10
+
+Starts from --rows synthetic unit vectors, then runs for --seconds:
+    writers    append batches of new rows (landing in the delta buffer)
+    deleter    tombstones random rows and compacts every so often
+    readers    search for the vector of a random row known to be indexed
+
+Each row's vector is unique, so a consistent read of a live row finds that
+row first with similarity ~1. A torn read (ids out of step with the matrix),
+a hit for an id that was deleted before the search started, or a missing live
+row is counted as an error. Reader latency is reported separately for
+searches that overlapped a merge or compaction and for the rest; without
+reader stalls the two distributions look alike. Exits 1 on any error.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_core.index import LocalIndex, normalize  # noqa: E402
+
+
+def percentiles(samples):
+    if not samples:
+        return "-"
+    samples = np.sort(np.asarray(samples)) * 1000
+    return "p50 {:.2f}ms  p99 {:.2f}ms  max {:.2f}ms  (n={})".format(
+        samples[len(samples) // 2], samples[int(len(samples) * 0.99)], samples[-1], len(samples)
+    )
+
+
+class Stress:
+    def __init__(self, args):
+        self.args = args
+        self.rng = np.random.default_rng(0)
+        capacity = args.rows + args.writers * int(args.seconds * 1000 / args.write_ms + 2) * args.batch
+        # Vector of row id i; written before the id is published to readers
+        self.vectors = np.empty((capacity, args.dim), dtype=np.float32)
+        self.vectors[:args.rows] = normalize(self.rng.standard_normal((args.rows, args.dim), dtype=np.float32))
+        self.index = LocalIndex(args.dim, delta_rows=args.delta_rows)
+        self.index.load_arrays(list(range(args.rows)), self.vectors[:args.rows])
+        self.next_id = args.rows
+        self.live = list(range(args.rows))
+        self.deleted = []  # in deletion order
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.errors = []
+        self.calm, self.busy = [], []
+        self.compactions = 0
+
+    def maintaining(self):
+        """A merge or compaction is copying the matrix right now"""
+        return self.index._maintenance.locked()
+
+    def writer(self):
+        rng = np.random.default_rng(threading.get_ident() % 2**32)
+        while not self.stop.is_set():
+            with self.lock:
+                start = self.next_id
+                self.next_id += self.args.batch
+            ids = list(range(start, start + self.args.batch))
+            self.vectors[start:start + len(ids)] = normalize(
+                rng.standard_normal((len(ids), self.args.dim), dtype=np.float32)
+            )
+            # A full delta buffer starts the index's own background merge
+            self.index.add(ids, self.vectors[start:start + len(ids)])
+            with self.lock:
+                self.live.extend(ids)
+            time.sleep(self.args.write_ms / 1000)
+
+    def deleter(self):
+        rng = random.Random(1)
+        while not self.stop.is_set():
+            with self.lock:
+                victims = rng.sample(self.live, min(self.args.batch, len(self.live)))
+            self.index.delete(victims)
+            with self.lock:
+                self.deleted.extend(victims)
+                gone = set(victims)
+                self.live = [id_ for id_ in self.live if id_ not in gone]
+            if len(self.index.tombstones) >= self.args.compact_every:
+                self.index.compact()
+                self.compactions += 1
+            time.sleep(self.args.write_ms / 1000)
+
+    def reader(self, seed):
+        rng = random.Random(seed)
+        while not self.stop.is_set():
+            with self.lock:
+                target = self.live[rng.randrange(len(self.live))]
+                deleted = len(self.deleted)
+            busy = self.maintaining()
+            started = time.perf_counter()
+            hits = self.index.search(self.vectors[target], 0.0, 5)
+            seconds = time.perf_counter() - started
+            busy = busy or self.maintaining()
+            with self.lock:
+                deleted_before = set(self.deleted[:deleted]) if self.args.check_deletes else set()
+                still_live = target not in self.deleted[deleted:]
+            (self.busy if busy else self.calm).append(seconds)
+            if not hits:
+                if still_live:
+                    self.errors.append(f"no hits for live row {target}")
+                continue
+            top = hits[0]
+            if still_live and (top["id"] != target or top["similarity"] < 0.999):
+                self.errors.append(f"row {target}: top hit {top}")
+            leaked = [hit["id"] for hit in hits if hit["id"] in deleted_before]
+            if leaked:
+                self.errors.append(f"deleted rows returned: {leaked}")
+
+    def run(self):
+        threads = [threading.Thread(target=self.writer) for _ in range(self.args.writers)]
+        threads.append(threading.Thread(target=self.deleter))
+        threads += [threading.Thread(target=self.reader, args=(i,)) for i in range(self.args.readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(self.args.seconds)
+        self.stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--batch", type=int, default=8, help="rows per append and per delete")
+    parser.add_argument("--write-ms", type=float, default=2, help="pause between writes")
+    parser.add_argument("--delta-rows", type=int, default=2048, help="merge the delta buffer at this size")
+    parser.add_argument("--compact-every", type=int, default=1000, help="compact at this many tombstones")
+    parser.add_argument("--check-deletes", action="store_true",
+                        help="also fail on hits deleted before the search started (slower readers)")
+    args = parser.parse_args()
+
+    stress = Stress(args)
+    stress.run()
+    stats = stress.index.stats()
+    print(f"rows {stats['rows']}  delta {stats['delta_rows']}  merges {stats['merges']}  "
+          f"compactions {stress.compactions}  generation {stats['generation']}")
+    print(f"searches outside merges/compactions: {percentiles(stress.calm)}")
+    print(f"searches during merges/compactions:  {percentiles(stress.busy)}")
+    print(f"errors: {len(stress.errors)}")
+    for error in stress.errors[:10]:
+        print("  " + error)
+    sys.exit(1 if stress.errors else 0)
+
+
+if __name__ == "__main__":
+    main()
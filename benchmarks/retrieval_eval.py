@@ -0,0 +1,234 @@
+"""Retrieval quality vs latency over a labeled question set.
+
+Usage:
+    python benchmarks/retrieval_eval.py labels.jsonl --snapshot memory.parquet \\
+        --indexes exact,int8,ivf --dims 1536,512,256 --ks 3,5,8 \\
+        --thresholds 0.05,0.1,0.2,0.3 --nprobes 4,16 [--rpc] [--out results.jsonl]
+
+labels.jsonl holds one {"question": ..., "relevant_ids": [...]} per line.
+Memories are the live rows of --namespace (default MEMORY_DEFAULT_NAMESPACE),
+read from a Parquet snapshot of that namespace (memory_core.snapshot) or,
+without --snapshot, from the table; questions are embedded once with the
+active model.
+
+Index variants, all exact-cosine top-k over the same rows unless noted:
+    exact   float32 matrix product (what LocalIndex does)
+    int8    rows and query scalar-quantized to int8 with a per-row scale,
+            scored with an int32-accumulated integer product
+    ivf     approximate: spherical mini-batch k-means (memory_core.clusters)
+            into --nlist lists, --nprobes probed
+    rpc     match_project_memory (pgvector HNSW) over the network, with --rpc
+`--dims` truncates vectors to their first d dimensions and renormalizes
+(text-embedding-3 vectors are trained to allow this).
+
+Each index x dims x k x threshold combination reports recall@k, MRR, the
+estimated prompt tokens of the answer prompt and p95 search latency
+(embedding excluded). Rows on the Pareto front over (recall, MRR, tokens,
+latency) are starred.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_core.admission import estimate_tokens  # noqa: E402
+from memory_core.clusters import assign, minibatch_kmeans  # noqa: E402
+from memory_core.index import normalize, top_k  # noqa: E402
+from memory_core.prompts import build_messages  # noqa: E402
+
+
+def floats(text):
+    return [float(v) for v in text.split(",")]
+
+
+def ints(text):
+    return [int(v) for v in text.split(",")]
+
+
+def load_labels(path):
+    with open(path) as f:
+        labels = [json.loads(line) for line in f if line.strip()]
+    return [(item["question"], set(item["relevant_ids"])) for item in labels]
+
+
+def load_memories(store, snapshot_path, column, namespace):
+    """(ids, contents, normalized matrix) of a namespace's live rows"""
+    if snapshot_path:
+        from memory_core import config
+        from memory_core.snapshot import read_snapshot, snapshot_namespace
+        # Snapshots hold one namespace's live rows; archives hold tombstoned rows of any
+        found = snapshot_namespace(snapshot_path)
+        if (found or config.DEFAULT_NAMESPACE) != namespace:
+            raise SystemExit(f"{snapshot_path} holds namespace {found or '(mixed)'}, not {namespace}")
+        ids, contents, matrix = read_snapshot(snapshot_path)
+        return np.asarray(ids), contents, normalize(matrix)
+    from memory_core.codec import parse_vector
+    from memory_core.namespaces import scoped
+    from memory_core.snapshot import iter_pages, live
+    ids, contents, vectors = [], [], []
+    pages = iter_pages(store.supabase, columns=f"id, content, {column}", where=lambda q: scoped(live(q), namespace))
+    for page in pages:
+        for row in page:
+            if row.get(column):
+                ids.append(row["id"])
+                contents.append(row["content"])
+                vectors.append(parse_vector(row[column]))
+    return np.asarray(ids), contents, normalize(np.vstack(vectors))
+
+
+def build_exact(matrix, args):
+    def search(query, threshold, k):
+        return top_k(matrix @ query, k, threshold)
+    return [("exact", search)]
+
+
+def quantize(vectors):
+    """int8 codes and the per-row scale that decodes them; all-zero rows get scale 1 (codes 0)"""
+    vectors = np.atleast_2d(vectors)
+    scale = np.abs(vectors).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    return np.round(vectors / scale[:, None]).astype(np.int8), scale.astype(np.float32)
+
+
+def build_int8(matrix, args):
+    codes, scale = quantize(matrix)
+
+    def search(query, threshold, k):
+        # Quantize the query too and accumulate the int8 products in int32
+        # (127 * 127 * dims fits), so the codes are never promoted to float
+        query_codes, query_scale = quantize(query)
+        dots = np.einsum("ij,j->i", codes, query_codes[0], dtype=np.int32)
+        return top_k(dots * (scale * query_scale[0]), k, threshold)
+    return [("int8", search)]
+
+
+def build_ivf(matrix, args):
+    nlist = min(args.nlist, len(matrix))
+    centroids = minibatch_kmeans(matrix, nlist)
+    labels = assign(matrix, centroids)
+    lists = [np.flatnonzero(labels == c) for c in range(nlist)]
+
+    def searcher(nprobe):
+        def search(query, threshold, k):
+            probe = np.argpartition(centroids @ query, -nprobe)[-nprobe:]
+            rows = np.concatenate([lists[c] for c in probe])
+            return rows[top_k(matrix[rows] @ query, k, threshold)]
+        return search
+    return [(f"ivf{nlist}/{nprobe}", searcher(min(nprobe, nlist))) for nprobe in args.nprobes]
+
+
+BUILDERS = {"exact": build_exact, "int8": build_int8, "ivf": build_ivf}
+
+
+def evaluate(search, queries, labels, k, threshold, repeat, to_memories=None):
+    """Mean recall@k, MRR and prompt tokens, and p95 latency in ms.
+
+    `search(query, threshold, k)` is timed on its own; `to_memories` turns its
+    result into [{id, content}] (the identity when search already returns that).
+    """
+    recalls, rrs, tokens, latencies = [], [], [], []
+    for query, (question, relevant) in zip(queries, labels):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = search(query, threshold, k)
+            latencies.append(time.perf_counter() - start)
+        memories = to_memories(result) if to_memories else result
+        hits = [m["id"] for m in memories]
+        recalls.append(len(relevant.intersection(hits)) / len(relevant) if relevant else 1.0)
+        rank = next((r for r, hit in enumerate(hits, 1) if hit in relevant), None)
+        rrs.append(1.0 / rank if rank else 0.0)
+        tokens.append(estimate_tokens(m["content"] for m in build_messages(question, memories)))
+    return {
+        "recall": float(np.mean(recalls)),
+        "mrr": float(np.mean(rrs)),
+        "prompt_tokens": float(np.mean(tokens)),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }
+
+
+def mark_pareto(results):
+    """Flag results that no other result beats on every metric"""
+    def dominates(a, b):
+        at_least = (a["recall"] >= b["recall"] and a["mrr"] >= b["mrr"]
+                    and a["prompt_tokens"] <= b["prompt_tokens"] and a["p95_ms"] <= b["p95_ms"])
+        better = (a["recall"] > b["recall"] or a["mrr"] > b["mrr"]
+                  or a["prompt_tokens"] < b["prompt_tokens"] or a["p95_ms"] < b["p95_ms"])
+        return at_least and better
+    for result in results:
+        result["pareto"] = not any(dominates(other, result) for other in results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("labels")
+    parser.add_argument("--snapshot", help="Parquet snapshot to evaluate over instead of the table")
+    parser.add_argument("--namespace", default=None, help="namespace to evaluate (default MEMORY_DEFAULT_NAMESPACE)")
+    parser.add_argument("--indexes", default="exact,int8,ivf")
+    parser.add_argument("--dims", type=ints, default=None, help="default: full dimension only")
+    parser.add_argument("--ks", type=ints, default=[3, 5, 8])
+    parser.add_argument("--thresholds", type=floats, default=[0.05, 0.1, 0.2, 0.3])
+    parser.add_argument("--nlist", type=int, default=64)
+    parser.add_argument("--nprobes", type=ints, default=[4, 16])
+    parser.add_argument("--repeat", type=int, default=3, help="timed searches per question")
+    parser.add_argument("--rpc", action="store_true", help="also evaluate match_project_memory")
+    parser.add_argument("--out", help="write every result as JSONL")
+    args = parser.parse_args(argv)
+
+    from memory_core.namespaces import resolve
+    from memory_core.store import get_store
+    store = get_store()
+    state = store.embedding_state()
+    namespace = resolve(args.namespace)
+    labels = load_labels(args.labels)
+    ids, contents, matrix = load_memories(store, args.snapshot, state["active_column"], namespace)
+    embeddings = []
+    questions = [question for question, _ in labels]
+    for start in range(0, len(questions), 100):
+        embeddings.extend(store.embed(questions[start:start + 100], state["active_model"]))
+    embeddings = normalize(np.vstack(embeddings))
+    print(f"{len(labels)} questions over {len(ids)} memories ({matrix.shape[1]} dims, {state['active_model']})")
+
+    def to_memories(rows):
+        return [{"id": int(ids[i]), "content": contents[i]} for i in rows]
+
+    results = []
+    for dims in args.dims or [matrix.shape[1]]:
+        reduced, queries = normalize(matrix[:, :dims]), normalize(embeddings[:, :dims])
+        for name in args.indexes.split(","):
+            start = time.perf_counter()
+            variants = BUILDERS[name](reduced, args)
+            build_s = time.perf_counter() - start
+            for variant, search in variants:
+                for k in args.ks:
+                    for threshold in args.thresholds:
+                        metrics = evaluate(search, queries, labels, k, threshold, args.repeat, to_memories)
+                        results.append(dict(index=variant, dims=dims, k=k, threshold=threshold,
+                                            build_s=round(build_s, 2), **metrics))
+    if args.rpc:
+        def rpc_search(query, threshold, k):
+            return store.rpc_search(query, threshold, k, namespace)
+        for k in args.ks:
+            for threshold in args.thresholds:
+                metrics = evaluate(rpc_search, embeddings, labels, k, threshold, args.repeat)
+                results.append(dict(index="rpc", dims=matrix.shape[1], k=k, threshold=threshold, build_s=0, **metrics))
+
+    mark_pareto(results)
+    print(f"\n{'index':<12} {'dims':>5} {'k':>3} {'thresh':>6} {'recall':>7} {'mrr':>6} "
+          f"{'tokens':>7} {'p95 ms':>8}")
+    for r in sorted(results, key=lambda r: (-r["recall"], -r["mrr"], r["p95_ms"])):
+        print(f"{r['index']:<12} {r['dims']:>5} {r['k']:>3} {r['threshold']:>6.2f} {r['recall']:>7.3f} "
+              f"{r['mrr']:>6.3f} {r['prompt_tokens']:>7.0f} {r['p95_ms']:>8.2f}{' *' if r['pareto'] else ''}")
+    print("\n* Pareto-optimal over recall, MRR, prompt tokens and p95 latency")
+    if args.out:
+        with open(args.out, "w") as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+
+
+if __name__ == "__main__":
+    main()
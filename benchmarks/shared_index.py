@@ -0,0 +1,89 @@
+"""Per-worker memory with a private index copy vs the shared-memory index.
+
+Usage:
+    python benchmarks/shared_index.py --rows 200000 --workers 1 2 4 8
+
+Each worker either builds its own copy of a synthetic rows x 1536 matrix or
+attaches to one published generation, runs a few searches, and reports its
+private (USS) and proportional (PSS) memory from /proc/self/smaps_rollup.
+With the shared index, total PSS should stay roughly flat as workers grow.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_core.index import LocalIndex  # noqa: E402
+from memory_core.shared_index import SharedIndexReader, publish, unpublish  # noqa: E402
+
+DIM = 1536
+
+
+def memory_kb():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {"rss": fields.get("Rss", 0), "pss": fields.get("Pss", 0), "uss": uss}
+
+
+def synthetic(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((rows, DIM), dtype=np.float32)
+
+
+def worker(mode, name, rows, barrier, results):
+    if mode == "shared":
+        index = SharedIndexReader(name)
+    else:
+        index = LocalIndex(DIM)
+        index.add(list(range(rows)), synthetic(rows))
+    query = np.random.default_rng(1).standard_normal(DIM).astype(np.float32)
+    for _ in range(3):
+        index.search(query, 0.0, 5)
+    barrier.wait()  # measure while every worker is alive
+    results.put(memory_kb())
+    barrier.wait()
+
+
+def run(mode, name, rows, workers):
+    barrier = mp.Barrier(workers)
+    results = mp.Queue()
+    procs = [mp.Process(target=worker, args=(mode, name, rows, barrier, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    samples = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return {key: sum(s[key] for s in samples) for key in ("rss", "pss", "uss")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--name", default=f"bench_index_{os.getpid()}")
+    args = parser.parse_args(argv)
+
+    publish(args.name, list(range(args.rows)), synthetic(args.rows))
+    matrix_mb = args.rows * DIM * 4 / 2**20
+    print(f"{args.rows} rows x {DIM} dims = {matrix_mb:.0f} MB matrix")
+    print(f"{'workers':>7} {'mode':>8} {'total PSS MB':>13} {'total USS MB':>13}")
+    try:
+        for workers in args.workers:
+            for mode in ("private", "shared"):
+                totals = run(mode, args.name, args.rows, workers)
+                print(f"{workers:>7} {mode:>8} {totals['pss'] / 1024:>13.0f} {totals['uss'] / 1024:>13.0f}")
+    finally:
+        unpublish(args.name)
+
+
+if __name__ == "__main__":
+    main()
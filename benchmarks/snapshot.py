@@ -0,0 +1,80 @@
+"""Local index build time: Parquet snapshot vs PostgREST-style JSON rows.
+
+Usage:
+    python benchmarks/snapshot.py --rows 1000000 --json-rows 20000
+
+Writes a synthetic snapshot, then times reading it into a LocalIndex. The
+JSON path parses `--json-rows` pgvector text values (what the fallback and
+the old index load receive) and extrapolates to `--rows`.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_core.index import LocalIndex, normalize  # noqa: E402
+from memory_core.snapshot import WRITE_OPTIONS, load_index, schema  # noqa: E402
+
+
+def write_synthetic(path, rows, dim, chunk=100_000):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    rng = np.random.default_rng(0)
+    with pq.ParquetWriter(path, schema(dim), **WRITE_OPTIONS) as writer:
+        for start in range(0, rows, chunk):
+            n = min(chunk, rows - start)
+            flat = normalize(rng.standard_normal((n, dim), dtype=np.float32)).ravel()
+            writer.write_batch(pa.RecordBatch.from_arrays([
+                pa.array(np.arange(start, start + n, dtype=np.int64)),
+                pa.array([f"note {i}" for i in range(start, start + n)]),
+                pa.array([None] * n, pa.string()),
+                pa.array(["default"] * n, pa.string()),
+                pa.array([[]] * n, pa.list_(pa.string())),
+                pa.array([None] * n, pa.string()),
+                pa.FixedSizeListArray.from_arrays(pa.array(flat), dim),
+            ], schema=schema(dim)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--json-rows", type=int, default=5_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot.parquet")
+        start = time.perf_counter()
+        write_synthetic(path, args.rows, args.dim)
+        print(f"wrote {args.rows} rows ({os.path.getsize(path) / 2**20:.0f} MB) in {time.perf_counter() - start:.1f}s")
+
+        index = LocalIndex(args.dim)
+        start = time.perf_counter()
+        load_index(index, path)
+        parquet_s = time.perf_counter() - start
+        print(f"parquet index build: {parquet_s:.2f}s for {len(index)} rows")
+
+    rng = np.random.default_rng(1)
+    rows = [
+        {"id": i, "content": f"note {i}", "embedding": json.dumps(rng.standard_normal(args.dim).round(6).tolist())}
+        for i in range(args.json_rows)
+    ]
+    payload = json.dumps(rows)
+    index = LocalIndex(args.dim)
+    start = time.perf_counter()
+    index.load_rows(json.loads(payload))
+    json_s = time.perf_counter() - start
+    projected = json_s * args.rows / args.json_rows
+    print(f"json index build: {json_s:.2f}s for {args.json_rows} rows "
+          f"({len(payload) / args.json_rows / 1024:.1f} KB/row), projected {projected:.0f}s for {args.rows} rows")
+    print(f"speedup: {projected / parquet_s:.0f}x (network transfer of the JSON not included)")
+
+
+if __name__ == "__main__":
+    main()
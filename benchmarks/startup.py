@@ -0,0 +1,241 @@
+"""Startup profile and cold-start benchmark for the Streamlit entry points.
+
+Usage:
+    python benchmarks/startup.py imports
+    python benchmarks/startup.py first-paint app.py memory_chatbot.py
+    python benchmarks/startup.py cold-start app.py --runs 5
+    python benchmarks/startup.py cold-start app.py --docker-image corval-memory --cpus 1 --memory 512m
+
+`cold-start` measures wall time from process spawn until a first visitor's
+page has rendered: it opens a browser session on Streamlit's websocket,
+requests the initial script run the way the frontend does, and stops the clock
+at the script_finished message (the health endpoint, also reported, answers
+before any script has run). With --docker-image the server runs inside a
+CPU/memory limited container so the numbers track a Railway-sized instance.
+Append --json results.jsonl to keep a history across deploys.
+"""
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["streamlit", "numpy", "openai", "supabase", "dotenv", "PIL"]
+
+# Dummy settings so the scripts get past env validation without touching real services
+BENCH_ENV = {
+    "OPENAI_API_KEY": "sk-bench",
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_KEY": "bench",
+    "STREAMLIT_PASSWORD": "",
+}
+
+
+def bench_env():
+    env = dict(os.environ)
+    for key, value in BENCH_ENV.items():
+        env.setdefault(key, value)
+    return env
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_time(module):
+    """Cumulative import time (seconds) of a module in a fresh interpreter"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    if proc.returncode != 0:
+        return None
+    for line in reversed(proc.stderr.splitlines()):
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6
+    return None
+
+
+def cmd_imports(args):
+    results = {}
+    for module in args.modules or HEAVY_MODULES:
+        seconds = import_time(module)
+        results[module] = seconds
+        shown = "not installed" if seconds is None else f"{seconds * 1000:8.1f} ms"
+        print(f"{module:<12} {shown}")
+    return {"imports": results}
+
+
+def cmd_first_paint(args):
+    """Time one full script run (the first page a visitor sees) under cProfile"""
+    from streamlit.testing.v1 import AppTest
+
+    os.environ.update({k: v for k, v in BENCH_ENV.items() if k not in os.environ})
+    results = {}
+    for script in args.scripts:
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=args.timeout)
+        at.run()
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        results[script] = elapsed
+        print(f"{script}: first script run {elapsed * 1000:.1f} ms")
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(args.top)
+        print(out.getvalue())
+    return {"first_paint": results}
+
+
+def server_command(script, port, args):
+    streamlit = [
+        "streamlit", "run", script,
+        f"--server.port={port}", "--server.address=0.0.0.0", "--server.headless=true",
+    ]
+    if not args.docker_image:
+        return [sys.executable, "-m"] + streamlit
+    env_flags = []
+    for key, value in BENCH_ENV.items():
+        env_flags += ["-e", f"{key}={os.environ.get(key, value)}"]
+    return [
+        "docker", "run", "--rm", f"--cpus={args.cpus}", f"--memory={args.memory}",
+        "-p", f"{port}:{port}", *env_flags, args.docker_image,
+    ] + streamlit
+
+
+def wait_healthy(port, timeout):
+    url = f"http://127.0.0.1:{port}/_stcore/health"
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.05)
+    return False
+
+
+def wait_first_render(port, timeout):
+    """Open a browser session and wait until its first script run finishes; True on success"""
+    import asyncio
+
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+    from websockets.asyncio.client import connect
+    from websockets.exceptions import WebSocketException
+
+    # A compile error or an early rerun also ends a run without a rendered page
+    finished_ok = {ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY}
+
+    async def session():
+        async with connect(f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"],
+                           max_size=None) as ws:
+            # What the frontend sends once connected: run the default page
+            rerun = BackMsg()
+            rerun.rerun_script.SetInParent()
+            await ws.send(rerun.SerializeToString())
+            async for data in ws:
+                msg = ForwardMsg()
+                msg.ParseFromString(data)
+                if msg.WhichOneof("type") == "script_finished":
+                    return msg.script_finished in finished_ok
+        return False
+
+    try:
+        return asyncio.run(asyncio.wait_for(session(), timeout))
+    except (OSError, asyncio.TimeoutError, WebSocketException):
+        return False
+
+
+def summarize(samples):
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "runs": len(samples),
+    }
+
+
+def cmd_cold_start(args):
+    results = {}
+    for script in args.scripts:
+        healthy, rendered = [], []
+        for _ in range(args.runs):
+            port = free_port()
+            start = time.perf_counter()
+            proc = subprocess.Popen(
+                server_command(script, port, args), cwd=ROOT, env=bench_env(),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                if not wait_healthy(port, args.timeout):
+                    continue
+                healthy.append(time.perf_counter() - start)
+                if wait_first_render(port, args.timeout):
+                    rendered.append(time.perf_counter() - start)
+            finally:
+                proc.terminate()
+                try:
+                    proc.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+        if not rendered:
+            print(f"{script}: " + ("first script run never finished" if healthy else "server never became healthy"))
+            continue
+        results[script] = dict(summarize(rendered), healthy=summarize(healthy))
+        print(f"{script}: cold start to first render median {results[script]['median_s']:.2f}s "
+              f"(min {results[script]['min_s']:.2f}s, max {results[script]['max_s']:.2f}s, n={len(rendered)}); "
+              f"health endpoint median {results[script]['healthy']['median_s']:.2f}s")
+    return {"cold_start": results, "docker_image": args.docker_image,
+            "cpus": args.cpus, "memory": args.memory}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", help="append results as one JSON line to this file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("imports", help="import-time profile of the heavy dependencies")
+    p.add_argument("modules", nargs="*")
+    p.set_defaults(func=cmd_imports)
+
+    p = sub.add_parser("first-paint", help="cProfile one script run per entry point")
+    p.add_argument("scripts", nargs="+")
+    p.add_argument("--top", type=int, default=25)
+    p.add_argument("--timeout", type=float, default=30)
+    p.set_defaults(func=cmd_first_paint)
+
+    p = sub.add_parser("cold-start", help="time `streamlit run` until the first page has rendered")
+    p.add_argument("scripts", nargs="+")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--timeout", type=float, default=120)
+    p.add_argument("--docker-image", help="run inside this image instead of locally")
+    p.add_argument("--cpus", default="1")
+    p.add_argument("--memory", default="512m")
+    p.set_defaults(func=cmd_cold_start)
+
+    args = parser.parse_args(argv)
+    result = args.func(args)
+    if args.json:
+        result.update({"command": args.command, "timestamp": time.time()})
+        with open(args.json, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Write throughput of project_memory: single-row vs multi-row inserts vs upserts.
+
+Usage:
+    python benchmarks/write_throughput.py --local --batch-sizes 1 10 100 500 --concurrency 1 4 16
+    python benchmarks/write_throughput.py --env-file .env.local --rows 5000 --json results.jsonl
+
+Targets the local Supabase stack (`supabase start`, --local) or any project
+whose SUPABASE_URL / SUPABASE_KEY come from --env-file (default .env.local,
+which overrides .env and the environment)
+or --url / --key; the key must be a service_role key. Rows carry realistic
+payloads: random unit 1536-dim vectors in the pgvector text format the store
+sends, ~200 characters of content, tags and a source.
+
+Every case writes --rows rows:
+    single   one row per insert request
+    insert   --batch-sizes rows per insert request
+    upsert   --batch-sizes rows per upsert request, rewriting the rows the
+             insert case of the same batch size and concurrency just wrote
+             (the migration and snapshot-restore path)
+each with --concurrency requests in flight. It reports rows/s, request
+payload MB/s and per-request latency percentiles. All rows go to a
+namespace of their own (bench-<time>) that is deleted at the end, also when
+the run is interrupted.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# What `supabase start` serves the API on
+LOCAL_URL = "http://127.0.0.1:54321"
+WORDS = "invoice route driver depot fuel pallet customer delay contract rate lane dock load".split()
+
+
+def make_rows(count, namespace, rng, dim):
+    from memory_core.codec import to_pgvector
+    vectors = rng.standard_normal((count, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    rows = []
+    for vector in vectors:
+        words = rng.choice(WORDS, 30)
+        rows.append({
+            "content": " ".join(words) + " #benchmark",
+            "embedding": to_pgvector(vector),
+            "namespace": namespace,
+            "source": "benchmark",
+            "tags": ["benchmark"],
+        })
+    return rows
+
+
+def percentile(samples, q):
+    return samples[min(len(samples) - 1, int(len(samples) * q))] * 1000
+
+
+def run_case(supabase, table, mode, batches, concurrency):
+    """Send `batches` with `concurrency` requests in flight. Returns (report, ids written)."""
+    def send(rows):
+        started = time.perf_counter()
+        query = supabase.table(table)
+        query = query.upsert(rows) if mode == "upsert" else query.insert(rows)
+        result = query.execute()
+        return time.perf_counter() - started, [row["id"] for row in result.data or []]
+
+    payload = sum(len(json.dumps(rows)) for rows in batches)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, batches))
+    seconds = time.perf_counter() - started
+    latencies = sorted(latency for latency, _ in results)
+    ids = [id_ for _, written in results for id_ in written]
+    rows = sum(len(rows) for rows in batches)
+    return {
+        "mode": mode,
+        "batch": len(batches[0]),
+        "concurrency": concurrency,
+        "rows": rows,
+        "rows_per_s": round(rows / seconds, 1),
+        "mb_per_s": round(payload / seconds / 1e6, 2),
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+    }, ids
+
+
+def cleanup(supabase, table, namespace):
+    supabase.table(table).delete().eq("namespace", namespace).execute()
+
+
+def main(argv=None):
+    # memory_core.config reads the environment when first imported, so the
+    # --env-file values have to be in place (and win over .env) before that
+    pre = argparse.ArgumentParser(add_help=False)
+    pre.add_argument("--env-file", default=".env.local")
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=pre.parse_known_args(argv)[0].env_file, override=True)
+    from memory_core import config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env-file", default=".env.local", help="loaded over .env and the environment")
+    parser.add_argument("--local", action="store_true", help=f"target the local Supabase stack at {LOCAL_URL}")
+    parser.add_argument("--url", help="Supabase URL (default SUPABASE_URL)")
+    parser.add_argument("--key", help="service_role key (default SUPABASE_KEY)")
+    parser.add_argument("--rows", type=int, default=2000, help="rows written per case")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--modes", nargs="+", choices=["single", "insert", "upsert"],
+                        default=["single", "insert", "upsert"])
+    parser.add_argument("--dim", type=int, default=config.EMBEDDING_DIM)
+    parser.add_argument("--json", help="append one JSON line per case to this file")
+    args = parser.parse_args(argv)
+
+    url = args.url or (LOCAL_URL if args.local else config.SUPABASE_URL)
+    key = args.key or config.SUPABASE_KEY
+    if not url or not key:
+        parser.error("set SUPABASE_URL and SUPABASE_KEY (service_role) or pass --url/--key")
+    print(f"Target: {url} (table {config.TABLE})", flush=True)
+    from supabase import create_client
+    supabase = create_client(url, key)
+
+    namespace = f"bench-{int(time.time())}"
+    rng = np.random.default_rng(0)
+    cases = []
+    for concurrency in args.concurrency:
+        if "single" in args.modes:
+            cases.append(("single", 1, concurrency))
+        for batch in args.batch_sizes:
+            cases += [(mode, batch, concurrency) for mode in ("insert", "upsert") if mode in args.modes]
+
+    print(f"Namespace {namespace}, {args.rows} rows per case")
+    print(f"{'mode':<7} {'batch':>5} {'conc':>4} {'rows/s':>9} {'MB/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    written = {}
+    try:
+        for mode, batch, concurrency in cases:
+            rows = make_rows(args.rows, namespace, rng, args.dim)
+            if mode == "upsert":
+                # Rewrite existing rows with new vectors, inserting them first if needed
+                ids = written.get((batch, concurrency)) or run_case(
+                    supabase, config.TABLE, "insert", [rows[i:i + batch] for i in range(0, len(rows), batch)], concurrency
+                )[1]
+                rows = [dict(row, id=id_) for row, id_ in zip(rows, ids)]
+            batches = [rows[i:i + batch] for i in range(0, len(rows), batch)]
+            report, ids = run_case(supabase, config.TABLE, mode, batches, concurrency)
+            if mode == "insert":
+                written[(batch, concurrency)] = ids
+            print(f"{mode:<7} {batch:>5} {concurrency:>4} {report['rows_per_s']:>9} {report['mb_per_s']:>7} "
+                  f"{report['p50_ms']:>8} {report['p95_ms']:>8} {report['p99_ms']:>8}")
+            if args.json:
+                with open(args.json, "a") as f:
+                    f.write(json.dumps(dict(report, url=url, dim=args.dim, at=time.time())) + "\n")
+    finally:
+        cleanup(supabase, config.TABLE, namespace)
+        print(f"Deleted the rows of namespace {namespace}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,26 @@
 import streamlit as st
-from PIL import Image
 import os
-import base64
-from dotenv import load_dotenv
-from openai import OpenAI
-from supabase import create_client
-from datetime import datetime
-import numpy as np
-import hashlib
-
-# ✅ Load environment variables
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-STREAMLIT_PASSWORD = os.getenv("STREAMLIT_PASSWORD", "")
+from memory_core import config, get_memory, namespace_scope, session_scope
+from memory_core.history import ChatHistory, session_id
+from memory_core.namespaces import for_password
+from memory_core.profiling import maybe_profile
+
+# ✅ Page Config
+st.set_page_config(
+    page_title="Corval.ai Memory Assistant", 
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+# ✅ Load environment variables (API keys are read by memory_core.config)
+STREAMLIT_PASSWORD = config.STREAMLIT_PASSWORD
 
 # ✅ Simple password protection (optional)
 def check_password():
-    if not STREAMLIT_PASSWORD:
+    if "namespace" not in st.session_state:
+        st.session_state.namespace = None  # MEMORY_DEFAULT_NAMESPACE
+
+    if not STREAMLIT_PASSWORD and not config.NAMESPACE_PASSWORDS:
         return True
     
     if "authenticated" not in st.session_state:
@@ -28,38 +30,17 @@ def check_password():
         st.title("🔐 Access Required")
         password = st.text_input("Enter password:", type="password")
         if st.button("Login"):
-            if password == STREAMLIT_PASSWORD:
+            namespace = for_password(password)
+            if namespace:
+                # Each password opens its own namespace of memories
                 st.session_state.authenticated = True
+                st.session_state.namespace = namespace
                 st.rerun()
             else:
                 st.error("Incorrect password")
         return False
     return True
 
-# ✅ Validate environment variables
-if not OPENAI_API_KEY or not SUPABASE_URL or not SUPABASE_KEY:
-    st.error("❌ Missing API keys. Check environment variables.")
-    st.stop()
-
-# ✅ Check authentication
-if not check_password():
-    st.stop()
-
-# ✅ Initialize clients
-try:
-    openai_client = OpenAI(api_key=OPENAI_API_KEY)
-    supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-except Exception as e:
-    st.error(f"❌ Failed to initialize clients: {e}")
-    st.stop()
-
-# ✅ Page Config
-st.set_page_config(
-    page_title="Corval.ai Memory Assistant", 
-    layout="wide",
-    initial_sidebar_state="collapsed"
-)
-
 # ✅ Enhanced CSS - Purple theme with sticky bottom input
 st.markdown("""
     <style>
@@ -423,39 +404,69 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# ✅ Helper function for similarity search fallback
-def cosine_similarity(a, b):
-    """Calculate cosine similarity between two vectors"""
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-
-def fallback_search(query_embedding, threshold=0.05, limit=5):
-    """Fallback search when RPC function doesn't work"""
-    try:
-        result = supabase.table("project_memory").select("id, content, embedding").execute()
-        
-        if not result.data:
-            return []
-        
-        matches = []
-        for item in result.data:
-            if item['embedding']:
-                similarity = cosine_similarity(query_embedding, item['embedding'])
-                if similarity > threshold:
-                    matches.append({
-                        'id': item['id'],
-                        'content': item['content'],
-                        'similarity': similarity
-                    })
-        
-        matches.sort(key=lambda x: x['similarity'], reverse=True)
-        return matches[:limit]
-    
-    except Exception as e:
-        return []
+# ✅ Validate environment variables
+if config.missing_settings():
+    st.error("❌ Missing API keys. Check environment variables.")
+    st.stop()
+
+# ✅ Check authentication
+if not check_password():
+    st.stop()
+
+# ✅ Warm-up - build the index and prime caches in the background, once per process
+@st.cache_resource(show_spinner=False)
+def start_warmup():
+    get_memory().warm_up()
+    return True
+
+start_warmup()
+
+# ✅ Startup check - the warm-up thread probes the backend, so the first paint
+# never waits on the network; warn loudly once it reports a problem instead
+# of silently degrading to a full-table scan
+def warmup_banner(status):
+    if status.get("degraded"):
+        st.warning(f"⚠️ Warm-up failed ({', '.join(status['errors'])}); answers may be slow or fail.")
+    elif not status["ready"]:
+        st.info("⏳ Warming up the memory index. Your first answer may take a few extra seconds.")
+    if (status.get("check") or {}).get("rpc") is False:
+        st.warning("⚠️ Vector search function `match_project_memory` is unavailable, so every question scans the whole table. Apply `supabase/migrations` to fix this.")
+
+@st.fragment(run_every="2s")
+def poll_warmup():
+    status = get_memory().ready()
+    if status["ready"] or status.get("degraded"):
+        st.session_state.warmup_status = status
+        st.rerun()
+    warmup_banner(status)
+
+if "warmup_status" in st.session_state:
+    warmup_banner(st.session_state.warmup_status)
+else:
+    poll_warmup()
 
 # ✅ Initialize Session State
+if "session_id" not in st.session_state:
+    # Kept in the URL so a reload resumes the conversation; upstream OpenAI
+    # calls are also fair-queued per session. A sid from another namespace
+    # starts a fresh session.
+    st.session_state.session_id = session_id(st.query_params.get("sid"), st.session_state.namespace)
+    st.query_params["sid"] = st.session_state.session_id
 if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
+    st.session_state.chat_history = ChatHistory(st.session_state.session_id, st.session_state.namespace)
+if "history_window" not in st.session_state:
+    st.session_state.history_window = 20
+
+
+def render_message(msg):
+    text = msg.text
+    if msg.role == "assistant" and msg.memory_ids:
+        text += f"\n\n💡 *Found {len(msg.memory_ids)} relevant memories*"
+    css = {"user": "user-message", "assistant": "ai-message"}.get(msg.role, "system-message")
+    return f'''<div class="message {css}">
+            <div class="message-content">{text}</div>
+        </div>'''
+
 
 # ✅ Logo Detection and Header
 logo_paths = [
@@ -465,16 +476,23 @@ logo_paths = [
     "assets/corval_logo.png"
 ]
 
-logo_found = False
+@st.cache_resource(show_spinner=False)
+def get_logo_data_uri():
+    """Read and base64-encode the logo once per process"""
+    import base64
+    for logo_path in logo_paths:
+        if os.path.exists(logo_path):
+            with open(logo_path, "rb") as img_file:
+                b64_string = base64.b64encode(img_file.read()).decode()
+            return f"data:image/png;base64,{b64_string}"
+    return None
+
+logo_data_uri = get_logo_data_uri()
+logo_found = logo_data_uri is not None
 logo_element = ""
 
-for logo_path in logo_paths:
-    if os.path.exists(logo_path):
-        with open(logo_path, "rb") as img_file:
-            b64_string = base64.b64encode(img_file.read()).decode()
-        logo_element = f'<img src="data:image/png;base64,{b64_string}" style="width: 70px; height: 70px; border-radius: 50%; object-fit: cover;">'
-        logo_found = True
-        break
+if logo_found:
+    logo_element = f'<img src="{logo_data_uri}" style="width: 70px; height: 70px; border-radius: 50%; object-fit: cover;">'
 
 if not logo_found:
     logo_element = '''
@@ -499,8 +517,8 @@ st.markdown(f'''
 
 # ✅ Stats
 try:
-    count_result = supabase.table("project_memory").select("id", count="exact").execute()
-    memory_count = count_result.count if count_result.count else 0
+    with namespace_scope(st.session_state.namespace):
+        memory_count = get_memory().count()
     
     st.markdown(f'''
     <div class="stats-container">
@@ -532,6 +550,11 @@ if not st.session_state.chat_history:
             <div class="tip-description">Type "add: your information here" to store memories</div>
         </div>
         
+        <div class="tip-card">
+            <div class="tip-title">🗑️ Forget Information</div>
+            <div class="tip-description">Type "forget: what to remove" to delete the closest memory</div>
+        </div>
+        
         <div class="tip-card">
             <div class="tip-title">💬 Ask Questions</div>
             <div class="tip-description">Just type your question normally to search your memories</div>
@@ -539,9 +562,27 @@ if not st.session_state.chat_history:
     </div>
     ''', unsafe_allow_html=True)
 
-# Display chat messages
-for msg in st.session_state.chat_history:
-    st.markdown(msg, unsafe_allow_html=True)
+# Display the newest messages; older ones are paged in from the history log
+history = st.session_state.chat_history
+if len(history) > st.session_state.history_window:
+    if st.button(f"⬆️ Load earlier messages ({len(history) - st.session_state.history_window} more)", key="load_earlier"):
+        st.session_state.history_window += 20
+        st.rerun()
+for msg in history.window(st.session_state.history_window):
+    st.markdown(render_message(msg), unsafe_allow_html=True)
+# Direct lookups are answered with the matching memory; offer the full answer
+if st.session_state.get("expand_question"):
+    if st.button("✨ Expand with AI", key="expand_ai"):
+        with st.spinner('🤔 Thinking...'), namespace_scope(st.session_state.namespace), session_scope(st.session_state.session_id):
+            try:
+                result = get_memory().answer(st.session_state.expand_question, mode="generate")
+                st.session_state.chat_history.append(
+                    "assistant", result["answer"], [m["id"] for m in result["memories"]]
+                )
+            except Exception as expand_error:
+                st.session_state.chat_history.append("system", f"❌ Query failed: {str(expand_error)[:60]}...")
+        st.session_state.expand_question = None
+        st.rerun()
 
 st.markdown('</div>', unsafe_allow_html=True)
 
@@ -551,19 +592,17 @@ st.markdown('</div>', unsafe_allow_html=True)  # Close chat container
 if st.session_state.chat_history:
     st.markdown('<div style="text-align: center; margin: 20px 0;">', unsafe_allow_html=True)
     if st.button("🗑️ Clear Chat", key="clear_chat"):
-        st.session_state.chat_history = []
+        st.session_state.chat_history.clear()
+        with namespace_scope(st.session_state.namespace), session_scope(st.session_state.session_id):
+            get_memory().end_conversation()
+        st.session_state.expand_question = None
+        st.session_state.history_window = 20
         st.rerun()
     st.markdown('</div>', unsafe_allow_html=True)
 
 # Add spacer to push content up and ensure input is visible
 st.markdown('<div style="height: 120px;"></div>', unsafe_allow_html=True)
 
-# Clear chat button (only show if there's chat history)
-if st.session_state.chat_history:
-    if st.button("🗑️ Clear Chat", key="clear_chat"):
-        st.session_state.chat_history = []
-        st.rerun()
-
 # ✅ TRULY FIXED BOTTOM INPUT - Moved to very end
 st.markdown("""
 <div id="fixed-input-container" class="input-container">
@@ -628,13 +667,15 @@ with st.form(key="chat_form", clear_on_submit=True):
         submit_btn = st.form_submit_button("💜 Send")
 if submit_btn and user_input and user_input.strip():
     # Add user message
-    st.session_state.chat_history.append(
-        f'''<div class="message user-message">
-            <div class="message-content">{user_input}</div>
-        </div>'''
-    )
+    st.session_state.chat_history.append("user", user_input)
     
-    with st.spinner('🤔 Thinking...'):
+    # The Debug toggle profiles the next request; MEMORY_PROFILE=1 profiles every
+    # request (saved under MEMORY_PROFILE_DIR)
+    profiling = maybe_profile(
+        st.session_state.get("profile_next"), "add" if user_input.lower().startswith("add:") else "answer",
+        st.session_state.session_id,
+    )
+    with st.spinner('🤔 Thinking...'), namespace_scope(st.session_state.namespace), session_scope(st.session_state.session_id), profiling as profile:
         try:
             if user_input.lower().startswith("add:"):
                 # Store Note
@@ -642,120 +683,55 @@ if submit_btn and user_input and user_input.strip():
                 
                 if content:
                     try:
-                        # Create embedding
-                        embedding_response = openai_client.embeddings.create(
-                            model="text-embedding-3-small",
-                            input=content
-                        )
-                        embedding = embedding_response.data[0].embedding
-                        
-                        # Save to Supabase  
-                        result = supabase.table("project_memory").insert({
-                            "content": content,
-                            "embedding": embedding,
-                            "created_at": datetime.utcnow().isoformat()
-                        }).execute()
-                        
-                        if result.data and len(result.data) > 0:
-                            st.session_state.chat_history.append(
-                                f'''<div class="message system-message">
-                                    <div class="message-content">✅ Memory saved: "{content[:50]}{"..." if len(content) > 50 else ""}"</div>
-                                </div>'''
-                            )
-                        else:
-                            st.session_state.chat_history.append(
-                                f'''<div class="message system-message">
-                                    <div class="message-content">❌ Failed to save memory</div>
-                                </div>'''
-                            )
-                            
-                    except Exception as embed_error:
+                        # Embed and save via the shared memory backend
+                        get_memory().add(content)
                         st.session_state.chat_history.append(
-                            f'''<div class="message system-message">
-                                <div class="message-content">❌ Error: {str(embed_error)[:60]}...</div>
-                            </div>'''
+                            "system", f'✅ Memory saved: "{content[:50]}{"..." if len(content) > 50 else ""}"'
                         )
+                    except Exception as embed_error:
+                        st.session_state.chat_history.append("system", f"❌ Error: {str(embed_error)[:60]}...")
                 else:
-                    st.session_state.chat_history.append(
-                        f'''<div class="message system-message">
-                            <div class="message-content">❌ Please provide content after "add:"</div>
-                        </div>'''
-                    )
+                    st.session_state.chat_history.append("system", '❌ Please provide content after "add:"')
+            elif user_input.lower().startswith("forget:"):
+                # Tombstone the best-matching memory (or memory #id)
+                target = user_input[7:].strip()
+                try:
+                    forgotten = get_memory().forget(target) if target else []
+                    if forgotten:
+                        st.session_state.chat_history.append("system", f'🗑️ Forgot: "{forgotten[0]["content"][:50]}"')
+                    else:
+                        st.session_state.chat_history.append("system", "❌ No matching memory to forget")
+                except Exception as forget_error:
+                    st.session_state.chat_history.append("system", f"❌ Error: {str(forget_error)[:60]}...")
             else:
                 # Query Mode
                 try:
-                    # Create query embedding
-                    query_embedding_response = openai_client.embeddings.create(
-                        model="text-embedding-3-small",
-                        input=user_input
-                    )
-                    query_embedding = query_embedding_response.data[0].embedding
-                    
-                    context_items = []
-                    
-                    # Search memories
-                    try:
-                        context_result = supabase.rpc("match_project_memory", {
-                            "query_embedding": query_embedding,
-                            "match_threshold": 0.05,
-                            "match_count": 5
-                        }).execute()
-                        
-                        context_items = context_result.data if context_result.data else []
-                        
-                    except Exception:
-                        context_items = fallback_search(query_embedding)
-                    
-                    context = "\n".join([item['content'] for item in context_items])
-                    
-                    # Call OpenAI
-                    if context:
-                        prompt = f"""You are a helpful AI assistant with access to the user's stored memories.
-
-User Question: {user_input}
-
-Relevant Memories:
-{context}
-
-Please provide a helpful answer based on the user's question and the relevant memories above."""
-                    else:
-                        prompt = f"""You are a helpful AI assistant. The user asked: {user_input}
-
-No relevant memories were found. Please provide a helpful general response."""
-                    
-                    chat_response = openai_client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=[
-                            {"role": "system", "content": "You are a helpful AI assistant."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        max_tokens=500,
-                        temperature=0.7
-                    )
-                    
-                    response_text = chat_response.choices[0].message.content
-                    
-                    if context_items:
-                        response_text += f"\n\n💡 *Found {len(context_items)} relevant memories*"
-                    
+                    # Search memories and answer via the shared memory backend
+                    result = get_memory().answer(user_input)
                     st.session_state.chat_history.append(
-                        f'''<div class="message ai-message">
-                            <div class="message-content">{response_text}</div>
-                        </div>'''
+                        "assistant", result["answer"], [m["id"] for m in result["memories"]]
                     )
+                    st.session_state.expand_question = user_input if result.get("mode") == "extractive" else None
                     
                 except Exception as query_error:
-                    st.session_state.chat_history.append(
-                        f'''<div class="message system-message">
-                            <div class="message-content">❌ Query failed: {str(query_error)[:60]}...</div>
-                        </div>'''
-                    )
+                    st.session_state.chat_history.append("system", f"❌ Query failed: {str(query_error)[:60]}...")
         
         except Exception:
-            st.session_state.chat_history.append(
-                f'''<div class="message system-message">
-                    <div class="message-content">❌ Something went wrong</div>
-                </div>'''
-            )
+            st.session_state.chat_history.append("system", "❌ Something went wrong")
     
-    st.rerun()
\ No newline at end of file
+    if profile is not None:
+        st.session_state.last_profile = profile
+        st.session_state.profile_next = False
+    st.rerun()
+
+# ✅ Debug - profile the next request and show its top functions inline; drawn
+# after the request above, which resets the toggle before the widget exists
+with st.expander("🔧 Debug"):
+    st.checkbox("🔬 Profile next request", key="profile_next")
+    last_profile = st.session_state.get("last_profile")
+    if last_profile is not None:
+        st.caption(
+            f"Last profile: {last_profile.label} in {last_profile.seconds:.2f}s, {last_profile.samples} stack samples\n\n"
+            f"`{last_profile.stats_path}` • `{last_profile.collapsed_path}`"
+        )
+        st.table(last_profile.top[:15])
\ No newline at end of file
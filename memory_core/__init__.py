@@ -0,0 +1,25 @@
+"""Core memory package shared by the Streamlit UIs, the memory service and CLIs.
+
+Heavy dependencies (numpy, openai, supabase) are imported on first use so that
+importing this package is cheap.
+"""
+from . import config
+from .admission import session_scope
+from .namespaces import namespace_scope
+
+
+def get_memory():
+    """The memory backend for this process.
+
+    Returns a MemoryClient when MEMORY_SERVICE_URL is set, otherwise the
+    process-wide in-process MemoryStore. Both expose add, bulk_add, forget,
+    search, answer, end_conversation, count, check, stats, warm_up and ready.
+    """
+    if config.MEMORY_SERVICE_URL:
+        from .client import MemoryClient
+        return MemoryClient()
+    from .store import get_store
+    return get_store()
+
+
+__all__ = ["config", "get_memory", "namespace_scope", "session_scope"]
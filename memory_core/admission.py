@@ -0,0 +1,215 @@
+"""Admission control for upstream OpenAI calls.
+
+Every embedding and chat completion in the process goes through one
+scheduler: at most OPENAI_MAX_CONCURRENCY calls run at once, waiting calls are
+served round-robin across sessions so one busy session cannot starve the
+rest, and per-kind token buckets keep requests and tokens per minute under
+the OpenAI tier limits. When OPENAI_MAX_QUEUE calls are already waiting, or a
+call waits longer than OPENAI_QUEUE_TIMEOUT, it is shed with Overloaded;
+MemoryStore.answer then degrades to a retrieval-only reply.
+
+The session is read from a context variable that the UIs set with
+session_scope() (the memory service sets it from the X-Memory-Session header).
+"""
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from . import config
+
+current_session = contextvars.ContextVar("memory_session", default=None)
+
+
+class Overloaded(Exception):
+    """The call was shed because too many upstream calls are queued"""
+
+
+@contextmanager
+def session_scope(session_id):
+    """Attribute upstream calls made inside the block to `session_id`"""
+    token = current_session.set(session_id)
+    try:
+        yield
+    finally:
+        current_session.reset(token)
+
+
+def estimate_tokens(texts):
+    """Rough OpenAI token count for rate limiting (~4 characters per token)"""
+    texts = list(texts)
+    return sum(len(text) for text in texts) // 4 + len(texts)
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, holding at most one minute's worth; 0 disables"""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` units are available"""
+        if not self.per_minute:
+            return 0.0
+        self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+        # A request bigger than the bucket waits for a full bucket instead of forever
+        amount = min(amount, self.per_minute)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.per_minute
+
+    def take(self, amount):
+        if self.per_minute:
+            self.level -= min(amount, self.per_minute)
+
+
+class _Ticket:
+    __slots__ = ("kind", "tokens")
+
+    def __init__(self, kind, tokens):
+        self.kind = kind
+        self.tokens = tokens
+
+
+class Scheduler:
+    """Bounded, fair-queued, rate-limited admission of upstream calls.
+
+    `limits` maps a call kind ("embed", "chat") to (requests, tokens) per minute.
+    """
+
+    def __init__(self, max_concurrency, max_queue, timeout, limits):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.buckets = {kind: (TokenBucket(rpm), TokenBucket(tpm)) for kind, (rpm, tpm) in limits.items()}
+        self._cond = threading.Condition()
+        # session -> waiting tickets; sessions are served in this (rotating) order
+        self._queues = OrderedDict()
+        self.queued = 0
+        self.active = 0
+        self.admitted = 0
+        self.shed = 0
+        self.waits = deque(maxlen=1000)
+
+    def _bucket_wait(self, ticket, now):
+        requests, tokens = self.buckets.get(ticket.kind, (None, None))
+        if requests is None:
+            return 0.0
+        return max(requests.wait_time(1, now), tokens.wait_time(ticket.tokens, now))
+
+    def _delay(self, ticket, now):
+        """0 when `ticket` may run now, seconds to sleep, or None to wait for a notify"""
+        if self.active >= self.max_concurrency:
+            return None
+        for queue in self._queues.values():
+            head = queue[0]
+            wait = self._bucket_wait(head, now)
+            if head is ticket:
+                return wait
+            if wait == 0:
+                # An earlier session's call is runnable; it goes first
+                return None
+        return None
+
+    def _dequeue(self, session, ticket, served):
+        queue = self._queues[session]
+        queue.remove(ticket)
+        self.queued -= 1
+        if not queue:
+            del self._queues[session]
+        elif served:
+            self._queues.move_to_end(session)
+
+    def acquire(self, kind, tokens=0, session=None):
+        session = current_session.get() if session is None else session
+        ticket = _Ticket(kind, tokens)
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._cond:
+            if self.queued >= self.max_queue:
+                self.shed += 1
+                raise Overloaded(f"{self.queued} upstream calls already queued")
+            self._queues.setdefault(session, deque()).append(ticket)
+            self.queued += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = self._delay(ticket, now)
+                    if delay == 0:
+                        break
+                    if now >= deadline:
+                        self.shed += 1
+                        raise Overloaded(f"Waited {now - start:.1f}s for an upstream slot")
+                    self._cond.wait(deadline - now if delay is None else min(delay, deadline - now))
+            except BaseException:
+                self._dequeue(session, ticket, served=False)
+                self._cond.notify_all()
+                raise
+            self._dequeue(session, ticket, served=True)
+            for bucket, amount in zip(self.buckets.get(kind, ()), (1, tokens)):
+                bucket.take(amount)
+            self.active += 1
+            self.admitted += 1
+            self.waits.append(time.monotonic() - start)
+            self._cond.notify_all()
+
+    def reject(self, reason):
+        """Shed a call that was refused before reaching the queue (e.g. by the embedding batcher)"""
+        with self._cond:
+            self.shed += 1
+        raise Overloaded(reason)
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, kind, tokens=0, session=None):
+        """Hold one of the concurrent upstream slots for the duration of the block"""
+        self.acquire(kind, tokens, session)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self.waits)
+            report = {
+                "active": self.active,
+                "queued": self.queued,
+                "sessions_waiting": len(self._queues),
+                "admitted": self.admitted,
+                "shed": self.shed,
+            }
+        report["wait_p50_ms"] = round(waits[len(waits) // 2] * 1000, 1) if waits else None
+        report["wait_p95_ms"] = round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else None
+        report["wait_max_ms"] = round(waits[-1] * 1000, 1) if waits else None
+        return report
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide Scheduler, configured from the environment"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = Scheduler(
+                    config.OPENAI_MAX_CONCURRENCY,
+                    config.OPENAI_MAX_QUEUE,
+                    config.OPENAI_QUEUE_TIMEOUT,
+                    {
+                        "embed": (config.OPENAI_EMBED_RPM, config.OPENAI_EMBED_TPM),
+                        "chat": (config.OPENAI_CHAT_RPM, config.OPENAI_CHAT_TPM),
+                    },
+                )
+    return _scheduler
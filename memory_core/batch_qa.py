@@ -0,0 +1,177 @@
+"""Answer a file of questions offline, e.g. onboarding FAQs or regression checks.
+
+    python -m memory_core.batch_qa questions.txt answers.jsonl --concurrency 8
+    python -m memory_core.batch_qa faq.jsonl answers.jsonl --namespace acme --mode generate
+
+The input holds one question per line, or one {"question": ...} object per
+line (other keys are copied to the output). Questions are embedded
+--embed-batch at a time in one request each and scored against the local
+index as a single matrix product per batch; chat completions then run on up
+to --concurrency threads through the same routing and prompts as the apps
+(MemoryStore.answer_from), under the process's admission limits. Each output
+line holds the answer, its mode, the retrieved ids and similarities, the
+per-question retrieval and answer latency and the token usage; a question
+that fails gets a line with its "error" instead and the run carries on.
+"""
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import config
+from .admission import session_scope
+from .index import normalize, top_k
+from .namespaces import namespace_scope, resolve
+
+logger = logging.getLogger(__name__)
+
+
+def read_questions(path):
+    """Question records ({"question", ...}) from a text or JSONL file"""
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line) if line.startswith("{") else {"question": line}
+            if not record.get("question"):
+                raise ValueError(f"No question in {line[:80]!r}")
+            records.append(record)
+    return records
+
+
+def score_batch(index, queries, threshold, limit):
+    """Top hits ({id, similarity}) of every query row, from one matrix product"""
+    ids, matrix = index.snapshot()
+    if not len(ids):
+        return [[] for _ in queries]
+    tombstones = getattr(index, "tombstones", frozenset())
+    scores = matrix @ normalize(np.asarray(queries, dtype=np.float32)).T
+    results = []
+    for column in scores.T:
+        hits = [
+            {"id": int(ids[i]), "similarity": float(column[i])}
+            for i in top_k(column, limit + len(tombstones), threshold)
+        ]
+        results.append([hit for hit in hits if hit["id"] not in tombstones][:limit])
+    return results
+
+
+def retrieve(store, questions, threshold, limit):
+    """(memories per question, seconds per question) for one embedding batch"""
+    started = time.perf_counter()
+    state = store.embedding_state()
+    if state["shadow_model"]:
+        # Mid-migration the dual-read path scores each question against both generations
+        memories = [store.search(question, threshold, limit) for question in questions]
+    else:
+        queries = store.embed(questions, state["active_model"])
+        index = store.ensure_index()
+        store.tombstone_sync.get()
+        memories = [store.hydrate(hits) for hits in score_batch(index, queries, threshold, limit)]
+    return memories, (time.perf_counter() - started) / len(questions)
+
+
+def run(store, records, output, threshold=None, limit=None, concurrency=None, embed_batch=64,
+        mode="auto", namespace=None):
+    """Answer `records` into the JSONL file object `output`. Returns a summary dict."""
+    threshold = config.MATCH_THRESHOLD if threshold is None else threshold
+    limit = config.MATCH_COUNT if limit is None else limit
+    namespace = resolve(namespace)
+    started = time.perf_counter()
+    modes = {}
+    errors = 0
+    latencies = []
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+
+    def answer(record, memories, retrieval_seconds):
+        # Pool threads do not inherit the caller's context variables
+        with namespace_scope(namespace), session_scope("batch-qa"):
+            answer_started = time.perf_counter()
+            try:
+                result = store.answer_from(record["question"], memories, mode)
+            except Exception as e:
+                logger.warning("Question %r failed: %s", record["question"][:80], e)
+                return dict(record, error=str(e))
+            answer_seconds = time.perf_counter() - answer_started
+        return dict(
+            record,
+            answer=result["answer"],
+            mode=result["mode"],
+            memory_ids=[m["id"] for m in result["memories"]],
+            similarities=[round(m["similarity"], 4) for m in result["memories"]],
+            retrieval_ms=round(retrieval_seconds * 1000, 1),
+            answer_ms=round(answer_seconds * 1000, 1),
+            usage=result["usage"],
+        )
+
+    with ThreadPoolExecutor(max_workers=concurrency or config.OPENAI_MAX_CONCURRENCY,
+                            thread_name_prefix="memory-batch-qa") as pool:
+        for start in range(0, len(records), embed_batch):
+            batch = records[start:start + embed_batch]
+            try:
+                with namespace_scope(namespace), session_scope("batch-qa"):
+                    memories, retrieval_seconds = retrieve(store, [r["question"] for r in batch], threshold, limit)
+            except Exception as e:
+                logger.warning("Retrieval for questions %d-%d failed: %s", start + 1, start + len(batch), e)
+                for record in batch:
+                    output.write(json.dumps(dict(record, error=str(e))) + "\n")
+                errors += len(batch)
+                output.flush()
+                continue
+            futures = [pool.submit(answer, r, m, retrieval_seconds) for r, m in zip(batch, memories)]
+            for future in futures:
+                row = future.result()
+                output.write(json.dumps(row) + "\n")
+                if "error" in row:
+                    errors += 1
+                    continue
+                modes[row["mode"]] = modes.get(row["mode"], 0) + 1
+                latencies.append(row["retrieval_ms"] + row["answer_ms"])
+                for key in usage:
+                    usage[key] += row["usage"].get(key) or 0
+            output.flush()
+            logger.info("Answered %d/%d questions", min(start + embed_batch, len(records)), len(records))
+
+    seconds = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "questions": len(records),
+        "seconds": round(seconds, 2),
+        "questions_per_second": round(len(records) / seconds, 2) if seconds else None,
+        "modes": modes,
+        "errors": errors,
+        "p50_ms": latencies[len(latencies) // 2] if latencies else None,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] if latencies else None,
+        "usage": usage,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", help="text file (one question per line) or JSONL with a question key")
+    parser.add_argument("output", help="JSONL file to write answers to")
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--limit", type=int, default=None, help="memories per question")
+    parser.add_argument("--concurrency", type=int, default=0,
+                        help="chat completions in flight (default OPENAI_MAX_CONCURRENCY)")
+    parser.add_argument("--embed-batch", type=int, default=64, help="questions per embedding request")
+    parser.add_argument("--mode", choices=["auto", "generate"], default="auto")
+    parser.add_argument("--namespace", default=None, help="namespace to answer from (default MEMORY_DEFAULT_NAMESPACE)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    from .store import get_store
+    records = read_questions(args.questions)
+    with open(args.output, "w") as output:
+        summary = run(get_store(), records, output, args.threshold, args.limit, args.concurrency or None,
+                      args.embed_batch, args.mode, args.namespace)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Micro-batching of embedding requests across sessions.
+
+Every search embeds one query and most `add:` commands one note, so under load
+the process would make many tiny embedding calls although the endpoint takes
+a list. EmbeddingBatcher holds small requests for up to MEMORY_EMBED_BATCH_MS
+after the first one arrives (or until MEMORY_EMBED_BATCH_MAX texts are
+waiting), sends them as one request per model and hands each caller its own
+vectors. Requests that are already that large go straight through.
+
+Each request keeps a copy of its caller's context, and a batch is sent in the
+context of its oldest request, so admission (see memory_core.admission)
+fair-queues and rate-limits it as that caller's session. At most `max_queue`
+requests wait in or for a batch; beyond that `reject` sheds new ones.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Pending:
+    __slots__ = ("model", "texts", "context", "queued_at", "done", "vectors", "error")
+
+    def __init__(self, model, texts):
+        self.model = model
+        self.texts = texts
+        self.context = contextvars.copy_context()
+        self.queued_at = time.monotonic()
+        self.done = threading.Event()
+        self.vectors = None
+        self.error = None
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent `send(texts, model)` calls into shared batches.
+
+    `window` is in seconds (0 disables batching); up to `workers` batches are
+    in flight at once. `reject(message)` raises when `max_queue` requests are
+    already outstanding (0 = unbounded).
+    """
+
+    def __init__(self, send, window, max_items, workers, max_queue=0, reject=None):
+        self.send = send
+        self.window = window
+        self.max_items = max_items
+        self.workers = workers
+        self.max_queue = max_queue
+        self.reject = reject
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._queued = 0
+        # Requests queued or in a batch that has not returned yet
+        self._outstanding = 0
+        self._thread = None
+        self._pool = None
+        self.requests = 0
+        self.direct = 0
+        self.batches = 0
+        self.sizes = deque(maxlen=1000)
+        self.waits = deque(maxlen=1000)
+
+    def embed(self, texts, model):
+        texts = list(texts)
+        if self.window <= 0 or len(texts) >= self.max_items:
+            with self._cond:
+                self.direct += 1
+            return self.send(texts, model)
+        pending = _Pending(model, texts)
+        with self._cond:
+            if self.max_queue and self._outstanding >= self.max_queue:
+                full = f"{self._outstanding} embedding requests already queued"
+            else:
+                full = None
+                self._outstanding += 1
+        if full:
+            if self.reject is not None:
+                self.reject(full)
+            raise RuntimeError(full)
+        with self._cond:
+            if self._thread is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="memory-embed")
+                self._thread = threading.Thread(target=self._run, name="memory-embed-batcher", daemon=True)
+                self._thread.start()
+            self._pending.append(pending)
+            self._queued += len(texts)
+            self.requests += 1
+            self._cond.notify()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.vectors
+
+    def _take(self):
+        """Pending requests for the oldest one's model, up to max_items texts"""
+        model = self._pending[0].model
+        batch, size, rest = [], 0, deque()
+        while self._pending:
+            pending = self._pending.popleft()
+            if pending.model == model and size + len(pending.texts) <= self.max_items:
+                batch.append(pending)
+                size += len(pending.texts)
+            else:
+                rest.append(pending)
+        self._pending = rest
+        self._queued -= size
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = self._pending[0].queued_at + self.window
+                while self._queued < self.max_items:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take()
+            self._pool.submit(self._flush, batch)
+
+    def _flush(self, batch):
+        started = time.monotonic()
+        texts = [text for pending in batch for text in pending.texts]
+        try:
+            vectors = batch[0].context.run(self.send, texts, batch[0].model)
+        except Exception as e:
+            for pending in batch:
+                pending.error = e
+                pending.done.set()
+        else:
+            offset = 0
+            for pending in batch:
+                pending.vectors = vectors[offset:offset + len(pending.texts)]
+                offset += len(pending.texts)
+                pending.done.set()
+        with self._cond:
+            self._outstanding -= len(batch)
+            self.batches += 1
+            self.sizes.append(len(texts))
+            self.waits.extend(started - pending.queued_at for pending in batch)
+
+    def stats(self):
+        with self._cond:
+            sizes = sorted(self.sizes)
+            waits = sorted(self.waits)
+            report = {
+                "requests": self.requests,
+                "direct": self.direct,
+                "batches": self.batches,
+                "queued": self._queued,
+                "outstanding": self._outstanding,
+            }
+        report["batch_mean"] = round(sum(sizes) / len(sizes), 2) if sizes else None
+        report["batch_max"] = sizes[-1] if sizes else None
+        report["wait_p50_ms"] = round(waits[len(waits) // 2] * 1000, 1) if waits else None
+        report["wait_p95_ms"] = round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else None
+        return report
@@ -0,0 +1,91 @@
+"""HTTP client for the memory service with the same interface as MemoryStore."""
+import json
+import urllib.error
+import urllib.request
+
+from . import config
+from .admission import current_session
+from .namespaces import current_namespace
+
+
+class MemoryServiceError(Exception):
+    """The memory service returned an error or could not be reached"""
+
+    def __init__(self, message, body=None):
+        super().__init__(message)
+        self.body = body
+
+
+class MemoryClient:
+    def __init__(self, base_url=None, timeout=60):
+        self.base_url = (base_url or config.MEMORY_SERVICE_URL).rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json"}
+        if config.MEMORY_SERVICE_TOKEN:
+            headers["Authorization"] = f"Bearer {config.MEMORY_SERVICE_TOKEN}"
+        if current_session.get():
+            headers["X-Memory-Session"] = current_session.get()
+        if current_namespace.get():
+            headers["X-Memory-Namespace"] = current_namespace.get()
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=data,
+            headers=headers,
+            method="GET" if data is None else "POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read() or b"{}")
+        except urllib.error.HTTPError as e:
+            try:
+                body = json.loads(e.read())
+                message = body.get("error", str(e))
+            except ValueError:
+                body, message = None, str(e)
+            raise MemoryServiceError(message, body) from e
+        except urllib.error.URLError as e:
+            raise MemoryServiceError(f"Memory service unreachable: {e.reason}") from e
+
+    def add(self, content, source=None):
+        return self._request("/add", {"content": content, "source": source})["memory"]
+
+    def bulk_add(self, contents, source=None):
+        return self._request("/bulk_add", {"contents": list(contents), "source": source})["memories"]
+
+    def forget(self, query):
+        return self._request("/forget", {"query": query})["memories"]
+
+    def search(self, query, threshold=None, limit=None):
+        return self._request("/search", {"query": query, "threshold": threshold, "limit": limit})["memories"]
+
+    def answer(self, question, threshold=None, limit=None, mode="auto"):
+        return self._request(
+            "/answer", {"question": question, "threshold": threshold, "limit": limit, "mode": mode}
+        )
+
+    def end_conversation(self):
+        self._request("/end_conversation", {})
+
+    def warm_up(self):
+        """The service warms itself at boot"""
+
+    def ready(self):
+        try:
+            return self._request("/ready")
+        except MemoryServiceError as e:
+            # 503 while the service is still warming up or degraded; the body is the status
+            if e.body and "ready" in e.body:
+                return e.body
+            return {"ready": False, "error": str(e)}
+
+    def count(self):
+        return self._request("/stats")["count"]
+
+    def check(self):
+        return self._request("/check")
+
+    def stats(self):
+        return self._request("/stats")
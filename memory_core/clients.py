@@ -0,0 +1,39 @@
+"""Lazily constructed, process-wide OpenAI and Supabase clients.
+
+The SDKs are only imported the first time a client is needed so that importing
+memory_core (and rendering the UIs) stays cheap.
+"""
+import threading
+
+from . import config
+
+_lock = threading.Lock()
+_clients = {}
+
+
+def _get(name, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+def _make_openai():
+    from openai import OpenAI
+    return OpenAI(api_key=config.OPENAI_API_KEY)
+
+
+def _make_supabase():
+    from supabase import create_client
+    return create_client(config.SUPABASE_URL, config.SUPABASE_KEY)
+
+
+def get_openai_client():
+    return _get("openai", _make_openai)
+
+
+def get_supabase():
+    return _get("supabase", _make_supabase)
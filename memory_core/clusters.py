@@ -0,0 +1,351 @@
+"""Two-level retrieval over clustered memories.
+
+    python -m memory_core.clusters build --clusters 256
+    python -m memory_core.clusters summarize --interval 600
+    python -m memory_core.clusters status
+    python -m memory_core.clusters build --namespace acme
+
+`build` runs mini-batch spherical k-means over the active embedding column and
+writes one memory_clusters row per cluster (centroid, size), then summarizes
+every cluster with the chat model. Stores load the centroids and partition
+their index by nearest centroid, so a search scores the centroids first and
+then only the members of the MEMORY_CLUSTER_PROBES best clusters. Broad
+questions ("give me an overview of ...") are answered from the summaries of
+the best clusters instead of raw notes. Each namespace is clustered on its own
+(--namespace, default MEMORY_DEFAULT_NAMESPACE).
+
+`add:` inserts are assigned to their nearest cluster as they arrive, moving
+its centroid and size (server-side, through add_to_memory_clusters); `summarize` re-summarizes clusters that have grown by
+more than --stale since their summary was written.
+"""
+import argparse
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+
+from . import clients, config
+from .admission import estimate_tokens
+from .codec import parse_vector, to_pgvector
+from .index import normalize, top_k
+from .namespaces import namespace_scope
+from .prompts import build_summary_messages
+
+logger = logging.getLogger(__name__)
+
+TABLE = "memory_clusters"
+
+_BROAD = re.compile(
+    r"\b(summar(y|ize|ise)|overview|overall|in general|big picture|everything|"
+    r"all (the |of (the |my |our )?)?(notes|memories|things)|what do (i|we) know)\b",
+    re.IGNORECASE,
+)
+
+
+def is_broad(question):
+    """Questions better answered from cluster summaries than from a few notes"""
+    return bool(_BROAD.search(question))
+
+
+def assign(matrix, centroids, chunk=65536):
+    """Nearest centroid of every row, in chunks to bound the score matrix"""
+    labels = np.empty(len(matrix), dtype=np.int64)
+    for start in range(0, len(matrix), chunk):
+        labels[start:start + chunk] = np.argmax(matrix[start:start + chunk] @ centroids.T, axis=1)
+    return labels
+
+
+def minibatch_kmeans(matrix, clusters, batch_size=1024, iterations=100, seed=0):
+    """Spherical mini-batch k-means (Sculley 2010) over unit rows; returns unit centroids"""
+    rng = np.random.default_rng(seed)
+    n = len(matrix)
+    centroids = np.array(matrix[rng.choice(n, clusters, replace=False)], dtype=np.float32)
+    counts = np.zeros(clusters)
+    for _ in range(iterations):
+        batch = matrix[rng.choice(n, min(batch_size, n), replace=False)]
+        labels = np.argmax(batch @ centroids.T, axis=1)
+        hits = np.bincount(labels, minlength=clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, batch)
+        counts += hits
+        moved = hits > 0
+        # Per-center learning rate 1/count, applied to the batch mean
+        centroids[moved] += (sums[moved] - hits[moved, None] * centroids[moved]) / counts[moved, None]
+        centroids = normalize(centroids)
+    return centroids
+
+
+class ClusterIndex:
+    """Centroids and summaries, plus the member rows of each cluster in a base index"""
+
+    def __init__(self, model, centroids, sizes, summaries, summarized_sizes=None, namespace=None):
+        self.model = model
+        self.namespace = namespace or config.DEFAULT_NAMESPACE
+        self.centroids = normalize(np.asarray(centroids, dtype=np.float32))
+        self.sizes = np.asarray(sizes, dtype=np.int64)
+        self.summaries = list(summaries)
+        self.summarized_sizes = np.asarray(
+            summarized_sizes if summarized_sizes is not None else np.zeros(len(self.sizes)), dtype=np.int64
+        )
+        self.base = None
+        self.base_rows = 0
+        self.base_generation = None
+        # (row numbers in base, ids) per cluster, swapped as one tuple so
+        # searches never see the two out of step
+        self.members = ([], [])
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.centroids)
+
+    @classmethod
+    def load(cls, supabase, model, namespace=None):
+        """The clusters stored for `model` in `namespace`, or None when there are none"""
+        namespace = namespace or config.DEFAULT_NAMESPACE
+        try:
+            result = (supabase.table(TABLE).select("id, centroid, size, summary, summarized_size")
+                      .eq("namespace", namespace).eq("embedding_model", model).order("id").execute())
+        except Exception as e:
+            logger.debug("No %s table: %s", TABLE, e)
+            return None
+        rows = result.data or []
+        if not rows:
+            return None
+        return cls(
+            model,
+            np.vstack([parse_vector(row["centroid"]) for row in rows]),
+            [row["size"] for row in rows],
+            [row.get("summary") for row in rows],
+            [row.get("summarized_size") or 0 for row in rows],
+            namespace,
+        )
+
+    def attached_to(self, base):
+        return (self.base is base and self.base_rows == len(base)
+                and self.base_generation == getattr(base, "generation", None))
+
+    def attach(self, base):
+        """Partition `base` (LocalIndex or SharedIndexReader) by nearest centroid"""
+        with self._lock:
+            # Read before the rows so a compaction in between forces a re-attach
+            generation = getattr(base, "generation", None)
+            ids, matrix = base.snapshot()
+            labels = assign(matrix, self.centroids)
+            order = np.argsort(labels, kind="stable")
+            bounds = np.searchsorted(labels[order], np.arange(len(self.centroids) + 1))
+            ids = np.asarray(ids, dtype=np.int64)
+            rows = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids))]
+            self.members = (rows, [ids[r] for r in rows])
+            self.base, self.base_rows = base, len(ids)
+            self.base_generation = generation
+
+    def add(self, ids, vectors, base=None, start=None):
+        """Assign new rows to their nearest cluster and move its centroid.
+
+        When they were appended to the attached base at row `start` the
+        partition is extended too. Returns {cluster id: (rows added, sum of
+        their vectors)} for save_added().
+        """
+        vectors = normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1))
+        labels = assign(vectors, self.centroids)
+        added = {int(c): (int((labels == c).sum()), vectors[labels == c].sum(axis=0)) for c in np.unique(labels)}
+        with self._lock:
+            centroids = self.centroids.copy()
+            for label, vector in zip(labels, vectors):
+                centroids[label] = centroids[label] * self.sizes[label] + vector
+                self.sizes[label] += 1
+            self.centroids = normalize(centroids)
+            if base is not None and base is self.base and start == self.base_rows:
+                rows, member_ids = list(self.members[0]), list(self.members[1])
+                for i, label in enumerate(labels):
+                    rows[label] = np.append(rows[label], start + i)
+                    member_ids[label] = np.append(member_ids[label], ids[i])
+                self.members = (rows, member_ids)
+                self.base_rows += len(ids)
+            else:
+                self.base = None
+        return added
+
+    def save_added(self, supabase, added):
+        """Apply add()'s result to the stored clusters.
+
+        The add_to_memory_clusters function grows each size and moves each
+        centroid from the row's current values, so replicas adding at the
+        same time do not overwrite each other's updates.
+        """
+        cluster_ids = sorted(added)
+        supabase.rpc("add_to_memory_clusters", {
+            "match_namespace": self.namespace,
+            "model": self.model,
+            "cluster_ids": cluster_ids,
+            "counts": [added[c][0] for c in cluster_ids],
+            "vector_sums": [to_pgvector(added[c][1]) for c in cluster_ids],
+        }).execute()
+
+    def save(self, supabase, cluster_ids=None):
+        """Write centroids and sizes (of `cluster_ids`, default all) back to the table, as build() does"""
+        cluster_ids = range(len(self.centroids)) if cluster_ids is None else cluster_ids
+        supabase.table(TABLE).upsert([
+            {
+                "namespace": self.namespace,
+                "embedding_model": self.model,
+                "id": int(c),
+                "centroid": to_pgvector(self.centroids[c]),
+                "size": int(self.sizes[c]),
+            }
+            for c in cluster_ids
+        ]).execute()
+
+    def probe(self, query, probes):
+        """The `probes` clusters whose centroids score best, best first"""
+        scores = self.centroids @ query
+        return top_k(scores, probes, -np.inf), scores
+
+    def search(self, query_embedding, threshold, limit, probes, base=None):
+        """Exact top-k over the members of the best clusters, as {id, similarity}"""
+        query = normalize(np.asarray(query_embedding, dtype=np.float32))
+        best, _ = self.probe(query, probes)
+        attached, generation = self.base, self.base_generation
+        base = base or attached
+        rows, ids = self.members
+        candidates = np.concatenate([rows[c] for c in best])
+        if not len(candidates):
+            return []
+        # Score and filter against one state of the base; if its row numbers
+        # moved since attach() (compaction, reload), fall back to a flat search
+        view = base.view()
+        if (base is not attached or getattr(view, "generation", None) != generation
+                or candidates.max() >= len(view)):
+            return base.search(query, threshold, limit)
+        scores = base.vectors(candidates, view) @ query
+        member_ids = np.concatenate([ids[c] for c in best])
+        # Tombstones are ids, and only grow within a generation
+        tombstones = getattr(base, "tombstones", frozenset())
+        hits = [
+            {"id": int(member_ids[i]), "similarity": float(scores[i])}
+            for i in top_k(scores, limit + len(tombstones), threshold)
+        ]
+        return [hit for hit in hits if hit["id"] not in tombstones][:limit]
+
+    def summary_memories(self, query_embedding, limit):
+        """Summaries of the best clusters as memories ({id, content, similarity})"""
+        query = normalize(np.asarray(query_embedding, dtype=np.float32))
+        best, scores = self.probe(query, len(self.centroids))
+        memories = []
+        for c in best:
+            if self.summaries[c]:
+                memories.append({
+                    "id": f"cluster:{c}",
+                    "content": f"Summary of {self.sizes[c]} related notes: {self.summaries[c]}",
+                    "similarity": float(scores[c]),
+                })
+                if len(memories) == limit:
+                    break
+        return memories
+
+
+def build(store, clusters=None, batch_size=1024, iterations=100, namespace=None):
+    """Cluster a namespace's active column from scratch and store the centroids"""
+    namespace = namespace or config.DEFAULT_NAMESPACE
+    model = store.embedding_state()["active_model"]
+    index = store.ensure_local_index(namespace)
+    ids, matrix = index.snapshot()
+    if not len(ids):
+        raise ValueError("Nothing to cluster")
+    clusters = min(clusters or int(np.sqrt(len(ids))) or 1, len(ids))
+    started = time.perf_counter()
+    centroids = minibatch_kmeans(matrix, clusters, batch_size, iterations)
+    sizes = np.bincount(assign(matrix, centroids), minlength=clusters)
+    logger.info("Clustered %d rows into %d clusters in %.1fs", len(ids), clusters, time.perf_counter() - started)
+    result = ClusterIndex(model, centroids, sizes, [None] * clusters, namespace=namespace)
+    supabase = store.supabase
+    supabase.table(TABLE).delete().eq("namespace", namespace).eq("embedding_model", model).execute()
+    result.save(supabase)
+    return result
+
+
+def summarize(store, stale=0.2, per_cluster=20, namespace=None):
+    """(Re)write summaries of clusters that have none or grew by more than `stale`. Returns the count."""
+    namespace = namespace or config.DEFAULT_NAMESPACE
+    model = store.embedding_state()["active_model"]
+    clusters = ClusterIndex.load(store.supabase, model, namespace)
+    if clusters is None:
+        raise ValueError(f"No clusters for {model} in namespace {namespace}; run build first")
+    clusters.attach(store.ensure_local_index(namespace))
+    _, matrix = clusters.base.snapshot()
+    rows, ids = clusters.members
+    written = 0
+    for c in range(len(clusters)):
+        size = len(rows[c])
+        if not size or (clusters.summaries[c] and size <= clusters.summarized_sizes[c] * (1 + stale)):
+            continue
+        # The notes closest to the centroid stand in for the cluster
+        scores = matrix[rows[c]] @ clusters.centroids[c]
+        nearest = top_k(scores, per_cluster, -np.inf)
+        # hydrate() reads the current namespace's rows
+        with namespace_scope(namespace):
+            notes = store.hydrate([{"id": int(ids[c][i]), "similarity": float(scores[i])} for i in nearest])
+        if not notes:
+            continue
+        messages = build_summary_messages([note["content"] for note in notes])
+        with store.admission.slot("chat", estimate_tokens(m["content"] for m in messages) + 200):
+            response = store.openai.chat.completions.create(
+                model=config.CHAT_MODEL, messages=messages, max_tokens=200, temperature=0.2,
+            )
+        store.supabase.table(TABLE).update({
+            "summary": response.choices[0].message.content.strip(),
+            "summarized_size": size,
+            "size": size,
+        }).eq("namespace", namespace).eq("embedding_model", model).eq("id", c).execute()
+        written += 1
+    return written
+
+
+def status(supabase, model, namespace=None):
+    namespace = namespace or config.DEFAULT_NAMESPACE
+    clusters = ClusterIndex.load(supabase, model, namespace)
+    if clusters is None:
+        return {"namespace": namespace, "model": model, "clusters": 0}
+    return {
+        "namespace": namespace,
+        "model": model,
+        "clusters": len(clusters),
+        "rows": int(clusters.sizes.sum()),
+        "largest": int(clusters.sizes.max()),
+        "summarized": sum(1 for s in clusters.summaries if s),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "summarize", "status"])
+    parser.add_argument("--clusters", type=int, default=0, help="number of clusters (default sqrt(rows))")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--stale", type=float, default=0.2, help="growth that triggers a new summary")
+    parser.add_argument("--interval", type=float, default=0, help="summarize every N seconds (0 = once)")
+    parser.add_argument("--namespace", default=None, help="namespace to cluster (default MEMORY_DEFAULT_NAMESPACE)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    from .namespaces import resolve
+    from .store import get_store
+    namespace = resolve(args.namespace)
+    store = get_store()
+    if args.command == "status":
+        print(status(clients.get_supabase(), store.embedding_state()["active_model"], namespace))
+        return
+    if args.command == "build":
+        build(store, args.clusters, args.batch_size, args.iterations, namespace)
+    while True:
+        logger.info("Summarized %d clusters", summarize(store, args.stale, namespace=namespace))
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+        store.partition(namespace).index_loaded = False  # pick up rows added by other processes
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Embedding wire formats.
+
+OpenAI embeddings are requested base64-encoded (raw little-endian float32)
+and decoded straight into NumPy instead of as JSON lists of 1536 decimals.
+Towards pgvector, PostgREST only speaks JSON, so vectors travel as compact
+pgvector text literals ("[0.01234568,...]") with VECTOR_PRECISION significant
+digits, and are parsed back with NumPy's C text parser.
+"""
+import base64
+import json
+
+import numpy as np
+
+from . import config
+
+
+def decode_embedding(value):
+    """OpenAI embedding (base64 string or float list) as float32"""
+    if isinstance(value, str):
+        return np.frombuffer(base64.b64decode(value), dtype="<f4")
+    return np.asarray(value, dtype=np.float32)
+
+
+def to_pgvector(vector, precision=None):
+    """Compact pgvector text literal for inserts and RPC arguments"""
+    values = np.asarray(vector, dtype=np.float32).tolist()
+    # One %-format over the whole tuple is ~1.5x faster than a join over map()
+    fmt = "%%.%dg," % (precision or config.VECTOR_PRECISION)
+    return "[" + (fmt * len(values) % tuple(values))[:-1] + "]"
+
+
+def parse_vector(value):
+    """Turn a pgvector value from PostgREST (text or list) into float32"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        vector = np.fromstring(value.strip()[1:-1], dtype=np.float32, sep=",")
+        if vector.size or value.strip() == "[]":
+            return vector
+        return np.asarray(json.loads(value), dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
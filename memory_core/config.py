@@ -0,0 +1,157 @@
+"""Settings shared by the memory service, the Streamlit UIs and the CLIs.
+
+Everything comes from the environment (loaded from .env when present) so the
+same values apply to every front-end instead of drifting per script.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+# Namespaces (see memory_core.namespaces): rows written outside a namespace
+# scope, UI passwords mapped to the namespace they open (JSON, e.g.
+# {"s3cret": "acme"}; STREAMLIT_PASSWORD opens the default one), and how many
+# namespaces' index partitions a process keeps loaded
+DEFAULT_NAMESPACE = os.getenv("MEMORY_DEFAULT_NAMESPACE", "default")
+STREAMLIT_PASSWORD = os.getenv("STREAMLIT_PASSWORD", "")
+NAMESPACE_PASSWORDS = os.getenv("MEMORY_NAMESPACE_PASSWORDS", "")
+NAMESPACE_PARTITIONS = int(os.getenv("MEMORY_NAMESPACE_PARTITIONS", "16"))
+
+# When set, the UIs talk to a running memory service instead of Supabase/OpenAI
+MEMORY_SERVICE_URL = os.getenv("MEMORY_SERVICE_URL", "").rstrip("/")
+
+# Memory service tokens: callers send "Authorization: Bearer <token>" (the
+# client sends MEMORY_SERVICE_TOKEN) and get 401 without a known one. Each
+# token is bound to the namespace it may use (JSON, e.g. {"t0k": "acme"}, or
+# "*" for a trusted UI that maps logins to namespaces itself and sends
+# X-Memory-Namespace); MEMORY_SERVICE_TOKEN alone opens the default namespace.
+# The service refuses to start without any token and listens on loopback
+# unless MEMORY_SERVICE_HOST or --host says otherwise
+MEMORY_SERVICE_TOKEN = os.getenv("MEMORY_SERVICE_TOKEN", "")
+MEMORY_SERVICE_TOKENS = os.getenv("MEMORY_SERVICE_TOKENS", "")
+MEMORY_SERVICE_HOST = os.getenv("MEMORY_SERVICE_HOST", "127.0.0.1")
+
+TABLE = os.getenv("MEMORY_TABLE", "project_memory")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "1536"))
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o-mini")
+
+# Significant digits when sending vectors to pgvector as text (float32 needs 9 to be exact)
+VECTOR_PRECISION = int(os.getenv("VECTOR_PRECISION", "7"))
+
+MATCH_THRESHOLD = float(os.getenv("MATCH_THRESHOLD", "0.2"))
+MATCH_COUNT = int(os.getenv("MATCH_COUNT", "5"))
+
+# "auto" tries the match_project_memory RPC and falls back to the warm local
+# index, "rpc" and "local" force one or the other, and "scan" streams the table
+# per search (see memory_core.scan) instead of holding an index in memory
+SEARCH_BACKEND = os.getenv("MEMORY_SEARCH_BACKEND", "auto")
+
+# Exact local searches over more than two blocks score row blocks on this many
+# threads (0 = one per core); run with OPENBLAS_NUM_THREADS=1 so BLAS does not
+# start its own threads on top
+SEARCH_THREADS = int(os.getenv("MEMORY_SEARCH_THREADS", "0"))
+SEARCH_BLOCK_ROWS = int(os.getenv("MEMORY_SEARCH_BLOCK_ROWS", "32768"))
+
+# Rows appended to a local index collect in a small delta buffer that is merged
+# into the main matrix in the background once it holds this many
+INDEX_DELTA_ROWS = int(os.getenv("MEMORY_INDEX_DELTA_ROWS", "2048"))
+
+# Keyset pages for table scans and index loads, and how many threads prefetch
+# them (1 = one page ahead; more split the id range)
+SCAN_PAGE_SIZE = int(os.getenv("MEMORY_SCAN_PAGE_SIZE", "1000"))
+SCAN_WORKERS = int(os.getenv("MEMORY_SCAN_WORKERS", "1"))
+
+# Name of a shared-memory index published by `python -m memory_core.shared_index`;
+# when set, searches attach to it instead of loading a private copy of the table
+SHARED_INDEX_NAME = os.getenv("MEMORY_SHARED_INDEX", "")
+
+# Parquet snapshot (see memory_core.snapshot) to build the local index from;
+# rows added after the snapshot are fetched from the table on load
+SNAPSHOT_PATH = os.getenv("MEMORY_SNAPSHOT_PATH", "")
+
+# Two-level retrieval (see memory_core.clusters): clusters whose members are
+# scored per local search, once `python -m memory_core.clusters build` has run
+CLUSTER_PROBES = int(os.getenv("MEMORY_CLUSTER_PROBES", "8"))
+CLUSTER_REFRESH_SECONDS = float(os.getenv("MEMORY_CLUSTER_REFRESH_SECONDS", "600"))
+
+# How long to wait before retrying match_project_memory after it failed
+RPC_RETRY_SECONDS = float(os.getenv("MEMORY_RPC_RETRY_SECONDS", "60"))
+
+# Admission control for OpenAI calls (see memory_core.admission). The per-minute
+# limits default to the gpt-4o-mini / text-embedding-3 tier 1 limits; 0 disables one.
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+OPENAI_MAX_QUEUE = int(os.getenv("OPENAI_MAX_QUEUE", "64"))
+OPENAI_QUEUE_TIMEOUT = float(os.getenv("OPENAI_QUEUE_TIMEOUT", "30"))
+OPENAI_CHAT_RPM = int(os.getenv("OPENAI_CHAT_RPM", "500"))
+OPENAI_CHAT_TPM = int(os.getenv("OPENAI_CHAT_TPM", "200000"))
+OPENAI_EMBED_RPM = int(os.getenv("OPENAI_EMBED_RPM", "3000"))
+OPENAI_EMBED_TPM = int(os.getenv("OPENAI_EMBED_TPM", "1000000"))
+
+# Small embedding requests from concurrent sessions are held this long (or
+# until this many texts wait) and sent as one batch (see memory_core.batcher);
+# 0 sends every request on its own
+EMBED_BATCH_MS = float(os.getenv("MEMORY_EMBED_BATCH_MS", "15"))
+EMBED_BATCH_MAX = int(os.getenv("MEMORY_EMBED_BATCH_MAX", "64"))
+
+# Direct lookups whose top memory scores at least MIN_SIMILARITY and beats the
+# runner-up by MARGIN are answered with that memory, skipping the chat model
+# (see memory_core.router)
+EXTRACTIVE_ANSWERS = os.getenv("MEMORY_EXTRACTIVE_ANSWERS", "1").lower() in ("1", "true", "yes")
+EXTRACTIVE_MIN_SIMILARITY = float(os.getenv("MEMORY_EXTRACTIVE_MIN_SIMILARITY", "0.6"))
+EXTRACTIVE_MARGIN = float(os.getenv("MEMORY_EXTRACTIVE_MARGIN", "0.1"))
+
+# Per-session retrieval context (see memory_core.conversation): sessions kept,
+# candidates cached from each full search, turns in the rolling summary, how
+# much of the previous query a follow-up inherits, and the best cached score
+# below which a follow-up falls back to a full search
+CONVERSATION_SESSIONS = int(os.getenv("MEMORY_CONVERSATION_SESSIONS", "1024"))
+CONVERSATION_CANDIDATES = int(os.getenv("MEMORY_CONVERSATION_CANDIDATES", "20"))
+CONVERSATION_TURNS = int(os.getenv("MEMORY_CONVERSATION_TURNS", "3"))
+CONVERSATION_SUMMARY_CHARS = int(os.getenv("MEMORY_CONVERSATION_SUMMARY_CHARS", "1200"))
+FOLLOWUP_CARRY = float(os.getenv("MEMORY_FOLLOWUP_CARRY", "0.5"))
+FOLLOWUP_MIN_SIMILARITY = float(os.getenv("MEMORY_FOLLOWUP_MIN_SIMILARITY", "0.35"))
+
+# Retention (see memory_core.retention): rules as JSON or a .json path,
+# where tombstoned rows are archived and after how long, how many tombstones a
+# local index collects before it compacts, how often a process picks up
+# deletions made elsewhere, and how close a `forget:` match must be
+RETENTION_RULES = os.getenv("MEMORY_RETENTION_RULES", "")
+ARCHIVE_DIR = os.getenv("MEMORY_ARCHIVE_DIR", "archive")
+ARCHIVE_AFTER_DAYS = float(os.getenv("MEMORY_ARCHIVE_AFTER_DAYS", "7"))
+COMPACT_TOMBSTONES = int(os.getenv("MEMORY_COMPACT_TOMBSTONES", "1000"))
+TOMBSTONE_SYNC_SECONDS = float(os.getenv("MEMORY_TOMBSTONE_SYNC_SECONDS", "30"))
+FORGET_MIN_SIMILARITY = float(os.getenv("MEMORY_FORGET_MIN_SIMILARITY", "0.5"))
+
+QUERY_CACHE_SIZE = int(os.getenv("MEMORY_QUERY_CACHE_SIZE", "1024"))
+# Memory contents hydrated for search hits, by id
+CONTENT_CACHE_SIZE = int(os.getenv("MEMORY_CONTENT_CACHE_SIZE", "2048"))
+STATS_TTL = float(os.getenv("MEMORY_STATS_TTL", "30"))
+
+# Chat turns kept in memory per UI session; every turn is also logged to
+# MEMORY_HISTORY_DB so older turns can be paged in and sessions resumed
+HISTORY_CAP = int(os.getenv("MEMORY_HISTORY_CAP", "50"))
+HISTORY_DB = os.getenv("MEMORY_HISTORY_DB", "chat_history.sqlite3")
+
+# Profile every UI request (see memory_core.profiling); the Debug expander can
+# also turn it on for a single session
+PROFILE = os.getenv("MEMORY_PROFILE", "").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("MEMORY_PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.getenv("MEMORY_PROFILE_INTERVAL", "0.005"))
+
+
+def missing_settings():
+    """Names of the settings required to run against Supabase/OpenAI directly"""
+    if MEMORY_SERVICE_URL:
+        return []
+    required = {
+        "OPENAI_API_KEY": OPENAI_API_KEY,
+        "SUPABASE_URL": SUPABASE_URL,
+        "SUPABASE_KEY": SUPABASE_KEY,
+    }
+    return [name for name, value in required.items() if not value]
@@ -0,0 +1,95 @@
+"""Per-session retrieval context for follow-up questions.
+
+Each session (see admission.session_scope) keeps its last query vector, the
+candidate rows of its last full search (ids and unit vectors) and a compact
+rolling summary of the conversation. A follow-up ("and what about March?")
+is embedded, blended with the previous query vector and scored against the
+cached candidates first; only when the best of them falls below
+MEMORY_FOLLOWUP_MIN_SIMILARITY does it run a full search, whose candidates
+then replace the cached set. The summary is sent to the chat model instead of
+the full history.
+"""
+import re
+import threading
+from collections import deque
+
+import numpy as np
+
+from . import config
+from .index import normalize, search_matrix
+
+_FOLLOW_UP = re.compile(
+    r"^\s*(and|but|also|so|then|what about|how about|and what|same for)\b|"
+    r"\b(it|its|that|this|those|these|they|them|their|there|he|she|him|her)\b",
+    re.IGNORECASE,
+)
+MAX_FOLLOW_UP_WORDS = 12
+
+
+def is_follow_up(question):
+    """Short questions that lean on the previous turn"""
+    return len(question.split()) <= MAX_FOLLOW_UP_WORDS and bool(_FOLLOW_UP.search(question))
+
+
+def _compact(text, limit):
+    """The first sentence of `text`, at most `limit` characters"""
+    text = " ".join(text.split())
+    end = re.search(r"(?<=[.!?])\s", text)
+    if end and end.start() < limit:
+        return text[:end.start()]
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+class Conversation:
+    """One session's previous query, candidate set and rolling summary"""
+
+    def __init__(self, turns=None, summary_chars=None):
+        self.lock = threading.Lock()
+        self.turns = deque(maxlen=turns or config.CONVERSATION_TURNS)
+        self.earlier = ""
+        self.summary_chars = summary_chars or config.CONVERSATION_SUMMARY_CHARS
+        self.model = None
+        self.query = None
+        self.ids = None
+        self.matrix = None
+
+    def __len__(self):
+        return len(self.turns)
+
+    def blend(self, query):
+        """`query` pulled towards the previous turn's query vector"""
+        query = normalize(np.asarray(query, dtype=np.float32))
+        if self.query is None or self.query.shape != query.shape:
+            return query
+        return normalize(query + config.FOLLOWUP_CARRY * self.query)
+
+    def rescore(self, query, model, threshold, limit, min_similarity):
+        """Top hits among the cached candidates, or None when they score too poorly"""
+        if self.matrix is None or model != self.model:
+            return None
+        rows, scores = search_matrix(self.matrix, normalize(query), limit, threshold)
+        if not len(rows) or scores[0] < min_similarity:
+            return None
+        return [{"id": self.ids[row], "similarity": float(score)} for row, score in zip(rows, scores)]
+
+    def remember(self, model, query, ids=None, matrix=None):
+        """The query of this turn and, after a full search, its candidate set"""
+        self.model = model
+        self.query = normalize(np.asarray(query, dtype=np.float32))
+        if ids is not None:
+            self.ids, self.matrix = ids, matrix
+
+    def record(self, question, answer):
+        if len(self.turns) == self.turns.maxlen:
+            # The oldest turn rolls into a one-line list of earlier topics
+            dropped = _compact(self.turns[0][0], 80)
+            self.earlier = (self.earlier + "; " + dropped if self.earlier else dropped)[-self.summary_chars // 3:]
+        self.turns.append((_compact(question, 200), _compact(answer, 240)))
+
+    def summary(self):
+        """Earlier topics plus the last few turns, within MEMORY_CONVERSATION_SUMMARY_CHARS"""
+        lines = [f"User: {q}\nAssistant: {a}" for q, a in self.turns]
+        if self.earlier:
+            lines.insert(0, f"Earlier topics: {self.earlier}")
+        text = "\n".join(lines)
+        return text[-self.summary_chars:]
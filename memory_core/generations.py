@@ -0,0 +1,74 @@
+"""Embedding generations: which vector column and model are live.
+
+project_memory has two vector columns. memory_embedding_state (see
+supabase/migrations) names the active one and, during a re-embedding
+migration, the model being written into the other ("shadow") column.
+"""
+from . import config
+from .index import LocalIndex
+
+COLUMNS = ("embedding", "embedding_next")
+STATE_TABLE = "memory_embedding_state"
+
+
+def other_column(column):
+    return COLUMNS[1] if column == COLUMNS[0] else COLUMNS[0]
+
+
+def default_state():
+    return {"active_column": COLUMNS[0], "active_model": config.EMBEDDING_MODEL, "shadow_model": None}
+
+
+def load_state(supabase):
+    """Current generation state; the defaults apply when the state table is missing"""
+    state = default_state()
+    try:
+        result = supabase.table(STATE_TABLE).select("active_column, active_model, shadow_model").eq("id", 1).execute()
+        if result.data:
+            state.update({k: v for k, v in result.data[0].items() if k in state})
+    except Exception:
+        pass
+    state["shadow_column"] = other_column(state["active_column"])
+    return state
+
+
+class DualIndex:
+    """Two local indexes read together while a migration is in progress.
+
+    Rows that already have a shadow vector are scored with the shadow model's
+    query vector; every other row with the active model's.
+    """
+
+    def __init__(self, dim):
+        self.active = LocalIndex(dim)
+        self.shadow = LocalIndex(dim)
+
+    def __len__(self):
+        return len(self.active) + len(self.shadow)
+
+    def load_rows(self, rows, active_column, shadow_column):
+        migrated, pending = [], []
+        for row in rows:
+            if row.get(shadow_column) is not None:
+                migrated.append({"id": row["id"], "embedding": row[shadow_column]})
+            elif row.get(active_column) is not None:
+                pending.append({"id": row["id"], "embedding": row[active_column]})
+        self.shadow.load_rows(migrated)
+        self.active.load_rows(pending)
+
+    def add(self, ids, shadow_vectors):
+        """New rows are dual-written, so they belong to the shadow side"""
+        self.shadow.add(ids, shadow_vectors)
+
+    def delete(self, ids):
+        self.active.delete(ids)
+        self.shadow.delete(ids)
+
+    def compact(self):
+        return self.active.compact() + self.shadow.compact()
+
+    def search(self, active_query, shadow_query, threshold, limit):
+        memories = self.active.search(active_query, threshold, limit)
+        memories += self.shadow.search(shadow_query, threshold, limit)
+        memories.sort(key=lambda m: m["similarity"], reverse=True)
+        return memories[:limit]
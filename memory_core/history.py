@@ -0,0 +1,180 @@
+"""Bounded per-session chat history backed by a SQLite log.
+
+Turns are slotted Message records (role, text, timestamp, memory ids) instead
+of pre-rendered HTML. A ChatHistory keeps only the newest HISTORY_CAP turns in
+memory and appends every turn to a server-side SQLite log, so older turns can
+be paged back in and a session resumes after a browser reload (the UIs keep
+the session id in the URL). The log is keyed on (namespace, session id), and
+a session id belongs to the namespace that first used it: a URL carrying
+another namespace's session id starts a fresh session instead.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+
+from . import config
+from .namespaces import resolve
+
+_SESSION_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def session_id(value=None, namespace=None, log=None):
+    """`value` if it is a session id we issued in `namespace`, otherwise a fresh one"""
+    namespace = resolve(namespace)
+    log = log or get_log()
+    if value and _SESSION_ID.fullmatch(value) and log.claim(namespace, value):
+        return value
+    value = uuid.uuid4().hex
+    log.claim(namespace, value)
+    return value
+
+
+class Message:
+    __slots__ = ("role", "text", "ts", "memory_ids")
+
+    def __init__(self, role, text, ts=None, memory_ids=()):
+        self.role = role
+        self.text = text
+        self.ts = time.time() if ts is None else ts
+        self.memory_ids = tuple(memory_ids)
+
+
+class HistoryLog:
+    """Append-only SQLite log of chat turns for every session in the process"""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(chat_messages)")]
+            if columns and "namespace" not in columns:
+                # Logs written before namespaces hold default-namespace sessions
+                self._conn.execute("ALTER TABLE chat_messages RENAME TO chat_messages_unscoped")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS chat_messages (
+                    namespace TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    role TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    ts REAL NOT NULL,
+                    memory_ids TEXT,
+                    PRIMARY KEY (namespace, session_id, seq)
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS chat_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL
+                )"""
+            )
+            if columns and "namespace" not in columns:
+                self._conn.execute(
+                    "INSERT INTO chat_messages SELECT ?, * FROM chat_messages_unscoped", (config.DEFAULT_NAMESPACE,)
+                )
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO chat_sessions SELECT DISTINCT session_id, ? FROM chat_messages_unscoped",
+                    (config.DEFAULT_NAMESPACE,),
+                )
+                self._conn.execute("DROP TABLE chat_messages_unscoped")
+            self._conn.commit()
+
+    def claim(self, namespace, session):
+        """Bind `session` to `namespace` if it is new; False if another namespace owns it"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO chat_sessions VALUES (?, ?)", (session, namespace))
+            row = self._conn.execute(
+                "SELECT namespace FROM chat_sessions WHERE session_id = ?", (session,)
+            ).fetchone()
+        return row[0] == namespace
+
+    def append(self, namespace, session, seq, message):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_messages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, session, seq, message.role, message.text, message.ts,
+                 json.dumps(message.memory_ids) if message.memory_ids else None),
+            )
+
+    def count(self, namespace, session):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(MAX(seq) + 1, 0) FROM chat_messages WHERE namespace = ? AND session_id = ?",
+                (namespace, session),
+            ).fetchone()
+        return row[0]
+
+    def read(self, namespace, session, before, limit):
+        """Up to `limit` turns with seq < `before`, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, text, ts, memory_ids FROM chat_messages "
+                "WHERE namespace = ? AND session_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (namespace, session, before, limit),
+            ).fetchall()
+        return [
+            Message(role, text, ts, json.loads(memory_ids) if memory_ids else ())
+            for role, text, ts, memory_ids in reversed(rows)
+        ]
+
+    def delete(self, namespace, session):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM chat_messages WHERE namespace = ? AND session_id = ?", (namespace, session)
+            )
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_log():
+    """The process-wide HistoryLog at MEMORY_HISTORY_DB"""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = HistoryLog(config.HISTORY_DB)
+    return _log
+
+
+class ChatHistory:
+    """One session's turns: the newest `cap` in memory, all of them in the log"""
+
+    def __init__(self, session, namespace=None, log=None, cap=None):
+        self.session = session
+        self.namespace = resolve(namespace)
+        self.log = log or get_log()
+        self.cap = cap or config.HISTORY_CAP
+        self.total = self.log.count(self.namespace, session)
+        self.recent = deque(self.log.read(self.namespace, session, self.total, self.cap), maxlen=self.cap)
+
+    def __len__(self):
+        return self.total
+
+    def append(self, role, text, memory_ids=()):
+        message = Message(role, text, memory_ids=memory_ids)
+        self.log.append(self.namespace, self.session, self.total, message)
+        self.recent.append(message)
+        self.total += 1
+        return message
+
+    def window(self, count):
+        """The newest `count` turns, oldest first; turns past the cap come from the log"""
+        count = min(count, self.total)
+        recent = list(self.recent)
+        if count <= len(recent):
+            return recent[len(recent) - count:]
+        older = self.log.read(self.namespace, self.session, self.total - len(recent), count - len(recent))
+        return older + recent
+
+    def clear(self):
+        self.log.delete(self.namespace, self.session)
+        self.recent.clear()
+        self.total = 0
@@ -0,0 +1,279 @@
+"""In-process exact vector index over project_memory.
+
+Rows are kept as a row-normalized float32 matrix so a search is one
+matrix-vector product instead of a Python loop over JSON float lists. Large
+matrices are scored in row blocks on a thread pool (NumPy releases the GIL
+inside the product) and the per-block top-k lists are merged.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import config
+from .codec import parse_vector
+
+
+def normalize(vectors):
+    """Unit-length rows; already-normalized input (OpenAI embeddings) is returned uncopied"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    if np.all(np.abs(norms - 1.0) < 1e-3):
+        return vectors
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k(scores, k, threshold):
+    """Indices of the best `k` scores above `threshold`, best first"""
+    candidates = np.flatnonzero(scores > threshold)
+    if candidates.size > k:
+        part = np.argpartition(scores[candidates], -k)[-k:]
+        candidates = candidates[part]
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(threads):
+    global _pool
+    if _pool is None or _pool._max_workers != threads:
+        with _pool_lock:
+            if _pool is None or _pool._max_workers != threads:
+                _pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="memory-score")
+    return _pool
+
+
+def search_matrix(matrix, query, k, threshold, threads=None, block_rows=None):
+    """Row indices and scores of the best `k` rows above `threshold`, best first.
+
+    Matrices longer than two blocks are split into `block_rows` blocks scored
+    on `threads` threads; each block keeps its own top-k and the partial
+    lists are merged.
+    """
+    threads = threads or config.SEARCH_THREADS or os.cpu_count() or 1
+    block_rows = block_rows or config.SEARCH_BLOCK_ROWS
+    if threads <= 1 or len(matrix) < 2 * block_rows:
+        scores = matrix @ query
+        best = top_k(scores, k, threshold)
+        return best, scores[best]
+
+    def score_block(start):
+        scores = matrix[start:start + block_rows] @ query
+        best = top_k(scores, k, threshold)
+        return best + start, scores[best]
+
+    parts = list(_get_pool(threads).map(score_block, range(0, len(matrix), block_rows)))
+    rows = np.concatenate([p[0] for p in parts])
+    scores = np.concatenate([p[1] for p in parts])
+    best = top_k(scores, k, threshold)
+    return rows[best], scores[best]
+
+
+class _View:
+    """One immutable state of a LocalIndex: merged rows, the delta appended since, tombstones"""
+
+    __slots__ = ("ids", "matrix", "delta_ids", "delta", "tombstones", "generation")
+
+    def __init__(self, ids, matrix, delta_ids, delta, tombstones, generation):
+        self.ids = ids
+        self.matrix = matrix
+        self.delta_ids = delta_ids
+        self.delta = delta
+        self.tombstones = tombstones
+        self.generation = generation
+
+    def __len__(self):
+        return len(self.ids) + len(self.delta_ids)
+
+
+class LocalIndex:
+    """Exact cosine-similarity index of memory ids and embeddings.
+
+    Contents are not kept here; searches return ids and scores and the store
+    hydrates the winners (see MemoryStore.hydrate). Deleted ids are
+    tombstoned and skipped by searches until compact() drops their rows;
+    `generation` changes whenever row numbers do (a reload or a compaction).
+
+    Readers never lock: every write publishes a new immutable _View, and a
+    search scores whichever view was current when it started. Appends go to a
+    small delta buffer (copying only the buffer), which a background merge
+    folds into the main matrix once it reaches MEMORY_INDEX_DELTA_ROWS rows.
+    """
+
+    def __init__(self, dim, delta_rows=None):
+        self.dim = dim
+        self.delta_rows = delta_rows or config.INDEX_DELTA_ROWS
+        self._view = _View([], np.empty((0, dim), dtype=np.float32), [], np.empty((0, dim), dtype=np.float32),
+                           frozenset(), 0)
+        # Writers publish views under _lock; merges and compactions, which
+        # copy the whole matrix, run one at a time under _maintenance
+        self._lock = threading.Lock()
+        self._maintenance = threading.Lock()
+        self.merges = 0
+        # (merged ids list, {id: row}) for lookup(); rebuilt when merges or reloads replace the list
+        self._positions = None
+
+    def __len__(self):
+        return len(self._view)
+
+    @property
+    def tombstones(self):
+        return self._view.tombstones
+
+    @property
+    def generation(self):
+        return self._view.generation
+
+    @property
+    def ids(self):
+        return self.snapshot()[0]
+
+    @property
+    def matrix(self):
+        return self.snapshot()[1]
+
+    def add(self, ids, embeddings):
+        """Append rows to the delta buffer; returns the row number of the first one"""
+        if not len(ids):
+            return len(self)
+        block = normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), self.dim))
+        with self._lock:
+            view = self._view
+            self._view = _View(view.ids, view.matrix, view.delta_ids + list(ids), np.vstack([view.delta, block]),
+                               view.tombstones, view.generation)
+            start = len(view)
+            full = len(view.delta_ids) + len(ids) >= self.delta_rows
+        if full and not self._maintenance.locked():
+            threading.Thread(target=self.merge, name="memory-index-merge", daemon=True).start()
+        return start
+
+    def merge(self):
+        """Fold the delta buffer into the main matrix. Returns how many rows were merged."""
+        with self._maintenance:
+            view = self._view
+            merged = len(view.delta_ids)
+            if not merged:
+                return 0
+            ids = view.ids + view.delta_ids
+            matrix = np.vstack([view.matrix, view.delta])
+            with self._lock:
+                current = self._view
+                if current.generation != view.generation:
+                    return 0  # reloaded meanwhile
+                # Rows appended during the copy stay in the delta; row numbers are unchanged
+                self._view = _View(ids, matrix, current.delta_ids[merged:], current.delta[merged:],
+                                   current.tombstones, current.generation)
+                self.merges += 1
+        return merged
+
+    def snapshot(self):
+        """Consistent (ids, matrix) of every row, for publishing and clustering"""
+        self.merge()
+        view = self._view
+        if not view.delta_ids:
+            return view.ids, view.matrix
+        return view.ids + view.delta_ids, np.vstack([view.matrix, view.delta])
+
+    def view(self):
+        """The current immutable _View; pass it to vectors() to read several times from one state"""
+        return self._view
+
+    def vectors(self, rows, view=None):
+        """Unit vectors of row numbers `rows`, read from `view` (default the current one) without merging"""
+        view = view or self._view
+        rows = np.asarray(rows, dtype=np.int64)
+        split = len(view.ids)
+        if not view.delta_ids or not len(rows) or rows.max() < split:
+            return view.matrix[rows]
+        vectors = np.empty((len(rows), self.dim), dtype=np.float32)
+        merged = rows < split
+        vectors[merged] = view.matrix[rows[merged]]
+        vectors[~merged] = view.delta[rows[~merged] - split]
+        return vectors
+
+    def lookup(self, ids, view=None):
+        """{id: unit vector} of the live `ids` this index holds, read from `view` (default the current one)"""
+        view = view or self._view
+        cached = self._positions
+        if cached is None or cached[0] is not view.ids:
+            cached = (view.ids, {id_: row for row, id_ in enumerate(view.ids)})
+            self._positions = cached
+        positions = cached[1]
+        split = len(view.ids)
+        delta = {id_: split + row for row, id_ in enumerate(view.delta_ids)}
+        found = [id_ for id_ in ids if id_ not in view.tombstones and (id_ in positions or id_ in delta)]
+        rows = [positions[id_] if id_ in positions else delta[id_] for id_ in found]
+        return dict(zip(found, self.vectors(rows, view)))
+
+    def load_rows(self, rows, column="embedding"):
+        """Replace the index with rows of {id, <column>}"""
+        ids, vectors = [], []
+        for row in rows:
+            vector = parse_vector(row.get(column))
+            if vector is None or vector.shape != (self.dim,):
+                continue
+            ids.append(row["id"])
+            vectors.append(vector)
+        matrix = np.vstack(vectors) if vectors else np.empty((0, self.dim), dtype=np.float32)
+        self.load_arrays(ids, matrix)
+
+    def load_arrays(self, ids, matrix):
+        """Replace the index with already-decoded ids and a float32 matrix"""
+        matrix = normalize(np.asarray(matrix, dtype=np.float32).reshape(len(ids), self.dim))
+        with self._lock:
+            self._view = _View(list(ids), matrix, [], np.empty((0, self.dim), dtype=np.float32),
+                               frozenset(), self._view.generation + 1)
+
+    def delete(self, ids):
+        """Tombstone `ids`; their rows stay until the next compact()"""
+        with self._lock:
+            view = self._view
+            self._view = _View(view.ids, view.matrix, view.delta_ids, view.delta,
+                               view.tombstones | frozenset(ids), view.generation)
+
+    def compact(self):
+        """Drop tombstoned rows. Returns how many were removed."""
+        with self._maintenance:
+            view = self._view
+            if not view.tombstones:
+                return 0
+            ids = view.ids + view.delta_ids
+            keep = ~np.isin(np.asarray(ids, dtype=np.int64), np.fromiter(view.tombstones, dtype=np.int64))
+            rows = np.flatnonzero(keep)
+            matrix = np.vstack([view.matrix, view.delta])[rows]
+            with self._lock:
+                current = self._view
+                if current.generation != view.generation:
+                    return 0  # reloaded meanwhile
+                # Rows appended meanwhile stay in the delta; ids tombstoned meanwhile stay tombstoned
+                added = len(view.delta_ids)
+                self._view = _View([ids[i] for i in rows], matrix, current.delta_ids[added:], current.delta[added:],
+                                   current.tombstones - view.tombstones, current.generation + 1)
+        return len(ids) - len(rows)
+
+    def search(self, query_embedding, threshold, limit):
+        """Best matches as {id, similarity}, best first"""
+        # One view for the whole search, so concurrent writes can't tear it
+        view = self._view
+        if not len(view):
+            return []
+        query = normalize(np.asarray(query_embedding, dtype=np.float32))
+        k = limit + len(view.tombstones)
+        hits = []
+        if view.ids:
+            rows, scores = search_matrix(view.matrix, query, k, threshold)
+            hits += [(float(s), view.ids[i]) for i, s in zip(rows, scores)]
+        if view.delta_ids:
+            scores = view.delta @ query
+            hits += [(float(scores[i]), view.delta_ids[i]) for i in top_k(scores, k, threshold)]
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [{"id": id_, "similarity": s} for s, id_ in hits if id_ not in view.tombstones][:limit]
+
+    def stats(self):
+        view = self._view
+        return {"rows": len(view), "delta_rows": len(view.delta_ids), "tombstones": len(view.tombstones),
+                "generation": view.generation, "merges": self.merges}
@@ -0,0 +1,229 @@
+"""Re-embed project_memory with a new embedding model without a retrieval outage.
+
+    python -m memory_core.migrate start --model text-embedding-3-large
+    python -m memory_core.migrate run --workers 8 --batch-size 100
+    python -m memory_core.migrate status
+    python -m memory_core.migrate cutover
+    python -m memory_core.migrate cleanup      # after every replica saw the cutover
+
+`start` records the new model as the shadow model; from then on every store
+dual-writes new memories and dual-reads (new model for migrated rows, old model
+for the rest). `run` re-embeds rows whose shadow vector is still empty in
+parallel batches, writing each with one update_shadow_embeddings call
+(supabase/migrations/20261019170000_memory_shadow_updates.sql) and checkpointing the id watermark so it can be stopped and
+resumed. `cutover` flips the active column in one single-row update once
+nothing is left to migrate. `cleanup` clears the now-inactive column so the
+next migration starts empty; `abort` drops the shadow model instead.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from . import clients, config
+from .codec import to_pgvector
+from .generations import STATE_TABLE, load_state
+from .snapshot import iter_pages, live
+
+logger = logging.getLogger(__name__)
+
+
+class MigrationError(Exception):
+    """The requested migration step is not valid in the current state"""
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _count(supabase, where):
+    query = supabase.table(config.TABLE).select("id", count="exact").limit(1)
+    return where(query).execute().count or 0
+
+
+def pending_count(supabase, state):
+    return _count(supabase, lambda q: live(q.is_(state["shadow_column"], "null")))
+
+
+def _update_state(supabase, **values):
+    values["updated_at"] = _now()
+    supabase.table(STATE_TABLE).update(values).eq("id", 1).execute()
+
+
+def status(supabase):
+    state = load_state(supabase)
+    report = dict(state, total=_count(supabase, lambda q: q))
+    if state["shadow_model"]:
+        report["pending"] = pending_count(supabase, state)
+    return report
+
+
+def start(supabase, model):
+    state = load_state(supabase)
+    if state["shadow_model"]:
+        raise MigrationError(f"Migration to {state['shadow_model']} already in progress")
+    if model == state["active_model"]:
+        raise MigrationError(f"{model} is already the active model")
+    leftover = _count(supabase, lambda q: q.not_.is_(state["shadow_column"], "null"))
+    if leftover:
+        raise MigrationError(f"{leftover} rows still hold old {state['shadow_column']} vectors; run cleanup first")
+    _update_state(supabase, shadow_model=model)
+
+
+class Checkpoint:
+    """Id watermark below which every row has been re-embedded, persisted as JSON"""
+
+    def __init__(self, path, model):
+        self.path = path
+        self.data = {"model": model, "last_id": None, "migrated": 0, "started_at": _now()}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get("model") == model:
+                self.data = saved
+
+    @property
+    def last_id(self):
+        return self.data["last_id"]
+
+    def advance(self, last_id, migrated):
+        self.data["last_id"] = last_id
+        self.data["migrated"] += migrated
+        self.data["updated_at"] = _now()
+        if self.path:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.data, f)
+            os.replace(tmp, self.path)
+
+
+def _migrate_batch(store, supabase, state, rows):
+    vectors = store.embed([row["content"] for row in rows], state["shadow_model"])
+    # One UPDATE for the batch; it skips rows deleted or tombstoned since they
+    # were read, so those never come back
+    supabase.rpc("update_shadow_embeddings", {
+        "row_ids": [row["id"] for row in rows],
+        "vectors": [to_pgvector(vector) for vector in vectors],
+        "embedding_column": state["shadow_column"],
+    }).execute()
+    return len(rows)
+
+
+def run(supabase, store, batch_size=100, workers=4, checkpoint_path="migration_checkpoint.json"):
+    """Backfill shadow vectors in parallel batches. Returns the number of rows migrated."""
+    state = load_state(supabase)
+    if not state["shadow_model"]:
+        raise MigrationError("No migration in progress; run start first")
+    checkpoint = Checkpoint(checkpoint_path, state["shadow_model"])
+    pages = iter_pages(
+        supabase, batch_size, columns="id, content", after=checkpoint.last_id,
+        where=lambda q: live(q.is_(state["shadow_column"], "null")),
+    )
+    in_flight = deque()
+    migrated = 0
+    started = time.perf_counter()
+
+    def drain(block):
+        # Only advance the watermark over a completed prefix so a restart never skips rows
+        nonlocal migrated
+        while in_flight and (block or in_flight[0][1].done()):
+            last_id, future = in_flight.popleft()
+            count = future.result()
+            migrated += count
+            checkpoint.advance(last_id, count)
+            block = False
+        if migrated:
+            rate = migrated / (time.perf_counter() - started)
+            logger.info("Migrated %d rows (%.0f rows/s), watermark id %s", migrated, rate, checkpoint.last_id)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for rows in pages:
+            in_flight.append((rows[-1]["id"], pool.submit(_migrate_batch, store, supabase, state, rows)))
+            if len(in_flight) >= workers * 2:
+                drain(block=True)
+        while in_flight:
+            drain(block=True)
+    # Pass complete; rows still pending (e.g. written by a replica that had not
+    # seen `start` yet) are picked up by the next run from the beginning
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return migrated
+
+
+def cutover(supabase, force=False):
+    """Atomically make the shadow column active"""
+    state = load_state(supabase)
+    if not state["shadow_model"]:
+        raise MigrationError("No migration in progress")
+    pending = pending_count(supabase, state)
+    if pending and not force:
+        raise MigrationError(f"{pending} rows are not migrated yet; run again or pass --force")
+    _update_state(
+        supabase,
+        active_column=state["shadow_column"],
+        active_model=state["shadow_model"],
+        shadow_model=None,
+    )
+
+
+def abort(supabase):
+    _update_state(supabase, shadow_model=None)
+
+
+def cleanup(supabase, batch_size=500):
+    """Clear the inactive vector column. Returns the number of rows cleared."""
+    state = load_state(supabase)
+    if state["shadow_model"]:
+        raise MigrationError("Migration in progress; cut over or abort first")
+    column = state["shadow_column"]
+    cleared = 0
+    while True:
+        rows = (supabase.table(config.TABLE).select("id").not_.is_(column, "null")
+                .order("id").limit(batch_size).execute().data or [])
+        if not rows:
+            return cleared
+        supabase.table(config.TABLE).update({column: None}).in_("id", [r["id"] for r in rows]).execute()
+        cleared += len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["status", "start", "run", "cutover", "abort", "cleanup"])
+    parser.add_argument("--model", help="new embedding model (start)")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--checkpoint", default="migration_checkpoint.json")
+    parser.add_argument("--force", action="store_true", help="cut over with rows still pending")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    supabase = clients.get_supabase()
+    try:
+        if args.command == "status":
+            print(json.dumps(status(supabase), indent=2))
+        elif args.command == "start":
+            if not args.model:
+                parser.error("start needs --model")
+            start(supabase, args.model)
+            logger.info("Dual-writing and dual-reading with %s", args.model)
+        elif args.command == "run":
+            from .store import get_store
+            count = run(supabase, get_store(), args.batch_size, args.workers, args.checkpoint)
+            logger.info("Run finished, %d rows migrated", count)
+        elif args.command == "cutover":
+            cutover(supabase, args.force)
+            logger.info("Cut over: %s", load_state(supabase))
+        elif args.command == "abort":
+            abort(supabase)
+        elif args.command == "cleanup":
+            logger.info("Cleared %d rows", cleanup(supabase, args.batch_size))
+    except MigrationError as e:
+        parser.exit(1, f"error: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
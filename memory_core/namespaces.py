@@ -0,0 +1,78 @@
+"""Per-user or per-workspace namespaces.
+
+Every project_memory row belongs to one namespace, and every read and write
+is scoped to the namespace of the current request: the UIs map the login
+password to a namespace (MEMORY_NAMESPACE_PASSWORDS) and wrap requests in
+namespace_scope(); the memory service uses the namespace its caller's token
+is bound to (MEMORY_SERVICE_TOKENS), or the X-Memory-Namespace header for
+tokens bound to any namespace.
+Code outside a scope uses MEMORY_DEFAULT_NAMESPACE. The store keeps a
+separate, lazily loaded index partition per namespace, so a search only
+scores the caller's own rows.
+"""
+import contextvars
+import hmac
+import json
+import re
+from contextlib import contextmanager
+
+from . import config
+
+current_namespace = contextvars.ContextVar("memory_namespace", default=None)
+
+# A memory-service token bound to this may act in any namespace
+ANY = "*"
+
+_NAME = re.compile(r"[a-z0-9][a-z0-9_-]{0,62}")
+
+
+def validate(namespace):
+    """`namespace` if it is a valid name (lowercase letters, digits, _ and -), else ValueError"""
+    if not isinstance(namespace, str) or not _NAME.fullmatch(namespace):
+        raise ValueError(f"Invalid namespace {namespace!r}")
+    return namespace
+
+
+def resolve(namespace=None):
+    """`namespace`, else the current one, else MEMORY_DEFAULT_NAMESPACE"""
+    return validate(namespace or current_namespace.get() or config.DEFAULT_NAMESPACE)
+
+
+@contextmanager
+def namespace_scope(namespace):
+    """Scope memory reads and writes inside the block to `namespace`"""
+    token = current_namespace.set(validate(namespace) if namespace else None)
+    try:
+        yield
+    finally:
+        current_namespace.reset(token)
+
+
+def scoped(query, namespace):
+    """Filter a project_memory query to one namespace"""
+    return query.eq("namespace", namespace)
+
+
+def for_password(password):
+    """The namespace a UI login password opens, or None when it opens none"""
+    if config.NAMESPACE_PASSWORDS:
+        namespaces = json.loads(config.NAMESPACE_PASSWORDS)
+        if password in namespaces:
+            return validate(namespaces[password])
+    if config.STREAMLIT_PASSWORD and password == config.STREAMLIT_PASSWORD:
+        return config.DEFAULT_NAMESPACE
+    return None
+
+
+def for_token(token):
+    """The namespace a memory-service token is bound to, ANY, or None when the token is unknown"""
+    tokens = json.loads(config.MEMORY_SERVICE_TOKENS) if config.MEMORY_SERVICE_TOKENS else {}
+    if config.MEMORY_SERVICE_TOKEN:
+        tokens.setdefault(config.MEMORY_SERVICE_TOKEN, config.DEFAULT_NAMESPACE)
+    bound = None
+    for known, namespace in tokens.items():
+        if token and hmac.compare_digest(token.encode(), known.encode()):
+            bound = namespace
+    if bound is None or bound == ANY:
+        return bound
+    return validate(bound)
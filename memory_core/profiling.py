@@ -0,0 +1,118 @@
+"""On-demand profiling of a single request.
+
+    with maybe_profile(enabled, "answer", session_id) as profile:
+        ...
+    profile.top  # slowest functions by own time
+
+cProfile records exact per-function times, saved as a .prof file (pstats,
+snakeviz). Meanwhile a background thread samples the profiled thread's stack
+every MEMORY_PROFILE_INTERVAL seconds and writes a .collapsed file with one
+"outer;...;inner count" line per stack, ready for flamegraph.pl or
+speedscope. The UIs turn this on per session from the Debug expander, or for
+every request with MEMORY_PROFILE=1.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from . import config
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    """Counts the stacks of one thread at a fixed interval"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="memory-profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class Profile:
+    """Where one profiled request's output went and its top functions"""
+
+    def __init__(self, label, session=None):
+        self.label = label
+        self.session = session
+        self.seconds = None
+        self.stats_path = None
+        self.collapsed_path = None
+        self.samples = 0
+        self.top = []
+
+    def save(self, profiler, stacks, directory, limit):
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(
+            directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{(self.session or 'process')[:8]}-{self.label}"
+        )
+        self.stats_path = stem + ".prof"
+        profiler.dump_stats(self.stats_path)
+        self.collapsed_path = stem + ".collapsed"
+        with open(self.collapsed_path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.samples = sum(stacks.values())
+
+        stats = pstats.Stats(profiler).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        self.top = [
+            {
+                "function": f"{name} ({os.path.basename(filename)}:{line})",
+                "calls": calls,
+                "own_s": round(own, 4),
+                "cumulative_s": round(cumulative, 4),
+            }
+            for (filename, line, name), (_, calls, own, cumulative, _) in rows
+        ]
+
+
+@contextmanager
+def profile(label="request", session=None, directory=None, limit=25):
+    """Profile the block; the yielded Profile is filled in when it exits"""
+    result = Profile(label, session)
+    profiler = cProfile.Profile()
+    sampler = _Sampler(threading.get_ident(), config.PROFILE_INTERVAL)
+    sampler.start()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        result.seconds = time.perf_counter() - start
+        sampler.stop()
+        result.save(profiler, sampler.stacks, directory or config.PROFILE_DIR, limit)
+
+
+@contextmanager
+def maybe_profile(enabled, label="request", session=None):
+    """profile() when `enabled` or MEMORY_PROFILE is set, otherwise yields None"""
+    if not (enabled or config.PROFILE):
+        yield None
+        return
+    with profile(label, session) as result:
+        yield result
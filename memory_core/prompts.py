@@ -0,0 +1,49 @@
+"""Prompt construction shared by every front-end."""
+
+SYSTEM_PROMPT = "You are a helpful AI assistant that helps users with their questions and manages their stored memories."
+
+
+def build_prompt(question, memories, conversation=None):
+    context = "\n".join(item["content"] for item in memories)
+    # Compact summary of the previous turns (see memory_core.conversation)
+    earlier = f"Conversation so far:\n{conversation}\n\n" if conversation else ""
+    if context:
+        return f"""You are a helpful AI assistant with access to the user's stored memories.
+
+{earlier}User Question: {question}
+
+Relevant Memories:
+{context}
+
+Please provide a helpful answer based on the user's question and the relevant memories above."""
+    return f"""You are a helpful AI assistant. {earlier}The user asked: {question}
+
+No relevant memories were found in the database. Please provide a helpful general response and suggest they might want to add relevant information to their memory first."""
+
+
+def build_messages(question, memories, conversation=None):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": build_prompt(question, memories, conversation)},
+    ]
+
+
+def build_summary_messages(notes):
+    """Prompt for the summary of one memory cluster"""
+    listed = "\n".join(f"- {note}" for note in notes)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"""These stored notes are closely related:
+
+{listed}
+
+Summarize what they have in common and the key facts they contain in 2-4 sentences. Only use information from the notes."""},
+    ]
+
+
+def retrieval_only_answer(memories):
+    """Reply used when the chat model is shed under load"""
+    if not memories:
+        return "The assistant is busy right now and no relevant memories were found. Please try again shortly."
+    lines = "\n".join(f"- {item['content']}" for item in memories)
+    return f"The assistant is busy right now, so here are the most relevant memories:\n\n{lines}"
@@ -0,0 +1,242 @@
+"""Retention rules, tombstones and Parquet archiving for project_memory.
+
+    python -m memory_core.retention run --interval 3600
+    python -m memory_core.retention status
+    python -m memory_core.retention forget 123 456 --namespace acme
+
+Deleting a memory (the `forget:` chat command, MemoryStore.delete or a
+retention rule) only tombstones it: deleted_at is set, and searches, counts
+and index loads skip the row from then on. Local indexes skip tombstoned ids
+and drop their rows in a background compaction. `run` applies
+MEMORY_RETENTION_RULES, then moves rows tombstoned more than
+MEMORY_ARCHIVE_AFTER_DAYS ago into a Parquet file under MEMORY_ARCHIVE_DIR (the
+snapshot format, so `python -m memory_core.snapshot restore` brings them back)
+and removes them from the table.
+
+Rules are a JSON list, inline or in a .json file:
+
+    [{"tag": "standup", "ttl_days": 30},
+     {"source": "import", "ttl_days": 365, "max_rows": 50000},
+     {"namespace": "*", "max_rows": 200000}]
+
+`tag` matches the #hashtags of a note, `source` its writer ("chat" for the
+UIs) and `namespace` its namespace, where "*" applies the rule to each
+namespace separately (a row cap per namespace); a rule with none of them
+applies to every row. `ttl_days` tombstones rows older than that and
+`max_rows` the oldest rows beyond the cap.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+from . import clients, config
+from .snapshot import iter_pages, live
+
+logger = logging.getLogger(__name__)
+
+_TAG = re.compile(r"(?<![\w#])#([A-Za-z][\w-]*)")
+_RULE_KEYS = {"tag", "source", "namespace", "ttl_days", "max_rows"}
+NAMESPACE_COUNTS = "memory_namespace_counts"
+BATCH = 500
+
+
+def tags_of(content):
+    """The #hashtags of a note, lowercased"""
+    return sorted({tag.lower() for tag in _TAG.findall(content)})
+
+
+def load_rules(spec=None):
+    """Validated rules from MEMORY_RETENTION_RULES (JSON, or the path of a JSON file)"""
+    spec = config.RETENTION_RULES if spec is None else spec
+    if not spec.strip():
+        return []
+    if not spec.lstrip().startswith("["):
+        with open(spec) as f:
+            spec = f.read()
+    rules = json.loads(spec)
+    for rule in rules:
+        unknown = set(rule) - _RULE_KEYS
+        if unknown:
+            raise ValueError(f"Unknown retention rule keys {sorted(unknown)} in {rule}")
+        if not rule.get("ttl_days") and not rule.get("max_rows"):
+            raise ValueError(f"Retention rule {rule} needs ttl_days or max_rows")
+    return rules
+
+
+def describe(rule):
+    scope = " ".join(f"{key}={rule[key]}" for key in ("namespace", "tag", "source") if rule.get(key)) or "all"
+    limits = " ".join(f"{key}={rule[key]}" for key in ("ttl_days", "max_rows") if rule.get(key))
+    return f"{scope}: {limits}"
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _scoped(query, rule):
+    if rule.get("tag"):
+        query = query.contains("tags", [rule["tag"].lower()])
+    if rule.get("source"):
+        query = query.eq("source", rule["source"])
+    if rule.get("namespace"):
+        query = query.eq("namespace", rule["namespace"])
+    return live(query)
+
+
+def namespace_counts(supabase):
+    """Live and tombstoned rows per namespace"""
+    rows = supabase.table(NAMESPACE_COUNTS).select("namespace, live_rows, tombstoned_rows").execute().data
+    return {row["namespace"]: {"live": row["live_rows"], "tombstoned": row["tombstoned_rows"]} for row in rows or []}
+
+
+def expand(supabase, rule):
+    """The rule itself, or one copy per namespace for {"namespace": "*"}"""
+    if rule.get("namespace") != "*":
+        return [rule]
+    return [dict(rule, namespace=namespace) for namespace in sorted(namespace_counts(supabase))]
+
+
+def tombstone(supabase, ids, namespace=None):
+    """Mark live `ids` (of `namespace`, default any) deleted. Returns the ids that were live."""
+    ids = list(ids)
+    done = []
+    for start in range(0, len(ids), BATCH):
+        # deleted_at comes from the database clock, which replicas' tombstone
+        # syncs compare against, not this host's
+        result = supabase.rpc("tombstone_project_memory", {
+            "row_ids": ids[start:start + BATCH],
+            "match_namespace": namespace,
+        }).execute()
+        done.extend(row["id"] for row in result.data or [])
+    return done
+
+
+def expired_ids(supabase, rule, now=None):
+    """Live ids in the rule's scope past its TTL or beyond its row cap, oldest first"""
+    table = config.TABLE
+    ids = []
+    if rule.get("ttl_days"):
+        cutoff = ((now or _now()) - timedelta(days=rule["ttl_days"])).isoformat()
+        ids += [
+            row["id"] for page in iter_pages(
+                supabase, BATCH, "id", where=lambda q: _scoped(q, rule).lt("created_at", cutoff)
+            ) for row in page
+        ]
+    if rule.get("max_rows"):
+        count = _scoped(supabase.table(table).select("id", count="exact").limit(1), rule).execute().count or 0
+        excess = count - rule["max_rows"] - len(ids)
+        seen = set(ids)
+        offset = 0
+        while excess > 0:
+            rows = (_scoped(supabase.table(table).select("id"), rule)
+                    .order("created_at").order("id").range(offset, offset + BATCH - 1).execute().data or [])
+            if not rows:
+                break
+            for row in rows:
+                if row["id"] not in seen and excess > 0:
+                    ids.append(row["id"])
+                    excess -= 1
+            offset += len(rows)
+    return ids
+
+
+def archive(supabase, directory=None, after_days=None, column="embedding", model=None):
+    """Move rows tombstoned more than `after_days` ago into a Parquet file.
+
+    Rows without a valid `column` vector are archived with a null one. Returns
+    (path, rows archived); rows are removed from the table only after the file
+    is complete.
+    """
+    import pyarrow.parquet as pq
+    from .snapshot import EXPORT_COLUMNS, WRITE_OPTIONS, rows_to_batch, schema
+    directory = directory or config.ARCHIVE_DIR
+    after_days = config.ARCHIVE_AFTER_DAYS if after_days is None else after_days
+    cutoff = (_now() - timedelta(days=after_days)).isoformat()
+    pages = iter_pages(supabase, BATCH, f"{EXPORT_COLUMNS}, {column}",
+                       where=lambda q: q.lt("deleted_at", cutoff))
+    first = next(pages, None)
+    if first is None:
+        return None, 0
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{config.TABLE}-{time.strftime('%Y%m%d-%H%M%S')}.parquet")
+    archived = []
+    with pq.ParquetWriter(path, schema(model=model), **WRITE_OPTIONS) as writer:
+        for rows in itertools.chain([first], pages):
+            batch = rows_to_batch(rows, column=column, model=model, keep_invalid=True)
+            writer.write_batch(batch)
+            archived.extend(batch.column(0).to_pylist())
+    for start in range(0, len(archived), BATCH):
+        supabase.table(config.TABLE).delete().in_("id", archived[start:start + BATCH]).execute()
+    return path, len(archived)
+
+
+def run(store, rules=None, archive_rows=True):
+    """One retention pass: apply the rules, archive cold tombstones, compact the local index"""
+    rules = load_rules() if rules is None else rules
+    supabase = store.supabase
+    report = {"tombstoned": {}, "archived": 0, "archive": None}
+    now = _now()
+    for rule in (scoped_rule for rule in rules for scoped_rule in expand(supabase, rule)):
+        ids = expired_ids(supabase, rule, now)
+        deleted = tombstone(supabase, ids) if ids else []
+        if deleted:
+            store.drop(deleted)
+        report["tombstoned"][describe(rule)] = len(deleted)
+    if archive_rows:
+        state = store.embedding_state()
+        report["archive"], report["archived"] = archive(
+            supabase, column=state["active_column"], model=state["active_model"]
+        )
+    report["compacted"] = store.compact()
+    return report
+
+
+def status(supabase):
+    table = config.TABLE
+    total = supabase.table(table).select("id", count="exact").limit(1).execute().count or 0
+    live_rows = live(supabase.table(table).select("id", count="exact").limit(1)).execute().count or 0
+    try:
+        namespaces = namespace_counts(supabase)
+    except Exception as e:
+        logger.debug("No %s view: %s", NAMESPACE_COUNTS, e)
+        namespaces = None
+    return {
+        "live": live_rows,
+        "tombstoned": total - live_rows,
+        "namespaces": namespaces,
+        "rules": [describe(rule) for rule in load_rules()],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["run", "status", "forget"])
+    parser.add_argument("ids", nargs="*", type=int, help="memory ids to forget")
+    parser.add_argument("--no-archive", action="store_true", help="apply the rules but keep tombstoned rows")
+    parser.add_argument("--interval", type=float, default=0, help="run every N seconds (0 = once)")
+    parser.add_argument("--namespace", default=None, help="namespace of the ids to forget (default MEMORY_DEFAULT_NAMESPACE)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.command == "status":
+        print(status(clients.get_supabase()))
+        return
+    from .store import get_store
+    store = get_store()
+    if args.command == "forget":
+        logger.info("Tombstoned %s", store.delete(args.ids, args.namespace))
+        return
+    while True:
+        logger.info("Retention pass: %s", run(store, archive_rows=not args.no_archive))
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
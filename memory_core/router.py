@@ -0,0 +1,77 @@
+"""Answer-mode routing: extractive lookups vs generated answers.
+
+A direct lookup ("what's the door code?") is answered by its best memory
+alone, so when the question classifies as a lookup and the top hit clears
+MEMORY_EXTRACTIVE_MIN_SIMILARITY and beats the runner-up by
+MEMORY_EXTRACTIVE_MARGIN, MemoryStore.answer returns that memory as the
+answer without a chat completion. The UIs then offer "Expand with AI", which
+asks again with mode="generate". AnswerStats tracks the share of answers
+served each way and their latency.
+"""
+import re
+import threading
+from collections import Counter, deque
+
+from .clusters import is_broad
+
+_LOOKUP = re.compile(
+    r"^\s*(what('s| is| are| was)?|which|where('s| is| are)?|when('s| is| was)?|who('s| is)?|whose|"
+    r"how (much|many|long|old|often))\b",
+    re.IGNORECASE,
+)
+_NOT_LOOKUP = re.compile(
+    r"\b(why|explain|compare|difference|recommend|suggest|should|pros|cons|plan|draft|write|ideas?|"
+    r"how (do|does|did|can|could|should|would|to))\b",
+    re.IGNORECASE,
+)
+MAX_LOOKUP_WORDS = 12
+
+
+def is_lookup(question):
+    """Short factual questions a single stored note can answer"""
+    return (
+        len(question.split()) <= MAX_LOOKUP_WORDS
+        and bool(_LOOKUP.search(question))
+        and not _NOT_LOOKUP.search(question)
+        and not is_broad(question)
+    )
+
+
+def extractive_hit(question, memories, min_similarity, margin):
+    """The memory to answer `question` with verbatim, or None"""
+    if not memories or isinstance(memories[0]["id"], str) or not is_lookup(question):
+        return None
+    top = memories[0]["similarity"]
+    runner_up = memories[1]["similarity"] if len(memories) > 1 else 0.0
+    if top >= min_similarity and top - runner_up >= margin:
+        return memories[0]
+    return None
+
+
+class AnswerStats:
+    """Answers and latency per mode (extractive, generated, retrieval_only)"""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.counts = Counter()
+        self.latencies = {}
+        self.window = window
+
+    def record(self, mode, seconds):
+        with self._lock:
+            self.counts[mode] += 1
+            self.latencies.setdefault(mode, deque(maxlen=self.window)).append(seconds)
+
+    def stats(self):
+        with self._lock:
+            total = sum(self.counts.values())
+            report = {"answers": total}
+            for mode, latencies in self.latencies.items():
+                latencies = sorted(latencies)
+                report[mode] = {
+                    "count": self.counts[mode],
+                    "share": round(self.counts[mode] / total, 3),
+                    "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+                    "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+                }
+        return report
@@ -0,0 +1,121 @@
+"""Streaming keyset scan of project_memory.
+
+PostgREST caps every response (1000 rows by default), so a single select only
+ever sees part of the table. scan_pages() walks the whole table in id order,
+page by page, with the next pages fetched in the background while the
+current one is consumed: one worker stays a page ahead, several split the id
+range and page their slices concurrently. At most two pages per worker are
+buffered, so memory stays bounded whatever the table size.
+
+scan_search() scores each page as it arrives and keeps a running heap of the
+best `limit` hits, which is what MEMORY_SEARCH_BACKEND=scan uses instead of
+holding a local index.
+"""
+import heapq
+import queue
+import threading
+
+import numpy as np
+
+from . import config
+from .codec import parse_vector
+from .index import normalize, top_k
+from .snapshot import iter_pages, live
+
+_DONE = object()
+
+
+def _id_bounds(supabase):
+    table = config.TABLE
+    first = supabase.table(table).select("id").order("id").limit(1).execute().data
+    last = supabase.table(table).select("id").order("id", desc=True).limit(1).execute().data
+    if not first or not last:
+        return None, None
+    return first[0]["id"], last[0]["id"]
+
+
+def _slices(low, high, parts):
+    """(after, upto) id ranges covering low..high; the last one is open-ended"""
+    step = -(-(high - low + 1) // parts)
+    slices = [(low - 1 + i * step, low - 1 + (i + 1) * step) for i in range(parts)]
+    slices[-1] = (slices[-1][0], None)
+    return slices
+
+
+def scan_pages(supabase, columns, page_size=None, workers=None, where=live):
+    """Yield lists of live rows covering the whole table, prefetched by `workers` threads.
+
+    `where` filters each page query (default: skip tombstoned rows).
+    """
+    page_size = page_size or config.SCAN_PAGE_SIZE
+    workers = max(1, workers or config.SCAN_WORKERS)
+    if workers == 1:
+        slices = [(None, None)]
+    else:
+        low, high = _id_bounds(supabase)
+        if low is None:
+            return
+        slices = _slices(low, high, workers)
+
+    pages = queue.Queue(maxsize=2 * len(slices))
+    stop = threading.Event()
+
+    def fetch(after, upto):
+        try:
+            def page_where(query):
+                query = query if where is None else where(query)
+                return query if upto is None else query.lte("id", upto)
+            for page in iter_pages(supabase, page_size, columns, after, page_where):
+                if stop.is_set():
+                    return
+                pages.put(page)
+        except Exception as e:
+            pages.put(e)
+        finally:
+            pages.put(_DONE)
+
+    threads = [threading.Thread(target=fetch, args=s, name="memory-scan", daemon=True) for s in slices]
+    for thread in threads:
+        thread.start()
+    remaining = len(threads)
+    try:
+        while remaining:
+            item = pages.get()
+            if item is _DONE:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        # Unblock fetchers waiting on a full queue if the consumer stopped early
+        stop.set()
+        while any(thread.is_alive() for thread in threads):
+            try:
+                pages.get(timeout=0.05)
+            except queue.Empty:
+                pass
+
+
+def scan_search(supabase, query_embedding, threshold, limit, column="embedding", page_size=None, workers=None,
+                where=live):
+    """Best `limit` matches over the rows `where` selects as {id, similarity}, in constant memory"""
+    query = normalize(np.asarray(query_embedding, dtype=np.float32))
+    best = []  # min-heap of (similarity, id)
+    for page in scan_pages(supabase, f"id, {column}", page_size, workers, where):
+        ids, vectors = [], []
+        for row in page:
+            vector = parse_vector(row.get(column))
+            if vector is not None and vector.shape == query.shape:
+                ids.append(row["id"])
+                vectors.append(vector)
+        if not ids:
+            continue
+        scores = normalize(np.vstack(vectors)) @ query
+        for i in top_k(scores, limit, threshold):
+            item = (float(scores[i]), ids[i])
+            if len(best) < limit:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+    return [{"id": id_, "similarity": score} for score, id_ in sorted(best, reverse=True)]
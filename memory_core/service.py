@@ -0,0 +1,181 @@
+"""Headless HTTP/JSON memory service.
+
+Holds one warm MemoryStore (local index, query-embedding cache, stats cache)
+so any number of UI replicas can share a single retrieval backend:
+
+    MEMORY_SERVICE_TOKEN=... python -m memory_core.service --port 8600
+    MEMORY_SERVICE_TOKEN=... MEMORY_SERVICE_URL=http://localhost:8600 streamlit run app.py
+
+It binds 127.0.0.1 by default (--host 0.0.0.0 for other machines) and refuses
+to start without MEMORY_SERVICE_TOKEN or MEMORY_SERVICE_TOKENS. Every endpoint
+but /health and /ready needs an "Authorization: Bearer <token>" header with a
+known token, else 401.
+
+Endpoints:
+    GET  /health                                  liveness
+    GET  /ready                                   warm-up status, 503 until warm or if a step failed
+    GET  /stats                                   row count, index and cache stats
+    GET  /check                                   database / RPC connectivity
+    POST /add       {"content", "source"}         -> {"memory"}
+    POST /bulk_add  {"contents": [...], "source"} -> {"memories"}
+    POST /forget    {"query"}                     -> {"memories"} tombstoned
+    POST /search    {"query", "threshold", "limit"} -> {"memories"}
+    POST /answer    {"question", "threshold", "limit", "mode"} -> {"answer", "memories", "usage", "mode"}
+    POST /end_conversation {}                     forget the session's retrieval context
+
+Requests carrying an X-Memory-Session header are fair-queued per session for
+OpenAI calls (see memory_core.admission); others per client address. Calls
+shed under load return 503. A request reads and writes the namespace its token
+is bound to; an X-Memory-Namespace header naming another one returns 403.
+Tokens bound to any namespace ("*") pick it with that header (default
+MEMORY_DEFAULT_NAMESPACE); an invalid one returns 400.
+"""
+import argparse
+import json
+import logging
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import config
+from .admission import Overloaded, session_scope
+from .namespaces import ANY, for_token, namespace_scope
+from .store import get_store
+
+logger = logging.getLogger(__name__)
+
+
+def _add(store, body):
+    return {"memory": store.add(body["content"], body.get("source"))}
+
+
+def _bulk_add(store, body):
+    return {"memories": store.bulk_add(body["contents"], body.get("source"))}
+
+
+def _forget(store, body):
+    return {"memories": store.forget(body["query"])}
+
+
+def _search(store, body):
+    return {"memories": store.search(body["query"], body.get("threshold"), body.get("limit"))}
+
+
+def _answer(store, body):
+    return store.answer(body["question"], body.get("threshold"), body.get("limit"), body.get("mode") or "auto")
+
+
+def _end_conversation(store, body):
+    store.end_conversation()
+    return {"ended": True}
+
+
+GET_ROUTES = {
+    "/health": lambda store: {"status": "ok"},
+    "/stats": lambda store: store.stats(),
+    "/check": lambda store: store.check(),
+}
+
+# Platform liveness/readiness probes, served without the service token
+PUBLIC_PATHS = {"/health", "/ready"}
+
+POST_ROUTES = {
+    "/add": _add,
+    "/bulk_add": _bulk_add,
+    "/forget": _forget,
+    "/search": _search,
+    "/answer": _answer,
+    "/end_conversation": _end_conversation,
+}
+
+
+class MemoryRequestHandler(BaseHTTPRequestHandler):
+    server_version = "MemoryService/1.0"
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, default=float).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _caller_namespace(self):
+        """The namespace the request's token is bound to, ANY, or None for an unknown token"""
+        scheme, _, token = (self.headers.get("Authorization") or "").partition(" ")
+        return for_token(token.strip()) if scheme.lower() == "bearer" else None
+
+    def _dispatch(self, handler, *args):
+        namespace = self.headers.get("X-Memory-Namespace")
+        if self.path.split("?")[0] in PUBLIC_PATHS:
+            namespace = None
+        else:
+            bound = self._caller_namespace()
+            if bound is None:
+                return self._send(401, {"error": "Missing or invalid service token"})
+            if bound != ANY:
+                if namespace and namespace != bound:
+                    return self._send(403, {"error": f"Token is not allowed namespace {namespace!r}"})
+                namespace = bound
+        session = self.headers.get("X-Memory-Session") or self.client_address[0]
+        try:
+            with namespace_scope(namespace), session_scope(session):
+                self._send(200, handler(get_store(), *args))
+        except Overloaded as e:
+            self._send(503, {"error": str(e)})
+        except (KeyError, ValueError, TypeError) as e:
+            self._send(400, {"error": f"Bad request: {e}"})
+        except Exception as e:
+            logger.exception("Request to %s failed", self.path)
+            self._send(500, {"error": str(e)})
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/ready":
+            status = get_store().ready()
+            return self._send(200 if status["ready"] else 503, status)
+        handler = GET_ROUTES.get(self.path.split("?")[0])
+        if handler is None:
+            return self._send(404, {"error": "Not found"})
+        self._dispatch(handler)
+
+    def do_POST(self):
+        handler = POST_ROUTES.get(self.path.split("?")[0])
+        if handler is None:
+            return self._send(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send(400, {"error": "Body must be JSON"})
+        self._dispatch(handler, body)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def serve(host=None, port=8600):
+    host = host or config.MEMORY_SERVICE_HOST
+    if not (config.MEMORY_SERVICE_TOKEN or config.MEMORY_SERVICE_TOKENS):
+        raise SystemExit("Set MEMORY_SERVICE_TOKEN or MEMORY_SERVICE_TOKENS before starting the memory service")
+    server = ThreadingHTTPServer((host, port), MemoryRequestHandler)
+    server.daemon_threads = True
+    # Warms in the background (its check logs an error when match_project_memory
+    # is missing); point the platform health check at /ready
+    get_store().warm_up()
+    logger.info("Memory service listening on %s:%s", host, port)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the headless memory service")
+    parser.add_argument("--host", default=config.MEMORY_SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8600")))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""Publish the local index into shared memory so worker processes share one copy.
+
+A writer packs ids and the normalized embedding matrix into a fresh
+`multiprocessing.shared_memory` segment per generation, then bumps a
+generation counter in a small control segment. Readers map the current
+generation zero-copy and re-check the counter on every search; when it moves
+they attach the new segment and drop the old one, so a swap is atomic from
+the reader's point of view and RSS does not grow with the number of workers.
+
+    python -m memory_core.shared_index publish              # every 60s; --interval 0 for once
+    MEMORY_SHARED_INDEX=corval_memory streamlit run app.py
+
+Each namespace is published under its own name (see namespace_name);
+`publish --namespace acme` publishes one that is not the default.
+
+Ids must be integers (project_memory.id is a bigint). Contents are not
+published; like LocalIndex, searches return ids and scores for the store to
+hydrate. A generation also carries the ids tombstoned in the publisher's
+index and when the publisher started reading the table; readers skip those
+ids plus every id deleted later (delete(), fed by the store's tombstone
+sync, which starts no later than that time). Rows a process writes itself go
+into a small private LocalIndex (add()) that searches merge in, so its own
+writes are visible at once; they leave it once a published generation holds
+them. `publish` republishes every --interval seconds (60 by default) so
+other processes' writes show up too.
+"""
+import argparse
+import logging
+import struct
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from . import config
+from .index import LocalIndex, normalize, search_matrix
+
+logger = logging.getLogger(__name__)
+
+_CONTROL = struct.Struct("<QQ")  # generation, reserved
+_HEADER = struct.Struct("<QQQQQ")  # magic, rows, dim, tombstones, loaded_at (microseconds since the epoch)
+_MAGIC = 0x4D454D49445833  # "MEMIDX3"
+_ALIGN = 64
+
+
+def _align(n):
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _segment_name(name, generation):
+    return f"{name}_g{generation}"
+
+
+def _untrack(shm):
+    # Segments outlive the process that created or attached them; stop the
+    # resource tracker from unlinking them at interpreter exit.
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+def _unlink(name):
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    # unlink() unregisters from the tracker itself, which expects it registered
+    shm.unlink()
+
+
+def _open(name, create=False, size=0):
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    _untrack(shm)
+    return shm
+
+
+def _layout(rows, dim, tombstones):
+    ids_at = _align(_HEADER.size)
+    tombstones_at = _align(ids_at + 8 * rows)
+    matrix_at = _align(tombstones_at + 8 * tombstones)
+    return ids_at, tombstones_at, matrix_at, matrix_at + 4 * rows * dim
+
+
+def current_generation(name):
+    """Published generation for `name`, or 0 when nothing has been published"""
+    try:
+        ctl = _open(f"{name}_ctl")
+    except FileNotFoundError:
+        return 0
+    try:
+        return _CONTROL.unpack_from(ctl.buf, 0)[0]
+    finally:
+        ctl.close()
+
+
+def publish(name, ids, matrix, normalized=False, tombstones=(), loaded_at=None):
+    """Write a new generation of the index and make it current. Returns the generation.
+
+    `tombstones` are ids of `ids` that searches must skip; `loaded_at` (a
+    POSIX time, default now) is when the rows were read from the table.
+    """
+    try:
+        ctl = _open(f"{name}_ctl")
+    except FileNotFoundError:
+        ctl = _open(f"{name}_ctl", create=True, size=_CONTROL.size)
+        _CONTROL.pack_into(ctl.buf, 0, 0, 0)
+    try:
+        previous = _CONTROL.unpack_from(ctl.buf, 0)[0]
+        generation = previous + 1
+
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if not normalized:
+            matrix = normalize(matrix)
+        rows, dim = matrix.shape
+        tombstones = np.fromiter(tombstones, dtype=np.int64)
+        loaded_at = time.time() if loaded_at is None else loaded_at
+        ids_at, tombstones_at, matrix_at, size = _layout(rows, dim, len(tombstones))
+
+        shm = _open(_segment_name(name, generation), create=True, size=max(size, 1))
+        try:
+            _HEADER.pack_into(shm.buf, 0, _MAGIC, rows, dim, len(tombstones), int(loaded_at * 1e6))
+            np.frombuffer(shm.buf, np.int64, rows, ids_at)[:] = np.asarray(ids, dtype=np.int64)
+            np.frombuffer(shm.buf, np.int64, len(tombstones), tombstones_at)[:] = tombstones
+            np.frombuffer(shm.buf, np.float32, rows * dim, matrix_at)[:] = matrix.ravel()
+        finally:
+            shm.close()
+
+        # The 8-byte counter store is the commit point for readers
+        _CONTROL.pack_into(ctl.buf, 0, generation, 0)
+    finally:
+        ctl.close()
+
+    # Readers that already mapped the old generation keep their mapping;
+    # unlinking only removes the name so no new reader can attach it.
+    if previous:
+        _unlink(_segment_name(name, previous))
+    return generation
+
+
+def unpublish(name):
+    """Remove the current generation and the control segment"""
+    generation = current_generation(name)
+    for segment in (_segment_name(name, generation), f"{name}_ctl"):
+        _unlink(segment)
+
+
+class _Generation:
+    """Zero-copy views over one published segment"""
+
+    def __init__(self, name, generation):
+        self.generation = generation
+        self.shm = _open(_segment_name(name, generation))
+        magic, rows, dim, tombstones, loaded_at = _HEADER.unpack_from(self.shm.buf, 0)
+        if magic != _MAGIC:
+            self.shm.close()
+            raise ValueError(f"Segment {self.shm.name} is not a memory index")
+        ids_at, tombstones_at, matrix_at, _ = _layout(rows, dim, tombstones)
+        self.dim = dim
+        self.loaded_at = loaded_at / 1e6
+        self.tombstones = frozenset(np.frombuffer(self.shm.buf, np.int64, tombstones, tombstones_at).tolist())
+        self.ids = np.frombuffer(self.shm.buf, np.int64, rows, ids_at)
+        self.matrix = np.frombuffer(self.shm.buf, np.float32, rows * dim, matrix_at).reshape(rows, dim)
+        self._positions = None
+
+    def positions(self):
+        """{id: row}, built on first use"""
+        if self._positions is None:
+            self._positions = {id_: row for row, id_ in enumerate(self.ids.tolist())}
+        return self._positions
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __del__(self):
+        # Views must go before the mapping can be closed
+        self.ids = self.matrix = self._positions = None
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+
+
+class SharedIndexReader:
+    """Search the current published generation; same interface as LocalIndex.search"""
+
+    def __init__(self, name, attempts=5):
+        self.name = name
+        self.attempts = attempts
+        self._ctl = None
+        self._current = None
+        # Ids deleted since the publisher read the table, replaced as a whole
+        self._deleted = frozenset()
+        # This process's writes that no attached generation holds yet
+        self._local = None
+        self._lock = threading.Lock()
+
+    def _generation(self):
+        if self._ctl is None:
+            self._ctl = _open(f"{self.name}_ctl")
+        return _CONTROL.unpack_from(self._ctl.buf, 0)[0]
+
+    def view(self):
+        """The current generation, attaching a newer one if it was published"""
+        for _ in range(self.attempts):
+            generation = self._generation()
+            current = self._current
+            if current is not None and current.generation == generation:
+                return current
+            if generation == 0:
+                raise FileNotFoundError(f"No index published under {self.name!r}")
+            try:
+                current = _Generation(self.name, generation)
+            except FileNotFoundError:
+                # Writer published again and unlinked this one; re-read the counter
+                continue
+            with self._lock:
+                # Deleted ids the new generation no longer holds need no skipping
+                deleted = np.fromiter(self._deleted, dtype=np.int64)
+                self._deleted = frozenset(deleted[np.isin(deleted, current.ids)].tolist())
+                self._current = current
+                local = self._local
+            if local is not None and len(local):
+                # Own writes the new generation holds are searched there now
+                ids, _ = local.snapshot()
+                published = np.asarray(ids, dtype=np.int64)[np.isin(ids, current.ids)]
+                if len(published):
+                    local.delete(published.tolist())
+                    local.compact()
+            return current
+        raise FileNotFoundError(f"Could not attach index {self.name!r}")
+
+    def attach(self):
+        """True when a generation is published and mapped"""
+        try:
+            self.view()
+            return True
+        except FileNotFoundError:
+            return False
+
+    @property
+    def generation(self):
+        current = self._current
+        return current.generation if current else 0
+
+    @property
+    def loaded_at(self):
+        """When the current generation's rows were read from the table (POSIX time), or None"""
+        current = self._current
+        return current.loaded_at if current else None
+
+    @property
+    def tombstones(self):
+        current = self._current
+        return (current.tombstones if current else frozenset()) | self._deleted
+
+    def add(self, ids, vectors):
+        """Make rows this process just wrote searchable before they are published"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1)
+        with self._lock:
+            if self._local is None:
+                self._local = LocalIndex(vectors.shape[1])
+        self._local.add(ids, vectors)
+
+    def delete(self, ids):
+        """Skip `ids` in searches until a generation without them is attached"""
+        with self._lock:
+            self._deleted = self._deleted | frozenset(ids)
+        if self._local is not None:
+            self._local.delete(ids)
+
+    def __len__(self):
+        current = self._current
+        return (len(current) if current else 0) + (len(self._local) if self._local is not None else 0)
+
+    def snapshot(self):
+        """(ids, matrix) of the current generation plus this process's unpublished rows, like LocalIndex.snapshot"""
+        current = self.view()
+        if self._local is None or not len(self._local):
+            return current.ids, current.matrix
+        ids, matrix = self._local.snapshot()
+        return np.concatenate([current.ids, np.asarray(ids, dtype=np.int64)]), np.vstack([current.matrix, matrix])
+
+    def vectors(self, rows, view=None):
+        """Unit vectors of published row numbers `rows`, like LocalIndex.vectors"""
+        return (view or self.view()).matrix[rows]
+
+    def lookup(self, ids):
+        """{id: unit vector} of the live `ids` published or written by this process, like LocalIndex.lookup"""
+        current = self.view()
+        positions = current.positions()
+        tombstones = current.tombstones | self._deleted
+        found = [id_ for id_ in ids if id_ in positions and id_ not in tombstones]
+        vectors = dict(zip(found, current.matrix[[positions[id_] for id_ in found]]))
+        local = self._local
+        if local is not None and len(local):
+            vectors.update(local.lookup([id_ for id_ in ids if id_ not in vectors]))
+        return vectors
+
+    def search(self, query_embedding, threshold, limit):
+        current = self.view()
+        query = normalize(np.asarray(query_embedding, dtype=np.float32))
+        hits = []
+        if len(current):
+            tombstones = current.tombstones | self._deleted
+            # Over-fetch by the tombstone count so `limit` live rows survive the filter
+            rows, scores = search_matrix(current.matrix, query, limit + len(tombstones), threshold)
+            hits = [{"id": int(current.ids[i]), "similarity": float(s)} for i, s in zip(rows, scores)]
+            hits = [hit for hit in hits if hit["id"] not in tombstones][:limit]
+        local = self._local
+        if local is not None and len(local):
+            seen = {hit["id"] for hit in hits}
+            hits += [hit for hit in local.search(query, threshold, limit) if hit["id"] not in seen]
+            hits.sort(key=lambda hit: hit["similarity"], reverse=True)
+        return hits[:limit]
+
+
+def namespace_name(name, namespace=None):
+    """The published name of a namespace's index: `name` itself for the default namespace"""
+    namespace = namespace or config.DEFAULT_NAMESPACE
+    return name if namespace == config.DEFAULT_NAMESPACE else f"{name}_{namespace}"
+
+
+def publish_store(name, store, namespace=None):
+    """Reload a namespace's local index from the table and publish it"""
+    loaded_at = time.time()
+    store.partition(namespace).index_loaded = False
+    index = store.ensure_local_index(namespace)
+    ids, matrix = index.snapshot()
+    return publish(namespace_name(name, namespace), ids, matrix, normalized=True,
+                   tombstones=index.tombstones, loaded_at=loaded_at)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish project_memory into shared memory")
+    parser.add_argument("command", choices=["publish", "unpublish", "status"])
+    parser.add_argument("--name", default=config.SHARED_INDEX_NAME or "corval_memory")
+    parser.add_argument("--interval", type=float, default=60, help="republish every N seconds (0 = once)")
+    parser.add_argument("--namespace", default=None, help="namespace to publish (default MEMORY_DEFAULT_NAMESPACE)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    from .namespaces import resolve
+    namespace = resolve(args.namespace)
+    name = namespace_name(args.name, namespace)
+    if args.command == "status":
+        print(f"{name}: generation {current_generation(name)}")
+        return
+    if args.command == "unpublish":
+        unpublish(name)
+        return
+
+    from .store import get_store
+    store = get_store()
+    while True:
+        start = time.perf_counter()
+        generation = publish_store(args.name, store, namespace)
+        logger.info("Published %s generation %d (%d rows) in %.2fs",
+                    name, generation, len(store.partition(namespace).index), time.perf_counter() - start)
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Columnar Parquet snapshots of project_memory.
+
+Export streams the table page by page (keyset on id) into a Parquet file whose
+`embedding` column is a fixed_size_list<float32>[EMBEDDING_DIM], so the
+vectors are stored as raw floats instead of JSON text. Reading a snapshot
+memory-maps the file and hands the embedding buffers to NumPy without any
+per-row Python conversion, which is what the local index build and restore use.
+A file that is a single row group is read without copying the vectors at all;
+exports stream one row group per page, which read_snapshot copies once into a
+contiguous matrix. Snapshots carry every column restore writes back: id,
+content, created_at, namespace, tags, source and the vector.
+
+A snapshot holds one namespace (recorded in its metadata; stores only load a
+snapshot of their own namespace); retention archives hold rows of any
+namespace, each restored into the namespace in its `namespace` column, and
+keep rows that had no valid vector with a null one (restore only, never
+loaded into an index).
+
+    python -m memory_core.snapshot export memory.parquet --namespace acme
+    python -m memory_core.snapshot info memory.parquet
+    python -m memory_core.snapshot restore memory.parquet --batch-size 500
+"""
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from . import clients, config
+from .generations import load_state
+from .codec import parse_vector, to_pgvector
+
+logger = logging.getLogger(__name__)
+
+
+# Embedding floats don't compress; skipping the codec and dictionary keeps reads fast
+WRITE_OPTIONS = {
+    "compression": {"id": "zstd", "content": "zstd", "created_at": "zstd", "namespace": "zstd", "tags": "zstd",
+                    "source": "zstd", "embedding": "none"},
+    "use_dictionary": ["created_at", "namespace", "tags", "source"],
+}
+
+
+def schema(dim=None, model=None, namespace=None):
+    import pyarrow as pa
+    metadata = {"embedding_model": model or config.EMBEDDING_MODEL, "table": config.TABLE}
+    if namespace:
+        metadata["namespace"] = namespace
+    return pa.schema([
+        ("id", pa.int64()),
+        ("content", pa.string()),
+        ("created_at", pa.string()),
+        ("namespace", pa.string()),
+        ("tags", pa.list_(pa.string())),
+        ("source", pa.string()),
+        ("embedding", pa.list_(pa.float32(), dim or config.EMBEDDING_DIM)),
+    ], metadata=metadata)
+
+
+# Table columns a snapshot or archive keeps besides the vector column
+EXPORT_COLUMNS = "id, content, created_at, namespace, tags, source"
+
+
+def snapshot_model(path):
+    """Embedding model recorded in a snapshot's schema metadata"""
+    import pyarrow.parquet as pq
+    metadata = pq.read_schema(path).metadata or {}
+    return metadata.get(b"embedding_model", b"").decode() or None
+
+
+def snapshot_namespace(path):
+    """Namespace a snapshot was exported from, or None for archives and older snapshots"""
+    import pyarrow.parquet as pq
+    metadata = pq.read_schema(path).metadata or {}
+    return metadata.get(b"namespace", b"").decode() or None
+
+
+def live(query):
+    """Filter a project_memory query to rows that are not tombstoned (see memory_core.retention)"""
+    return query.is_("deleted_at", "null")
+
+
+def iter_pages(supabase, page_size=1000, columns="id, content, created_at, embedding", after=None, where=None):
+    """Yield lists of rows with id > `after` in id order, one PostgREST request per page.
+
+    `where` may add filters to each page query.
+    """
+    last_id = after
+    while True:
+        query = supabase.table(config.TABLE).select(columns).order("id").limit(page_size)
+        if where is not None:
+            query = where(query)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data or []
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["id"]
+        if len(rows) < page_size:
+            return
+
+
+def rows_to_batch(rows, dim=None, column="embedding", model=None, namespace=None, keep_invalid=False):
+    """Arrow record batch for table rows; rows without a valid embedding are skipped, or kept with a null one"""
+    import pyarrow as pa
+    dim = dim or config.EMBEDDING_DIM
+    kept, vectors, missing = [], [], []
+    for row in rows:
+        vector = parse_vector(row.get(column))
+        if vector is None or vector.shape != (dim,):
+            if not keep_invalid:
+                continue
+            vector = None
+        kept.append(row)
+        vectors.append(np.zeros(dim, dtype=np.float32) if vector is None else vector)
+        missing.append(vector is None)
+    flat = np.concatenate(vectors) if vectors else np.empty(0, dtype=np.float32)
+    mask = pa.array(missing, pa.bool_()) if any(missing) else None
+    return pa.RecordBatch.from_arrays([
+        pa.array([r["id"] for r in kept], pa.int64()),
+        pa.array([r["content"] for r in kept], pa.string()),
+        pa.array([r.get("created_at") for r in kept], pa.string()),
+        pa.array([r.get("namespace") or namespace for r in kept], pa.string()),
+        pa.array([r.get("tags") for r in kept], pa.list_(pa.string())),
+        pa.array([r.get("source") for r in kept], pa.string()),
+        pa.FixedSizeListArray.from_arrays(pa.array(flat, pa.float32()), dim, mask=mask),
+    ], schema=schema(dim, model, namespace))
+
+
+def export_snapshot(path, supabase=None, page_size=1000, column="embedding", model=None, namespace=None):
+    """Stream a namespace's `column` vectors into a Parquet file. Returns the number of rows written."""
+    import pyarrow.parquet as pq
+    supabase = supabase or clients.get_supabase()
+    namespace = namespace or config.DEFAULT_NAMESPACE
+    written = 0
+    columns = f"{EXPORT_COLUMNS}, {column}"
+    with pq.ParquetWriter(path, schema(model=model, namespace=namespace), **WRITE_OPTIONS) as writer:
+        for rows in iter_pages(supabase, page_size, columns, where=lambda q: live(q).eq("namespace", namespace)):
+            batch = rows_to_batch(rows, column=column, model=model, namespace=namespace)
+            writer.write_batch(batch)
+            written += batch.num_rows
+    return written
+
+
+def read_snapshot(path, contents=True):
+    """(ids, contents, matrix) from a snapshot.
+
+    With a single row group the matrix views the Arrow buffer; otherwise each
+    row group's vectors are copied once into one contiguous matrix.
+    """
+    import pyarrow.parquet as pq
+    columns = ["id", "content", "embedding"] if contents else ["id", "embedding"]
+    table = pq.read_table(path, columns=columns, memory_map=True)
+    ids = table["id"].to_numpy()
+    contents = table["content"].to_pylist() if contents else None
+    embeddings = table["embedding"]
+    dim = embeddings.type.list_size
+    if embeddings.num_chunks == 1:
+        return ids, contents, embeddings.chunk(0).flatten().to_numpy(zero_copy_only=True).reshape(-1, dim)
+    matrix = np.empty((len(embeddings), dim), dtype=np.float32)
+    start = 0
+    for chunk in embeddings.chunks:
+        matrix[start:start + len(chunk)] = chunk.flatten().to_numpy(zero_copy_only=True).reshape(-1, dim)
+        start += len(chunk)
+    return ids, contents, matrix
+
+
+def load_index(index, path):
+    """Build a LocalIndex from a snapshot. Returns the highest id loaded."""
+    # The index only scores; contents are hydrated from the table on demand
+    ids, _, matrix = read_snapshot(path, contents=False)
+    index.load_arrays(ids.tolist(), matrix)
+    return int(ids.max()) if len(ids) else None
+
+
+def restore_snapshot(path, supabase=None, batch_size=500, column="embedding"):
+    """Upsert every snapshot (or retention archive) row back into the table, live.
+
+    Rows keep their namespace, tags and source; files written before those
+    columns existed restore into MEMORY_DEFAULT_NAMESPACE, untagged, with the
+    table's default source. Returns the number of rows restored.
+    """
+    import pyarrow.parquet as pq
+    supabase = supabase or clients.get_supabase()
+    restored = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        ids = batch.column("id").to_pylist()
+        contents = batch.column("content").to_pylist()
+        created = batch.column("created_at").to_pylist()
+        if "namespace" in batch.schema.names:
+            namespaces = [ns or config.DEFAULT_NAMESPACE for ns in batch.column("namespace").to_pylist()]
+        else:
+            namespaces = [config.DEFAULT_NAMESPACE] * len(ids)
+        tags = batch.column("tags").to_pylist() if "tags" in batch.schema.names else [None] * len(ids)
+        sources = batch.column("source").to_pylist() if "source" in batch.schema.names else [None] * len(ids)
+        embeddings = batch.column("embedding")
+        if embeddings.null_count:
+            # Archived rows that had no valid vector come back without one
+            matrix = embeddings.to_pylist()
+        else:
+            matrix = embeddings.flatten().to_numpy(zero_copy_only=False).reshape(len(ids), embeddings.type.list_size)
+        supabase.table(config.TABLE).upsert([
+            # 9 significant digits round-trip float32 exactly
+            {"id": i, "content": c, "created_at": t, "namespace": ns, "tags": tg or [], "source": src or "chat",
+             column: None if v is None else to_pgvector(v, 9), "deleted_at": None}
+            for i, c, t, ns, tg, src, v in zip(ids, contents, created, namespaces, tags, sources, matrix)
+        ]).execute()
+        restored += len(ids)
+    return restored
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parquet snapshots of project_memory")
+    parser.add_argument("command", choices=["export", "restore", "info"])
+    parser.add_argument("path")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--namespace", default=None, help="namespace to export (default MEMORY_DEFAULT_NAMESPACE)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    start = time.perf_counter()
+    if args.command in ("export", "restore"):
+        state = load_state(clients.get_supabase())
+    if args.command == "export":
+        from .namespaces import resolve
+        count = export_snapshot(args.path, page_size=args.page_size, column=state["active_column"],
+                                model=state["active_model"], namespace=resolve(args.namespace))
+        logger.info("Exported %d rows to %s", count, args.path)
+    elif args.command == "restore":
+        model = snapshot_model(args.path)
+        if model != state["active_model"]:
+            parser.error(f"snapshot was embedded with {model}, the active model is {state['active_model']}")
+        count = restore_snapshot(args.path, batch_size=args.batch_size, column=state["active_column"])
+        logger.info("Restored %d rows from %s", count, args.path)
+    else:
+        ids, _, matrix = read_snapshot(args.path, contents=False)
+        logger.info("%s: %d rows, %d dims, namespace %s",
+                    args.path, len(ids), matrix.shape[1], snapshot_namespace(args.path) or "(mixed)")
+    logger.info("Done in %.2fs", time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,745 @@
+"""The memory store: embedding, storage, retrieval and answering.
+
+One MemoryStore per process holds the warm local indexes and caches. The memory
+service exposes it over HTTP; the Streamlit UIs use it directly only when no
+MEMORY_SERVICE_URL is configured. Every call works in the current namespace
+(see memory_core.namespaces), whose index partition is loaded on first use.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import numpy as np
+
+from . import clients, config
+from .admission import Overloaded, current_session, estimate_tokens, get_scheduler
+from .batcher import EmbeddingBatcher
+from .cache import LRUCache, SingleFlight, TTLValue
+from .clusters import ClusterIndex, is_broad
+from .conversation import Conversation, is_follow_up
+from .generations import DualIndex, load_state
+from .codec import decode_embedding, parse_vector, to_pgvector
+from .index import LocalIndex, normalize
+from .namespaces import resolve, scoped
+from .retention import tags_of, tombstone
+from .scan import scan_pages, scan_search
+from .snapshot import iter_pages, live
+from .prompts import build_messages, retrieval_only_answer
+from .router import AnswerStats, extractive_hit
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text):
+    return " ".join(text.split())
+
+
+class Partition:
+    """One namespace's local indexes, row count and clusters"""
+
+    def __init__(self, store, namespace):
+        self.namespace = namespace
+        self.index = LocalIndex(config.EMBEDDING_DIM)
+        self.index_loaded = False
+        self.index_state = None
+        self.shared_index = None
+        self.dual_index = None
+        self.dual_state = None
+        self.lock = threading.Lock()
+        self.count_cache = TTLValue(config.STATS_TTL, lambda: store._count_rows(namespace))
+        self.cluster_cache = TTLValue(config.CLUSTER_REFRESH_SECONDS, lambda: store._load_clusters(namespace))
+
+    def where(self, query):
+        """Filter a project_memory query to this namespace's live rows"""
+        return scoped(live(query), self.namespace)
+
+
+class MemoryStore:
+    def __init__(self, supabase=None, openai_client=None):
+        self._supabase = supabase
+        self._openai = openai_client
+        # Least recently used namespaces' partitions are dropped beyond MEMORY_NAMESPACE_PARTITIONS
+        self.partitions = LRUCache(config.NAMESPACE_PARTITIONS)
+        self._partitions_lock = threading.Lock()
+        self.query_cache = LRUCache(config.QUERY_CACHE_SIZE)
+        self.content_cache = LRUCache(config.CONTENT_CACHE_SIZE)
+        self.inflight = SingleFlight()
+        self.answer_stats = AnswerStats()
+        self.conversations = LRUCache(config.CONVERSATION_SESSIONS)
+        self.retrievals = Counter()
+        self.admission = get_scheduler()
+        self.batcher = EmbeddingBatcher(
+            self._send_embeddings, config.EMBED_BATCH_MS / 1000, config.EMBED_BATCH_MAX,
+            config.OPENAI_MAX_CONCURRENCY, config.OPENAI_MAX_QUEUE, self.admission.reject,
+        )
+        self._writes = 0
+        self.state_cache = TTLValue(config.STATS_TTL, lambda: load_state(self.supabase))
+        # Deletions made by other processes since the local index was loaded
+        self.tombstone_sync = TTLValue(config.TOMBSTONE_SYNC_SECONDS, self._sync_tombstones)
+        self._tombstones_since = None
+        self._compacting = threading.Lock()
+        self.rpc_available = None
+        self._rpc_retry_at = 0.0
+
+    @property
+    def supabase(self):
+        return self._supabase or clients.get_supabase()
+
+    @property
+    def openai(self):
+        return self._openai or clients.get_openai_client()
+
+    def embedding_state(self):
+        """Active column/model and the shadow model of a running migration (cached)"""
+        return self.state_cache.get()
+
+    def partition(self, namespace=None):
+        """The index partition of `namespace` (default: the current one), created on first use"""
+        namespace = resolve(namespace)
+        partition = self.partitions.get(namespace)
+        if partition is None:
+            with self._partitions_lock:
+                partition = self.partitions.get(namespace)
+                if partition is None:
+                    partition = Partition(self, namespace)
+                    self.partitions.put(namespace, partition)
+        return partition
+
+    # ✅ Embeddings
+    def embed(self, texts, model=None):
+        """Embed a list of texts as float32 vectors, batched with concurrent callers"""
+        model = model or self.embedding_state()["active_model"]
+        return self.batcher.embed(texts, model)
+
+    def _send_embeddings(self, texts, model):
+        extra = {"dimensions": config.EMBEDDING_DIM} if model.startswith("text-embedding-3") else {}
+        with self.admission.slot("embed", estimate_tokens(texts)):
+            response = self.openai.embeddings.create(
+                model=model, input=texts, encoding_format="base64", **extra
+            )
+        return [decode_embedding(item.embedding) for item in response.data]
+
+    def embed_query(self, text, model=None):
+        model = model or self.embedding_state()["active_model"]
+        key = (model, normalize_query(text))
+        vector = self.query_cache.get(key)
+        if vector is None:
+            vector = self.embed([key[1]], model)[0]
+            self.query_cache.put(key, vector)
+        return vector
+
+    # ✅ Writes
+    def add(self, content, source=None):
+        return self.bulk_add([content], source)[0]
+
+    def bulk_add(self, contents, source=None):
+        """Embed and store notes in the current namespace; `source` names the writer for retention rules"""
+        contents = [c.strip() for c in contents if c and c.strip()]
+        if not contents:
+            raise ValueError("No content to add")
+        partition = self.partition()
+        state = self.embedding_state()
+        vectors = self.embed(contents, state["active_model"])
+        records = [
+            {"content": content, state["active_column"]: to_pgvector(vector)}
+            for content, vector in zip(contents, vectors)
+        ]
+        # Dual-write while a migration runs so new rows never need backfilling
+        shadow_vectors = self.embed(contents, state["shadow_model"]) if state["shadow_model"] else None
+        if shadow_vectors:
+            for record, vector in zip(records, shadow_vectors):
+                record[state["shadow_column"]] = to_pgvector(vector)
+        created_at = datetime.now(timezone.utc).isoformat()
+        for record in records:
+            record["created_at"] = created_at
+            record["namespace"] = partition.namespace
+            record["source"] = source or "chat"
+            record["tags"] = tags_of(record["content"])
+        result = self.supabase.table(config.TABLE).insert(records).execute()
+        if not result.data:
+            raise RuntimeError("Failed to store memory")
+        rows = [{"id": row["id"], "content": row["content"]} for row in result.data]
+        ids = [r["id"] for r in rows]
+        for row in rows:
+            self.content_cache.put(row["id"], row["content"])
+        start = partition.index.add(ids, vectors) if partition.index_loaded else None
+        if partition.shared_index is not None:
+            # Visible to this process's searches before the next publish
+            partition.shared_index.add(ids, vectors)
+        self._add_to_clusters(partition, state, ids, vectors, start)
+        if shadow_vectors and partition.dual_index is not None:
+            partition.dual_index.add(ids, shadow_vectors)
+        self._writes += 1
+        partition.count_cache.invalidate()
+        return rows
+
+    def delete(self, ids, namespace=None):
+        """Tombstone memories of `namespace` (default: the current one) by id. Returns the ids that were live."""
+        deleted = tombstone(self.supabase, ids, resolve(namespace))
+        if deleted:
+            self.drop(deleted)
+        return deleted
+
+    def forget(self, query):
+        """The `forget:` command: tombstone memory #id, or the best match for `query`.
+
+        Returns the forgotten memories ({id, content}); nothing is deleted when
+        no memory matches at MEMORY_FORGET_MIN_SIMILARITY or better.
+        """
+        query = query.strip()
+        if re.fullmatch(r"#?\d+", query):
+            # Not the content cache: it is shared by all namespaces
+            result = (self.partition().where(self.supabase.table(config.TABLE).select("id, content"))
+                      .eq("id", int(query.lstrip("#"))).execute())
+            memories = [{"id": row["id"], "content": row["content"], "similarity": 1.0} for row in result.data or []]
+        else:
+            memories = self.search(query, config.FORGET_MIN_SIMILARITY, 1)
+        deleted = set(self.delete([m["id"] for m in memories if not isinstance(m["id"], str)]))
+        return [{"id": m["id"], "content": m["content"]} for m in memories if m["id"] in deleted]
+
+    def drop(self, ids):
+        """Forget deleted ids locally: tombstone them in every partition's indexes, shared ones too, evict their content"""
+        compact = False
+        for partition in self.partitions.values():
+            if partition.shared_index is not None:
+                partition.shared_index.delete(ids)
+            if not partition.index_loaded and partition.dual_index is None:
+                continue
+            partition.index.delete(ids)
+            if partition.dual_index is not None:
+                partition.dual_index.delete(ids)
+            partition.count_cache.invalidate()
+            compact = compact or len(partition.index.tombstones) >= config.COMPACT_TOMBSTONES
+        for id_ in ids:
+            self.content_cache.pop(id_)
+        self._writes += 1
+        if compact and not self._compacting.locked():
+            threading.Thread(target=self.compact, name="memory-compact", daemon=True).start()
+
+    def compact(self):
+        """Drop tombstoned rows from every partition's local indexes. Returns how many were removed."""
+        removed = 0
+        with self._compacting:
+            for partition in self.partitions.values():
+                removed += partition.index.compact()
+                if partition.dual_index is not None:
+                    removed += partition.dual_index.compact()
+        if removed:
+            logger.info("Compacted %d tombstoned rows out of the local index", removed)
+        return removed
+
+    def _sync_tombstones(self):
+        since = self._tombstones_since
+        if since is None:
+            return
+        deleted = []
+        for page in iter_pages(self.supabase, 1000, "id, deleted_at", where=lambda q: q.gt("deleted_at", since)):
+            deleted.extend(page)
+        if deleted:
+            self._tombstones_since = max(row["deleted_at"] for row in deleted)
+            self.drop([row["id"] for row in deleted])
+
+    def _add_to_clusters(self, partition, state, ids, vectors, start):
+        """Move the new rows' clusters, if clusters are loaded, without waiting for a rebuild"""
+        clusters = partition.cluster_cache.peek()
+        if clusters is None or clusters.model != state["active_model"]:
+            return
+        added = clusters.add(ids, vectors, partition.index if start is not None else None, start)
+        try:
+            clusters.save_added(self.supabase, added)
+        except Exception as e:
+            logger.warning("Could not save updated cluster centroids: %s", e)
+
+    def memory_version(self, namespace=None):
+        """Changes whenever the set of memories a search in `namespace` can see may have changed"""
+        state = self.embedding_state()
+        partition = self.partition(namespace)
+        shared = partition.shared_index.generation if partition.shared_index else 0
+        return (partition.namespace, self._writes, state["active_model"], state["shadow_model"], shared)
+
+    # ✅ Retrieval
+    def ensure_index(self, namespace=None):
+        """The index searches run against: the shared one if published, else a private copy"""
+        partition = self.partition(namespace)
+        if config.SHARED_INDEX_NAME:
+            if partition.shared_index is None:
+                from .shared_index import SharedIndexReader, namespace_name
+                partition.shared_index = SharedIndexReader(namespace_name(config.SHARED_INDEX_NAME, partition.namespace))
+            if partition.shared_index.attach():
+                # Rows deleted after the publisher read the table reach this
+                # reader through the tombstone sync (see drop())
+                loaded_at = datetime.fromtimestamp(partition.shared_index.loaded_at, timezone.utc).isoformat()
+                self._tombstones_since = self._tombstones_since or loaded_at
+                return partition.shared_index
+            logger.warning("Shared index %r is not published yet, loading a private copy",
+                           partition.shared_index.name)
+        return self.ensure_local_index(partition.namespace)
+
+    def ensure_local_index(self, namespace=None):
+        """Load a namespace's local index from the table on first use (and again after a cutover)"""
+        partition = self.partition(namespace)
+        state = self.embedding_state()
+        key = (state["active_column"], state["active_model"])
+        if partition.index_loaded and partition.index_state == key:
+            return partition.index
+        with partition.lock:
+            if not partition.index_loaded or partition.index_state != key:
+                # Keep the earliest start so other partitions miss no deletions
+                self._tombstones_since = self._tombstones_since or datetime.now(timezone.utc).isoformat()
+                if self._snapshot_usable(state, partition.namespace):
+                    self._load_snapshot(partition, config.SNAPSHOT_PATH, state["active_column"])
+                else:
+                    column = state["active_column"]
+                    rows = (row for page in scan_pages(self.supabase, f"id, {column}", where=partition.where)
+                            for row in page)
+                    partition.index.load_rows(rows, column)
+                partition.index_loaded = True
+                partition.index_state = key
+        return partition.index
+
+    def _snapshot_usable(self, state, namespace):
+        if not (config.SNAPSHOT_PATH and os.path.exists(config.SNAPSHOT_PATH)):
+            return False
+        from .snapshot import snapshot_model, snapshot_namespace
+        return (snapshot_model(config.SNAPSHOT_PATH) == state["active_model"]
+                and (snapshot_namespace(config.SNAPSHOT_PATH) or config.DEFAULT_NAMESPACE) == namespace)
+
+    def _load_snapshot(self, partition, path, column):
+        """Build a partition's index from a Parquet snapshot, then fetch rows added since"""
+        from .snapshot import load_index
+        last_id = load_index(partition.index, path)
+        newer = [
+            row for page in iter_pages(self.supabase, columns=f"id, {column}", after=last_id, where=partition.where)
+            for row in page if row.get(column)
+        ]
+        if newer:
+            partition.index.add([row["id"] for row in newer], [parse_vector(row[column]) for row in newer])
+        # Rows of the snapshot deleted since it was written
+        partition.index.delete([
+            row["id"] for page in iter_pages(
+                self.supabase, columns="id",
+                where=lambda q: scoped(q.not_.is_("deleted_at", "null"), partition.namespace),
+            ) for row in page
+        ])
+
+    def ensure_dual_index(self, state, namespace=None):
+        """Both generations of a running migration, rebuilt when the state changes"""
+        partition = self.partition(namespace)
+        key = (state["active_column"], state["active_model"], state["shadow_model"])
+        if partition.dual_index is not None and partition.dual_state == key:
+            return partition.dual_index
+        with partition.lock:
+            if partition.dual_index is None or partition.dual_state != key:
+                self._tombstones_since = self._tombstones_since or datetime.now(timezone.utc).isoformat()
+                active, shadow = state["active_column"], state["shadow_column"]
+                rows = (row for page in scan_pages(self.supabase, f"id, {active}, {shadow}", where=partition.where)
+                        for row in page)
+                dual_index = DualIndex(config.EMBEDDING_DIM)
+                dual_index.load_rows(rows, active, shadow)
+                partition.dual_index, partition.dual_state = dual_index, key
+        return partition.dual_index
+
+    def _rpc_search(self, embedding, threshold, limit, column="embedding", namespace=None):
+        params = {
+            "query_embedding": to_pgvector(embedding),
+            "match_threshold": threshold,
+            "match_count": limit,
+            "match_namespace": resolve(namespace),
+        }
+        if column != "embedding":
+            # Only the versioned function (supabase/migrations) takes this argument
+            params["embedding_column"] = column
+        result = self.supabase.rpc("match_project_memory", params).execute()
+        memories = [
+            {"id": item["id"], "content": item["content"], "similarity": item.get("similarity")}
+            for item in result.data or []
+        ]
+        for memory in memories:
+            self.content_cache.put(memory["id"], memory["content"])
+        return memories
+
+    def rpc_search(self, embedding, threshold=None, limit=None, namespace=None):
+        """Search `namespace` (default the current one) with match_project_memory only, whatever MEMORY_SEARCH_BACKEND says"""
+        threshold = config.MATCH_THRESHOLD if threshold is None else threshold
+        limit = config.MATCH_COUNT if limit is None else limit
+        return self._rpc_search(embedding, threshold, limit, self.embedding_state()["active_column"], namespace)
+
+    def hydrate(self, hits):
+        """Attach content to scored {id, similarity} hits.
+
+        Misses in the content cache are fetched in one `in_` query; hits whose
+        row has been deleted since it was indexed are dropped. Hits come from
+        namespace-scoped searches, so the shared content cache is safe here.
+        """
+        contents = {}
+        for hit in hits:
+            content = hit.get("content") or self.content_cache.get(hit["id"])
+            if content is not None:
+                contents[hit["id"]] = content
+        missing = [hit["id"] for hit in hits if hit["id"] not in contents]
+        if missing:
+            result = self.partition().where(self.supabase.table(config.TABLE).select("id, content").in_("id", missing)).execute()
+            for row in result.data or []:
+                contents[row["id"]] = row["content"]
+                self.content_cache.put(row["id"], row["content"])
+        return [
+            {"id": hit["id"], "content": contents[hit["id"]], "similarity": hit["similarity"]}
+            for hit in hits if hit["id"] in contents
+        ]
+
+    def search_embedding(self, embedding, threshold=None, limit=None):
+        threshold = config.MATCH_THRESHOLD if threshold is None else threshold
+        limit = config.MATCH_COUNT if limit is None else limit
+        partition = self.partition()
+        if config.SEARCH_BACKEND == "scan":
+            column = self.embedding_state()["active_column"]
+            return self.hydrate(scan_search(self.supabase, embedding, threshold, limit, column, where=partition.where))
+        if config.SEARCH_BACKEND in ("auto", "rpc") and self._rpc_due():
+            try:
+                memories = self._rpc_search(
+                    embedding, threshold, limit, self.embedding_state()["active_column"], partition.namespace
+                )
+                self._rpc_succeeded()
+                return memories
+            except Exception as e:
+                if config.SEARCH_BACKEND == "rpc":
+                    raise
+                self._rpc_failed(e)
+        index = self.ensure_index(partition.namespace)
+        self.tombstone_sync.get()
+        clusters = self.clusters(partition.namespace)
+        if clusters is not None and len(clusters) > config.CLUSTER_PROBES:
+            # Two-level: score the centroids, then only the best clusters' members
+            if not clusters.attached_to(index):
+                clusters.attach(index)
+            return self.hydrate(clusters.search(embedding, threshold, limit, config.CLUSTER_PROBES, index))
+        return self.hydrate(index.search(embedding, threshold, limit))
+
+    def _load_clusters(self, namespace):
+        if not config.CLUSTER_PROBES:
+            return None
+        return ClusterIndex.load(self.supabase, self.embedding_state()["active_model"], namespace)
+
+    def clusters(self, namespace=None):
+        """A namespace's cluster centroids and summaries for the active model, or None when not built"""
+        cache = self.partition(namespace).cluster_cache
+        clusters = cache.get()
+        if clusters is not None and clusters.model != self.embedding_state()["active_model"]:
+            # Cut over to a new model since they were loaded
+            cache.invalidate()
+            clusters = cache.get()
+        return clusters
+
+    def _rpc_due(self):
+        return self.rpc_available is not False or time.monotonic() >= self._rpc_retry_at
+
+    def _rpc_succeeded(self):
+        if self.rpc_available is False:
+            logger.info("match_project_memory is available again")
+        self.rpc_available = True
+
+    def _rpc_failed(self, error):
+        if self.rpc_available is not False:
+            logger.error(
+                "match_project_memory RPC failed (%s); falling back to a full-table scan in Python. "
+                "Apply supabase/migrations to create it. Retrying in %ss.", error, config.RPC_RETRY_SECONDS,
+            )
+        self.rpc_available = False
+        self._rpc_retry_at = time.monotonic() + config.RPC_RETRY_SECONDS
+
+    def search(self, query, threshold=None, limit=None):
+        # Identical concurrent searches (a question pasted by many people) run once
+        key = ("search", normalize_query(query), threshold, limit, self.memory_version())
+        return self.inflight.do(key, lambda: self._search(query, threshold, limit))
+
+    def _search(self, query, threshold, limit):
+        state = self.embedding_state()
+        if state["shadow_model"]:
+            # Dual-read: migrated rows with the new model, the rest with the old one
+            threshold = config.MATCH_THRESHOLD if threshold is None else threshold
+            limit = config.MATCH_COUNT if limit is None else limit
+            dual_index = self.ensure_dual_index(state)
+            self.tombstone_sync.get()
+            return self.hydrate(dual_index.search(
+                self.embed_query(query, state["active_model"]),
+                self.embed_query(query, state["shadow_model"]),
+                threshold, limit,
+            ))
+        embedding = self.embed_query(query, state["active_model"])
+        if is_broad(query):
+            clusters = self.clusters()
+            if clusters is not None:
+                summaries = clusters.summary_memories(embedding, config.MATCH_COUNT if limit is None else limit)
+                if summaries:
+                    return summaries
+        return self.search_embedding(embedding, threshold, limit)
+
+    def answer(self, question, threshold=None, limit=None, mode="auto"):
+        """Answer `question` from its memories.
+
+        mode "auto" returns the top memory itself for confident direct lookups
+        (see memory_core.router); "generate" always asks the chat model.
+        """
+        session = current_session.get()
+        conversation = self.conversation(session)
+        version = self.memory_version()
+        if conversation is not None and len(conversation) and is_follow_up(question):
+            # A follow-up depends on its session's conversation, so only coalesce within it
+            key = ("answer", normalize_query(question), threshold, limit, mode, session, version)
+            return self.inflight.do(key, lambda: self._answer(question, threshold, limit, mode, conversation))
+        # A new topic reads nothing from the session, so callers in every
+        # session share one answer; each records it in its own conversation
+        candidates = conversation is not None
+        key = ("answer", normalize_query(question), threshold, limit, mode, candidates, version)
+        result, context = self.inflight.do(
+            key, lambda: self._answer_new_topic(question, threshold, limit, mode, candidates)
+        )
+        if conversation is not None:
+            with conversation.lock:
+                if context is not None:
+                    conversation.remember(*context)
+                conversation.record(question, result["answer"])
+        return result
+
+    def answer_from(self, question, memories, mode="auto"):
+        """Answer `question` from `memories` already retrieved by the caller, outside any conversation"""
+        started = time.perf_counter()
+        result = self._route(question, memories, mode)
+        self.answer_stats.record(result["mode"], time.perf_counter() - started)
+        return result
+
+    def _answer_new_topic(self, question, threshold, limit, mode, candidates):
+        """(result, candidate context for Conversation.remember or None) of a session-independent answer"""
+        started = time.perf_counter()
+        context = None
+        if candidates:
+            memories, context = self._topic_search(question, threshold, limit)
+        else:
+            memories = self.search(question, threshold, limit)
+        result = self._route(question, memories, mode)
+        self.answer_stats.record(result["mode"], time.perf_counter() - started)
+        return result, context
+
+    def _answer(self, question, threshold, limit, mode, conversation=None):
+        started = time.perf_counter()
+        if conversation is None:
+            result = self._route(question, self.search(question, threshold, limit), mode)
+        else:
+            with conversation.lock:
+                memories = self._conversation_search(conversation, question, threshold, limit)
+                result = self._route(question, memories, mode, conversation.summary())
+                conversation.record(question, result["answer"])
+        self.answer_stats.record(result["mode"], time.perf_counter() - started)
+        return result
+
+    # ✅ Conversations
+    def conversation(self, session=None):
+        """The retrieval context of `session` (default: the current one), or None without a session"""
+        session = session or current_session.get()
+        if session is None or config.CONVERSATION_SESSIONS <= 0:
+            return None
+        # A session id is only unique within its namespace
+        key = (resolve(), session)
+        conversation = self.conversations.get(key)
+        if conversation is None:
+            conversation = Conversation()
+            self.conversations.put(key, conversation)
+        return conversation
+
+    def end_conversation(self, session=None):
+        """Forget the retrieval context of `session` (default: the current one)"""
+        self.conversations.pop((resolve(), session or current_session.get()))
+
+    def _candidate_vectors(self, hits, column):
+        """Unit vectors of `hits`, in order, or (None, None) when some are not table rows.
+
+        Read from the index the search ran against when it holds `column`;
+        only rows it lacks are fetched from the table.
+        """
+        ids = [hit["id"] for hit in hits]
+        if not ids or any(isinstance(id_, str) for id_ in ids):
+            return None, None
+        partition = self.partition()
+        vectors = {}
+        if partition.shared_index is not None and partition.shared_index.generation:
+            vectors = partition.shared_index.lookup(ids)
+        elif partition.index_loaded and partition.index_state[0] == column:
+            vectors = partition.index.lookup(ids)
+        missing = [id_ for id_ in ids if id_ not in vectors]
+        if missing:
+            result = partition.where(self.supabase.table(config.TABLE).select(f"id, {column}").in_("id", missing)).execute()
+            for row in result.data or []:
+                vector = parse_vector(row.get(column))
+                if vector is not None:
+                    vectors[row["id"]] = normalize(vector)
+        ids = [id_ for id_ in ids if vectors.get(id_) is not None]
+        if not ids:
+            return None, None
+        return ids, np.vstack([vectors[id_] for id_ in ids])
+
+    def _conversation_search(self, conversation, question, threshold, limit):
+        """Memories for a turn of `conversation`.
+
+        Follow-ups blend in the previous query and are scored against the
+        previous full search's candidates; when those score too poorly, or
+        for a new topic, a full search for MEMORY_CONVERSATION_CANDIDATES
+        candidates runs and they become the cached set.
+        """
+        state = self.embedding_state()
+        if state["shadow_model"] or is_broad(question):
+            return self.search(question, threshold, limit)
+        threshold = config.MATCH_THRESHOLD if threshold is None else threshold
+        limit = config.MATCH_COUNT if limit is None else limit
+        model = state["active_model"]
+        query = self.embed_query(question, model)
+        follow_up = len(conversation) > 0 and is_follow_up(question)
+        if follow_up:
+            query = conversation.blend(query)
+            hits = conversation.rescore(
+                query, model, threshold, limit, max(threshold, config.FOLLOWUP_MIN_SIMILARITY)
+            )
+            if hits is not None:
+                self.retrievals["incremental"] += 1
+                conversation.remember(model, query)
+                return self.hydrate(hits)
+        if not follow_up:
+            memories, context = self._topic_search(question, threshold, limit, query)
+            conversation.remember(*context)
+            return memories
+        self.retrievals["full"] += 1
+        hits = self.search_embedding(query, threshold, max(limit, config.CONVERSATION_CANDIDATES))
+        ids, matrix = self._candidate_vectors(hits, state["active_column"])
+        conversation.remember(model, query, ids, matrix)
+        return hits[:limit]
+
+    def _topic_search(self, question, threshold, limit, query=None):
+        """(memories, (model, query, ids, matrix)) of a full search that starts a new topic.
+
+        The second item is the candidate set for a conversation to remember,
+        or None when the search does not keep one (mid-migration, broad questions).
+        """
+        state = self.embedding_state()
+        if state["shadow_model"] or is_broad(question):
+            return self.search(question, threshold, limit), None
+        threshold = config.MATCH_THRESHOLD if threshold is None else threshold
+        limit = config.MATCH_COUNT if limit is None else limit
+        model = state["active_model"]
+        query = self.embed_query(question, model) if query is None else query
+        self.retrievals["full"] += 1
+        hits = self.search(question, threshold, max(limit, config.CONVERSATION_CANDIDATES))
+        ids, matrix = self._candidate_vectors(hits, state["active_column"])
+        return hits[:limit], (model, query, ids, matrix)
+
+    def _route(self, question, memories, mode, summary=None):
+        hit = None
+        if mode == "auto" and config.EXTRACTIVE_ANSWERS:
+            hit = extractive_hit(question, memories, config.EXTRACTIVE_MIN_SIMILARITY, config.EXTRACTIVE_MARGIN)
+        if hit is not None:
+            return {
+                "answer": hit["content"],
+                "memories": [hit],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0},
+                "mode": "extractive",
+            }
+        messages = build_messages(question, memories, summary)
+        try:
+            # The TPM limit counts max_tokens up front, as OpenAI does
+            with self.admission.slot("chat", estimate_tokens(m["content"] for m in messages) + 500):
+                response = self.openai.chat.completions.create(
+                    model=config.CHAT_MODEL,
+                    messages=messages,
+                    max_tokens=500,
+                    temperature=0.7,
+                )
+        except Overloaded as e:
+            logger.warning("Answering from retrieval only: %s", e)
+            return {
+                "answer": retrieval_only_answer(memories),
+                "memories": memories,
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0},
+                "degraded": True,
+                "mode": "retrieval_only",
+            }
+        usage = getattr(response, "usage", None)
+        return {
+            "answer": response.choices[0].message.content,
+            "memories": memories,
+            "usage": {
+                "prompt_tokens": getattr(usage, "prompt_tokens", None),
+                "completion_tokens": getattr(usage, "completion_tokens", None),
+            },
+            "mode": "generated",
+        }
+
+    # ✅ Readiness
+    def warm_up(self):
+        """Start the background warm-up (once per process)"""
+        from . import warmup
+        warmup.start(self)
+
+    def ready(self):
+        from . import warmup
+        return warmup.status()
+
+    # ✅ Stats
+    def _count_rows(self, namespace):
+        result = scoped(live(self.supabase.table(config.TABLE).select("id", count="exact").limit(1)), namespace).execute()
+        return result.count or 0
+
+    def count(self, namespace=None):
+        """Live memories in `namespace` (default: the current one), cached for MEMORY_STATS_TTL"""
+        return self.partition(namespace).count_cache.get()
+
+    def check(self):
+        """Connectivity report for the Debug panel"""
+        result = self.supabase.table(config.TABLE).select("id").limit(1).execute()
+        report = {"db": True, "records": len(result.data or []), "rpc": False, "rpc_error": None}
+        try:
+            self._rpc_search(np.full(config.EMBEDDING_DIM, 0.1, dtype=np.float32), 0.1, 1)
+            report["rpc"] = True
+            self._rpc_succeeded()
+        except Exception as e:
+            report["rpc_error"] = str(e)
+            self._rpc_failed(e)
+        return report
+
+    def stats(self):
+        """Process-wide stats, with the count, index and clusters of the current namespace"""
+        partition = self.partition()
+        return {
+            "namespace": partition.namespace,
+            "count": self.count(),
+            "index_rows": len(partition.index),
+            "index_loaded": partition.index_loaded,
+            "local_index": partition.index.stats(),
+            "shared_generation": partition.shared_index.generation if partition.shared_index else None,
+            "partitions": [p.namespace for p in self.partitions.values() if p.index_loaded],
+            "rpc_available": self.rpc_available,
+            "embedding_state": self.embedding_state(),
+            "query_cache": self.query_cache.stats(),
+            "content_cache": self.content_cache.stats(),
+            "single_flight": self.inflight.stats(),
+            "admission": self.admission.stats(),
+            "embed_batcher": self.batcher.stats(),
+            "answers": self.answer_stats.stats(),
+            "conversations": {"sessions": len(self.conversations), **self.retrievals},
+            "clusters": len(partition.cluster_cache.peek() or ()),
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide MemoryStore"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MemoryStore()
+    return _store
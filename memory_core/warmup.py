@@ -0,0 +1,102 @@
+"""Background warm-up of the process-wide MemoryStore.
+
+start() runs once per process on a daemon thread. It creates the Supabase and
+OpenAI clients, reads the embedding state, probes the RPC (the report is
+kept as status()["check"]), primes the row count, and builds or attaches the
+local index of MEMORY_DEFAULT_NAMESPACE when searches will use it (other
+namespaces load on their first search).
+It finishes with one embedding call so the first question does not also pay
+for OpenAI connection setup. status() reports progress: "ready" only once
+every step succeeded, "degraded" when warm-up finished with failed steps.
+The memory service serves it as GET /ready (503 unless ready) and the UIs
+show a "warming up" notice meanwhile, and a warning when degraded.
+"""
+import logging
+import threading
+import time
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+_ready = threading.Event()
+_finished = threading.Event()
+_lock = threading.Lock()
+_thread = None
+_status = {"ready": False, "started_at": None, "seconds": None, "steps": {}, "errors": {}, "check": None}
+
+
+def _steps(store):
+    yield "clients", lambda: (store.supabase, store.openai)
+    yield "embedding_state", store.embedding_state
+    yield "check", store.check
+    yield "count", store.count
+
+    def index():
+        # Only load what searches will actually use
+        if config.SEARCH_BACKEND == "scan":
+            return
+        if config.SEARCH_BACKEND == "local" or config.SHARED_INDEX_NAME or store.rpc_available is False:
+            index = store.ensure_index()
+            clusters = store.clusters()
+            if clusters is not None:
+                clusters.attach(index)
+    yield "index", index
+    yield "embedding", lambda: store.embed_query("warm-up")
+
+
+def _run(store):
+    started = time.perf_counter()
+    for name, step in _steps(store):
+        step_started = time.perf_counter()
+        try:
+            result = step()
+            if name == "check":
+                # The UIs' match_project_memory banner reads this instead of probing on first paint
+                _status["check"] = result
+        except Exception as e:
+            logger.warning("Warm-up step %s failed: %s", name, e)
+            _status["errors"][name] = str(e)
+        _status["steps"][name] = round(time.perf_counter() - step_started, 3)
+    _status["seconds"] = round(time.perf_counter() - started, 3)
+    if _status["errors"]:
+        logger.warning("Warm-up finished in %.2fs with failed steps: %s",
+                       _status["seconds"], ", ".join(_status["errors"]))
+    else:
+        _status["ready"] = True
+        _ready.set()
+        logger.info("Warm-up finished in %.2fs", _status["seconds"])
+    _finished.set()
+
+
+def start(store):
+    """Start warming `store` in the background; later calls are no-ops"""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _status["started_at"] = time.time()
+            _thread = threading.Thread(target=_run, args=(store,), name="memory-warmup", daemon=True)
+            _thread.start()
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def wait(timeout=None):
+    """Block until warm-up finished (or `timeout` seconds); returns whether every step succeeded"""
+    _finished.wait(timeout)
+    return _ready.is_set()
+
+
+def status():
+    return {
+        "ready": _ready.is_set(),
+        "degraded": _finished.is_set() and not _ready.is_set(),
+        "started": _thread is not None,
+        "started_at": _status["started_at"],
+        "seconds": _status["seconds"],
+        "steps": dict(_status["steps"]),
+        "errors": dict(_status["errors"]),
+        "check": _status["check"],
+    }
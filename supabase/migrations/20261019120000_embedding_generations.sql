@@ -0,0 +1,22 @@
+-- Embedding model migrations with dual-read (see memory_core/migrate.py).
+--
+-- project_memory carries two vector columns, `embedding` and `embedding_next`.
+-- memory_embedding_state names the active one and, while a re-embedding job
+-- runs, the model being written into the other ("shadow") column. Readers use
+-- the shadow vector where a row has one and the active vector otherwise;
+-- cutover is a single-row update of this table.
+
+alter table if exists project_memory
+    add column if not exists embedding_next vector(1536);
+
+create table if not exists memory_embedding_state (
+    id smallint primary key default 1 check (id = 1),
+    active_column text not null default 'embedding'
+        check (active_column in ('embedding', 'embedding_next')),
+    active_model text not null default 'text-embedding-3-small',
+    shadow_model text,
+    updated_at timestamptz not null default now()
+);
+
+insert into memory_embedding_state (id) values (1)
+on conflict (id) do nothing;
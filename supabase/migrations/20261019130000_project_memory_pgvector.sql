@@ -0,0 +1,75 @@
+-- project_memory table, HNSW cosine indexes and the match_project_memory RPC.
+--
+-- Both Streamlit apps and the memory service call match_project_memory; when
+-- it is missing they fall back to scanning the table from Python, which the
+-- apps now report loudly (see MemoryStore.check).
+
+create extension if not exists vector;
+
+create table if not exists project_memory (
+    id bigint generated by default as identity primary key,
+    content text not null,
+    embedding vector(1536),
+    embedding_next vector(1536),
+    created_at timestamptz not null default now()
+);
+
+-- Deployments whose table was created by hand before this migration
+alter table project_memory add column if not exists embedding_next vector(1536);
+alter table project_memory add column if not exists created_at timestamptz not null default now();
+
+-- One index per generation column (see 20261019120000_embedding_generations.sql)
+create index if not exists project_memory_embedding_hnsw
+    on project_memory using hnsw (embedding vector_cosine_ops)
+    with (m = 16, ef_construction = 64);
+
+create index if not exists project_memory_embedding_next_hnsw
+    on project_memory using hnsw (embedding_next vector_cosine_ops)
+    with (m = 16, ef_construction = 64);
+
+-- The inner ORDER BY distance LIMIT k is what lets the planner walk the HNSW
+-- index; the similarity threshold is applied to those k rows afterwards
+-- because a WHERE on the distance would force a sequential scan.
+create or replace function match_project_memory(
+    query_embedding vector(1536),
+    match_threshold float default 0.2,
+    match_count int default 5,
+    embedding_column text default 'embedding'
+)
+returns table (id bigint, content text, similarity float)
+language plpgsql
+as $$
+begin
+    perform set_config('hnsw.ef_search', greatest(40, match_count * 2)::text, true);
+
+    if embedding_column = 'embedding_next' then
+        return query
+        select m.id, m.content, m.similarity
+        from (
+            select p.id, p.content, 1 - (p.embedding_next <=> query_embedding) as similarity
+            from project_memory p
+            order by p.embedding_next <=> query_embedding
+            limit match_count
+        ) m
+        where m.similarity > match_threshold
+        order by m.similarity desc;
+    elsif embedding_column = 'embedding' then
+        return query
+        select m.id, m.content, m.similarity
+        from (
+            select p.id, p.content, 1 - (p.embedding <=> query_embedding) as similarity
+            from project_memory p
+            order by p.embedding <=> query_embedding
+            limit match_count
+        ) m
+        where m.similarity > match_threshold
+        order by m.similarity desc;
+    else
+        raise exception 'unknown embedding column %', embedding_column;
+    end if;
+end;
+$$;
+
+grant execute on function match_project_memory(vector, float, int, text) to anon, authenticated, service_role;
+
+notify pgrst, 'reload schema';
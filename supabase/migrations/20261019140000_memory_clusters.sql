@@ -0,0 +1,18 @@
+-- Cluster centroids and summaries for two-level retrieval (memory_core.clusters).
+--
+-- `python -m memory_core.clusters build` fills this with mini-batch k-means
+-- centroids of the active embedding column and an LLM summary per cluster.
+-- Stores score the centroids first and then only the members of the best
+-- clusters; `add:` inserts move their cluster's centroid and size, and
+-- `summarize` refreshes summaries whose cluster has grown since.
+
+create table if not exists memory_clusters (
+    embedding_model text not null,
+    id integer not null,
+    centroid vector(1536) not null,
+    size integer not null default 0,
+    summary text,
+    summarized_size integer not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (embedding_model, id)
+);
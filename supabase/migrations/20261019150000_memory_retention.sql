@@ -0,0 +1,60 @@
+-- Retention: tags, sources and tombstones (see memory_core/retention.py).
+--
+-- Deletes only set deleted_at; readers skip tombstoned rows and
+-- `python -m memory_core.retention run` archives old tombstones to Parquet
+-- before removing them. Retention rules match #hashtags (tags) and the
+-- writer of a note (source).
+
+alter table project_memory add column if not exists source text not null default 'chat';
+alter table project_memory add column if not exists tags text[] not null default '{}';
+alter table project_memory add column if not exists deleted_at timestamptz;
+
+create index if not exists project_memory_tags_gin on project_memory using gin (tags);
+create index if not exists project_memory_source_created on project_memory (source, created_at);
+create index if not exists project_memory_created_live on project_memory (created_at) where deleted_at is null;
+create index if not exists project_memory_deleted_at on project_memory (deleted_at) where deleted_at is not null;
+
+-- Same as 20261019130000_project_memory_pgvector.sql, minus tombstoned rows
+create or replace function match_project_memory(
+    query_embedding vector(1536),
+    match_threshold float default 0.2,
+    match_count int default 5,
+    embedding_column text default 'embedding'
+)
+returns table (id bigint, content text, similarity float)
+language plpgsql
+as $$
+begin
+    perform set_config('hnsw.ef_search', greatest(40, match_count * 2)::text, true);
+
+    if embedding_column = 'embedding_next' then
+        return query
+        select m.id, m.content, m.similarity
+        from (
+            select p.id, p.content, 1 - (p.embedding_next <=> query_embedding) as similarity
+            from project_memory p
+            where p.deleted_at is null
+            order by p.embedding_next <=> query_embedding
+            limit match_count
+        ) m
+        where m.similarity > match_threshold
+        order by m.similarity desc;
+    elsif embedding_column = 'embedding' then
+        return query
+        select m.id, m.content, m.similarity
+        from (
+            select p.id, p.content, 1 - (p.embedding <=> query_embedding) as similarity
+            from project_memory p
+            where p.deleted_at is null
+            order by p.embedding <=> query_embedding
+            limit match_count
+        ) m
+        where m.similarity > match_threshold
+        order by m.similarity desc;
+    else
+        raise exception 'unknown embedding column %', embedding_column;
+    end if;
+end;
+$$;
+
+notify pgrst, 'reload schema';
@@ -0,0 +1,84 @@
+-- Per-user / per-workspace namespaces (see memory_core/namespaces.py).
+--
+-- Every row belongs to one namespace; existing rows move to 'default'
+-- (MEMORY_DEFAULT_NAMESPACE). match_project_memory filters by namespace
+-- inside the HNSW scan, and clusters are built per namespace.
+
+alter table project_memory add column if not exists namespace text not null default 'default';
+
+create index if not exists project_memory_namespace_id on project_memory (namespace, id) where deleted_at is null;
+
+-- The four-argument version would shadow the new default argument
+drop function if exists match_project_memory(vector, float, int, text);
+
+create or replace function match_project_memory(
+    query_embedding vector(1536),
+    match_threshold float default 0.2,
+    match_count int default 5,
+    embedding_column text default 'embedding',
+    match_namespace text default 'default'
+)
+returns table (id bigint, content text, similarity float)
+language plpgsql
+as $$
+begin
+    perform set_config('hnsw.ef_search', greatest(40, match_count * 2)::text, true);
+    -- pgvector >= 0.8 keeps walking the graph until match_count rows pass the
+    -- namespace filter. Older versions reserve the hnsw.* prefix without this
+    -- setting, so set_config would raise there; they return up to ef_search
+    -- candidates before the filter instead.
+    if exists (
+        select 1 from pg_extension
+        where extname = 'vector' and string_to_array(extversion, '.')::int[] >= array[0, 8]
+    ) then
+        perform set_config('hnsw.iterative_scan', 'relaxed_order', true);
+    end if;
+
+    if embedding_column = 'embedding_next' then
+        return query
+        select m.id, m.content, m.similarity
+        from (
+            select p.id, p.content, 1 - (p.embedding_next <=> query_embedding) as similarity
+            from project_memory p
+            where p.deleted_at is null and p.namespace = match_namespace
+            order by p.embedding_next <=> query_embedding
+            limit match_count
+        ) m
+        where m.similarity > match_threshold
+        order by m.similarity desc;
+    elsif embedding_column = 'embedding' then
+        return query
+        select m.id, m.content, m.similarity
+        from (
+            select p.id, p.content, 1 - (p.embedding <=> query_embedding) as similarity
+            from project_memory p
+            where p.deleted_at is null and p.namespace = match_namespace
+            order by p.embedding <=> query_embedding
+            limit match_count
+        ) m
+        where m.similarity > match_threshold
+        order by m.similarity desc;
+    else
+        raise exception 'unknown embedding column %', embedding_column;
+    end if;
+end;
+$$;
+
+grant execute on function match_project_memory(vector, float, int, text, text) to anon, authenticated, service_role;
+
+-- Clusters are built per namespace
+alter table memory_clusters add column if not exists namespace text not null default 'default';
+alter table memory_clusters drop constraint if exists memory_clusters_pkey;
+alter table memory_clusters add primary key (namespace, embedding_model, id);
+
+-- Row counts per namespace for `python -m memory_core.retention status` and
+-- {"namespace": "*"} retention rules
+create or replace view memory_namespace_counts as
+select
+    namespace,
+    count(*) filter (where deleted_at is null) as live_rows,
+    count(*) filter (where deleted_at is not null) as tombstoned_rows
+from project_memory
+group by namespace;
+
+notify pgrst, 'reload schema';
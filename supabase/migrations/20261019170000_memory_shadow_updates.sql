@@ -0,0 +1,38 @@
+-- One round-trip per re-embedding batch (see memory_core/migrate.py).
+--
+-- Writes each row's shadow vector with a single UPDATE ... FROM unnest().
+-- Rows tombstoned or deleted since the batch was read are left alone, so a
+-- migration never brings them back. Returns how many rows were updated.
+
+create or replace function update_shadow_embeddings(
+    row_ids bigint[],
+    vectors text[],
+    embedding_column text default 'embedding_next'
+)
+returns int
+language plpgsql
+as $$
+declare
+    updated int;
+begin
+    if embedding_column = 'embedding_next' then
+        update project_memory p
+        set embedding_next = v.vector::vector
+        from unnest(row_ids, vectors) as v(id, vector)
+        where p.id = v.id and p.deleted_at is null;
+    elsif embedding_column = 'embedding' then
+        update project_memory p
+        set embedding = v.vector::vector
+        from unnest(row_ids, vectors) as v(id, vector)
+        where p.id = v.id and p.deleted_at is null;
+    else
+        raise exception 'unknown embedding column %', embedding_column;
+    end if;
+    get diagnostics updated = row_count;
+    return updated;
+end;
+$$;
+
+grant execute on function update_shadow_embeddings(bigint[], text[], text) to anon, authenticated, service_role;
+
+notify pgrst, 'reload schema';
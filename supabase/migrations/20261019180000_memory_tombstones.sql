@@ -0,0 +1,24 @@
+-- Tombstones stamped by the database clock (see memory_core/retention.py).
+--
+-- Replicas find rows deleted since their last sync with deleted_at > since,
+-- so every deleted_at must come from one clock rather than from whichever
+-- host ran the delete. Returns the ids that were live.
+
+create or replace function tombstone_project_memory(
+    row_ids bigint[],
+    match_namespace text default null
+)
+returns table (id bigint)
+language sql
+as $$
+    update project_memory p
+    set deleted_at = now()
+    where p.id = any(row_ids)
+        and p.deleted_at is null
+        and (match_namespace is null or p.namespace = match_namespace)
+    returning p.id;
+$$;
+
+grant execute on function tombstone_project_memory(bigint[], text) to anon, authenticated, service_role;
+
+notify pgrst, 'reload schema';
@@ -0,0 +1,58 @@
+-- Incremental cluster updates for `add:` inserts (see memory_core/clusters.py).
+--
+-- Each replica sends, per touched cluster, how many rows it assigned there and
+-- the sum of their unit vectors. The new size and centroid are computed from
+-- the row as it is when locked, so concurrent replicas add to each other's
+-- updates instead of overwriting them with absolute values.
+
+create or replace function add_to_memory_clusters(
+    match_namespace text,
+    model text,
+    cluster_ids int[],
+    counts int[],
+    vector_sums text[]
+)
+returns void
+language plpgsql
+as $$
+declare
+    d record;
+    current_centroid real[];
+    current_size int;
+    total real[];
+    norm float;
+begin
+    -- Lock in id order so concurrent calls cannot deadlock
+    for d in
+        select u.id, u.n, u.vector_sum::vector::real[] as vector_sum
+        from unnest(cluster_ids, counts, vector_sums) as u(id, n, vector_sum)
+        order by u.id
+    loop
+        select c.centroid::real[], c.size into current_centroid, current_size
+        from memory_clusters c
+        where c.namespace = match_namespace and c.embedding_model = model and c.id = d.id
+        for update;
+        if not found then
+            continue;
+        end if;
+
+        -- Centroids are unit vectors: weight by size, add the new rows, renormalize
+        select array_agg(x * current_size + s order by i) into total
+        from unnest(current_centroid, d.vector_sum) with ordinality as v(x, s, i);
+        select sqrt(sum(t * t)) into norm from unnest(total) as t;
+
+        update memory_clusters c
+        set centroid = (
+                select array_agg(t / greatest(norm, 1e-12) order by k)
+                from unnest(total) with ordinality as w(t, k)
+            )::vector,
+            size = current_size + d.n,
+            updated_at = now()
+        where c.namespace = match_namespace and c.embedding_model = model and c.id = d.id;
+    end loop;
+end;
+$$;
+
+grant execute on function add_to_memory_clusters(text, text, int[], int[], text[]) to anon, authenticated, service_role;
+
+notify pgrst, 'reload schema';
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakeOpenAI, FakeSupabase  # noqa: E402
+from memory_core import config  # noqa: E402
+from memory_core.store import MemoryStore  # noqa: E402
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """A MemoryStore over the in-memory fakes, searching its local index"""
+    monkeypatch.setattr(config, "SEARCH_BACKEND", "local")
+    monkeypatch.setattr(config, "SHARED_INDEX_NAME", "")
+    monkeypatch.setattr(config, "SNAPSHOT_PATH", "")
+    monkeypatch.setattr(config, "EMBED_BATCH_MS", 0)
+    return MemoryStore(FakeSupabase(), FakeOpenAI())
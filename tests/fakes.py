@@ -0,0 +1,221 @@
+"""In-memory stand-ins for the Supabase and OpenAI clients used by MemoryStore."""
+import base64
+import itertools
+import threading
+import types
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from memory_core.codec import parse_vector, to_pgvector
+
+
+class _Result:
+    def __init__(self, data=None, count=None):
+        self.data = data
+        self.count = count
+
+
+class _Not:
+    def __init__(self, query):
+        self.query = query
+
+    def is_(self, column, value):
+        self.query.filters.append(lambda row: row.get(column) is not None)
+        return self.query
+
+
+class _Query:
+    """The subset of the PostgREST query builder the memory code uses"""
+
+    def __init__(self, db, table, fail=False, call=None):
+        self.db = db
+        self.table = table
+        self.fail = fail
+        self.call = call
+        self.op = None
+        self.filters = []
+        self.limit_to = None
+        self.order_by = None
+        self.bounds = None
+
+    @property
+    def not_(self):
+        return _Not(self)
+
+    def select(self, columns, count=None):
+        self.op = ("select", columns, count)
+        return self
+
+    def insert(self, rows):
+        self.op = ("insert", rows if isinstance(rows, list) else [rows])
+        return self
+
+    def upsert(self, rows, **kwargs):
+        self.op = ("upsert", rows if isinstance(rows, list) else [rows])
+        return self
+
+    def update(self, values):
+        self.op = ("update", values)
+        return self
+
+    def delete(self):
+        self.op = ("delete",)
+        return self
+
+    def limit(self, n):
+        self.limit_to = n
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by = (column, desc)
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def _filter(self, test):
+        self.filters.append(test)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(lambda row: row.get(column) == value)
+
+    def gt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] > value)
+
+    def lt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] < value)
+
+    def lte(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] <= value)
+
+    def is_(self, column, value):
+        return self._filter(lambda row: row.get(column) is None)
+
+    def contains(self, column, values):
+        return self._filter(lambda row: set(values) <= set(row.get(column) or []))
+
+    def in_(self, column, values):
+        values = set(values)
+        return self._filter(lambda row: row.get(column) in values)
+
+    def execute(self):
+        if self.fail:
+            raise Exception(f"function {self.table} does not exist")
+        with self.db.lock:
+            if self.call is not None:
+                return _Result(self.call())
+            return self._execute()
+
+    def _execute(self):
+        table = self.db.tables[self.table]
+        rows = [row for row in table if all(test(row) for test in self.filters)]
+        kind = self.op[0]
+        if kind in ("insert", "upsert"):
+            by_id = {row["id"]: row for row in table}
+            written = []
+            for row in self.op[1]:
+                if kind == "upsert" and row.get("id") in by_id:
+                    by_id[row["id"]].update(row)
+                    written.append(by_id[row["id"]])
+                else:
+                    row = dict(row)
+                    row.setdefault("id", next(self.db.ids))
+                    table.append(row)
+                    written.append(row)
+            return _Result([dict(row) for row in written])
+        if kind == "update":
+            for row in rows:
+                row.update(self.op[1])
+            return _Result([dict(row) for row in rows])
+        if kind == "delete":
+            self.db.tables[self.table] = [row for row in table if row not in rows]
+            return _Result(rows)
+        count = len(rows)
+        if self.order_by:
+            rows = sorted(rows, key=lambda row: row[self.order_by[0]], reverse=self.order_by[1])
+        if self.bounds:
+            rows = rows[self.bounds[0]:self.bounds[1] + 1]
+        if self.limit_to is not None:
+            rows = rows[:self.limit_to]
+        columns = self.op[1]
+        if columns != "*":
+            names = [name.strip() for name in columns.split(",")]
+            rows = [{name: row.get(name) for name in names} for row in rows]
+        return _Result(rows, count if self.op[2] else None)
+
+
+class FakeSupabase:
+    """Tables as lists of dicts; RPCs are the functions below, match_project_memory is missing"""
+
+    def __init__(self):
+        self.tables = defaultdict(list)
+        self.ids = itertools.count(1)
+        self.lock = threading.RLock()
+        self.calls = []
+
+    def table(self, name):
+        return _Query(self, name)
+
+    def rpc(self, name, params):
+        function = getattr(self, f"_rpc_{name}", None)
+        if function is None:
+            return _Query(self, name, fail=True)
+        self.calls.append(name)
+        return _Query(self, name, call=lambda: function(**params))
+
+    def _rows(self, ids):
+        ids = set(ids)
+        return [row for row in self.tables["project_memory"] if row["id"] in ids]
+
+    def _rpc_update_shadow_embeddings(self, row_ids, vectors, embedding_column="embedding_next"):
+        by_id = dict(zip(row_ids, vectors))
+        rows = [row for row in self._rows(row_ids) if row.get("deleted_at") is None]
+        for row in rows:
+            row[embedding_column] = by_id[row["id"]]
+        return len(rows)
+
+    def _rpc_tombstone_project_memory(self, row_ids, match_namespace=None):
+        rows = [row for row in self._rows(row_ids) if row.get("deleted_at") is None
+                and match_namespace in (None, row.get("namespace"))]
+        for row in rows:
+            row["deleted_at"] = datetime.now(timezone.utc).isoformat()
+        return [{"id": row["id"]} for row in rows]
+
+    def _rpc_add_to_memory_clusters(self, match_namespace, model, cluster_ids, counts, vector_sums):
+        for row in self.tables["memory_clusters"]:
+            if row["namespace"] != match_namespace or row["embedding_model"] != model or row["id"] not in cluster_ids:
+                continue
+            i = cluster_ids.index(row["id"])
+            total = parse_vector(row["centroid"]) * row["size"] + parse_vector(vector_sums[i])
+            row["centroid"] = to_pgvector(total / max(np.linalg.norm(total), 1e-12))
+            row["size"] += counts[i]
+
+
+class FakeOpenAI:
+    """Deterministic unit embeddings per (model, text); chat calls are recorded"""
+
+    def __init__(self, dim=1536):
+        self.dim = dim
+        self.chat_messages = []
+        self.embeddings = types.SimpleNamespace(create=self._embed)
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._chat))
+
+    def _embed(self, model, input, **kwargs):
+        data = []
+        for text in input:
+            vector = np.random.default_rng(abs(hash((model, text))) % 2**32).standard_normal(self.dim)
+            vector = (vector / np.linalg.norm(vector)).astype(np.float32)
+            data.append(types.SimpleNamespace(embedding=base64.b64encode(vector.tobytes()).decode()))
+        return types.SimpleNamespace(data=data)
+
+    def _chat(self, model, messages, **kwargs):
+        self.chat_messages.append(messages)
+        content = "A summary."
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))],
+            usage=types.SimpleNamespace(prompt_tokens=10, completion_tokens=3),
+        )
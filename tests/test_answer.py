@@ -0,0 +1,58 @@
+import threading
+import time
+
+from memory_core import session_scope
+
+
+def test_new_topic_is_answered_once_across_sessions(store):
+    store.bulk_add(["the depot opens at 6am", "fuel cards are renewed in March"])
+    chat = store.openai.chat.completions.create
+    calls = []
+
+    def slow_chat(**kwargs):
+        calls.append(kwargs)
+        time.sleep(0.2)
+        return chat(**kwargs)
+
+    store.openai.chat.completions.create = slow_chat
+    results = {}
+
+    def ask(session):
+        with session_scope(session):
+            results[session] = store.answer("when does the depot open?", threshold=-1.0, mode="generate")
+
+    threads = [threading.Thread(target=ask, args=(session,)) for session in ("a" * 32, "b" * 32)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results["a" * 32] is results["b" * 32]
+    for session in ("a" * 32, "b" * 32):
+        conversation = store.conversation(session)
+        assert len(conversation) == 1
+        assert conversation.ids is not None
+
+
+def test_follow_up_uses_its_own_conversation(store):
+    store.bulk_add(["the depot opens at 6am", "fuel cards are renewed in March"])
+    with session_scope("c" * 32):
+        store.answer("when does the depot open?", threshold=-1.0, mode="generate")
+        store.answer("and what about it on sundays?", threshold=-1.0, mode="generate")
+    prompt = store.openai.chat_messages[-1]
+    assert "when does the depot open?" in "".join(m["content"] for m in prompt)
+    assert len(store.conversation("c" * 32)) == 2
+
+
+def test_candidate_vectors_come_from_the_loaded_index(store, monkeypatch):
+    ids = [row["id"] for row in store.bulk_add(["the depot opens at 6am", "fuel cards are renewed in March"])]
+    store.ensure_local_index()
+    hits = store.search("when does the depot open?", threshold=-1.0, limit=5)
+    tables = []
+    monkeypatch.setattr(store.supabase, "table", lambda name: tables.append(name))
+    found, matrix = store._candidate_vectors(hits, store.embedding_state()["active_column"])
+    assert tables == []
+    assert sorted(found) == sorted(ids)
+    assert matrix.shape == (2, store.partition().index.dim)
@@ -0,0 +1,27 @@
+import io
+import json
+
+from memory_core import batch_qa
+
+
+def test_failed_question_gets_an_error_line(store, monkeypatch):
+    store.bulk_add(["the depot opens at 6am", "fuel cards are renewed in March"])
+    answer_from = store.answer_from
+
+    def flaky(question, memories, mode="auto"):
+        if "broken" in question:
+            raise RuntimeError("chat model unavailable")
+        return answer_from(question, memories, mode)
+
+    monkeypatch.setattr(store, "answer_from", flaky)
+    records = [{"question": "when does the depot open?"}, {"question": "broken question"},
+               {"question": "when are fuel cards renewed?", "ref": 3}]
+    output = io.StringIO()
+    summary = batch_qa.run(store, records, output, threshold=-1.0, limit=2, concurrency=2, mode="generate")
+
+    rows = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [row["question"] for row in rows] == [r["question"] for r in records]
+    assert rows[1]["error"] == "chat model unavailable"
+    assert rows[0]["answer"] == rows[2]["answer"] == "A summary."
+    assert rows[2]["ref"] == 3
+    assert summary["errors"] == 1 and summary["modes"] == {"generated": 2}
@@ -0,0 +1,53 @@
+import numpy as np
+
+from memory_core import clusters, namespace_scope
+from memory_core.index import LocalIndex, normalize
+
+
+def test_summarize_non_default_namespace(store):
+    store.bulk_add([f"default note {i}" for i in range(6)])
+    with namespace_scope("acme"):
+        store.bulk_add([f"acme note {i}" for i in range(6)])
+
+    clusters.build(store, 2, namespace="acme")
+    assert clusters.summarize(store, namespace="acme") == 2
+
+    prompts = [messages[-1]["content"] for messages in store.openai.chat_messages]
+    assert all("- acme note" in prompt for prompt in prompts)
+    assert not any("default note" in prompt for prompt in prompts)
+    rows = store.supabase.tables[clusters.TABLE]
+    assert {row["namespace"] for row in rows} == {"acme"}
+    assert all(row["summary"] == "A summary." for row in rows)
+
+
+def test_search_after_compaction_falls_back_to_flat_search():
+    rng = np.random.default_rng(0)
+    vectors = normalize(rng.standard_normal((40, 16), dtype=np.float32))
+    index = LocalIndex(16)
+    index.load_arrays(list(range(40)), vectors)
+    centroids = clusters.minibatch_kmeans(vectors, 4)
+    cluster_index = clusters.ClusterIndex("model", centroids, [10] * 4, [None] * 4)
+    cluster_index.attach(index)
+
+    # Compaction renumbers the rows the clusters were attached to
+    index.delete(list(range(20)))
+    index.compact()
+    assert not cluster_index.attached_to(index)
+
+    hits = cluster_index.search(vectors[30], 0.0, 3, 1, index)
+    assert hits[0]["id"] == 30
+    assert all(hit["id"] >= 20 for hit in hits)
+
+
+def test_concurrent_replicas_add_to_cluster_sizes(store):
+    store.bulk_add([f"note {i}" for i in range(8)])
+    built = clusters.build(store, 2)
+    model = built.model
+    replicas = [clusters.ClusterIndex.load(store.supabase, model) for _ in range(2)]
+    rng = np.random.default_rng(1)
+    for replica in replicas:
+        vectors = rng.standard_normal((3, built.centroids.shape[1]))
+        replica.save_added(store.supabase, replica.add([100, 101, 102], vectors))
+
+    stored = clusters.ClusterIndex.load(store.supabase, model)
+    assert stored.sizes.sum() == built.sizes.sum() + 6
@@ -0,0 +1,34 @@
+import sqlite3
+
+from memory_core.history import ChatHistory, HistoryLog, session_id
+
+
+def test_session_id_is_bound_to_its_namespace(tmp_path):
+    log = HistoryLog(str(tmp_path / "history.sqlite3"))
+    sid = session_id(None, "acme", log)
+    ChatHistory(sid, "acme", log).append("user", "acme question")
+
+    assert session_id(sid, "acme", log) == sid
+    other = session_id(sid, "globex", log)
+    assert other != sid
+    assert len(ChatHistory(other, "globex", log)) == 0
+    assert len(ChatHistory(sid, "globex", log)) == 0
+    assert [m.text for m in ChatHistory(sid, "acme", log).window(10)] == ["acme question"]
+
+
+def test_unscoped_log_moves_to_default_namespace(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE chat_messages (session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, "
+        "text TEXT NOT NULL, ts REAL NOT NULL, memory_ids TEXT, PRIMARY KEY (session_id, seq))"
+    )
+    sid = "a" * 32
+    conn.execute("INSERT INTO chat_messages VALUES (?, 0, 'user', 'old turn', 0, NULL)", (sid,))
+    conn.commit()
+    conn.close()
+
+    log = HistoryLog(path)
+    assert session_id(sid, "default", log) == sid
+    assert [m.text for m in ChatHistory(sid, "default", log).window(10)] == ["old turn"]
+    assert session_id(sid, "acme", log) != sid
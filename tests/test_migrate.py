@@ -0,0 +1,29 @@
+from memory_core import config, migrate
+from memory_core.generations import STATE_TABLE
+
+
+def test_run_skips_tombstoned_rows_and_never_reinserts_deleted_ones(store, tmp_path):
+    rows = store.supabase.tables[config.TABLE]
+    rows += [
+        {"id": 1, "content": "live", "deleted_at": None},
+        {"id": 2, "content": "tombstoned", "deleted_at": "2026-10-01T00:00:00+00:00"},
+        {"id": 3, "content": "hard deleted", "deleted_at": None},
+    ]
+    store.supabase.tables[STATE_TABLE].append(
+        {"id": 1, "active_column": "embedding", "active_model": "old-model", "shadow_model": "new-model"}
+    )
+
+    def embed(texts, model=None):
+        # Retention hard-deletes row 3 after the batch was read
+        store.supabase.tables[config.TABLE] = [row for row in rows if row["id"] != 3]
+        return [[0.0] * 4 for _ in texts]
+
+    store.embed = embed
+    assert migrate.run(store.supabase, store, checkpoint_path=str(tmp_path / "checkpoint.json")) == 2
+
+    by_id = {row["id"]: row for row in store.supabase.tables[config.TABLE]}
+    assert sorted(by_id) == [1, 2]
+    assert by_id[1]["embedding_next"]
+    assert "embedding_next" not in by_id[2]
+    # One bulk update for the single batch
+    assert store.supabase.calls == ["update_shadow_embeddings"]
@@ -0,0 +1,32 @@
+import pyarrow.parquet as pq
+
+from memory_core import config, retention
+from memory_core.codec import to_pgvector
+from memory_core.snapshot import restore_snapshot
+
+
+def test_archive_keeps_rows_without_a_valid_vector(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "EMBEDDING_DIM", 4)
+    table = store.supabase.tables[config.TABLE]
+    old = "2020-01-01T00:00:00+00:00"
+    table += [
+        {"id": 1, "content": "good", "namespace": "default", "deleted_at": old, "embedding": to_pgvector([1, 0, 0, 0])},
+        {"id": 2, "content": "no vector", "namespace": "default", "deleted_at": old, "embedding": None},
+        {"id": 3, "content": "wrong size", "namespace": "default", "deleted_at": old, "embedding": "[1,2]"},
+    ]
+    path, archived = retention.archive(store.supabase, directory=str(tmp_path), after_days=1)
+    assert archived == 3
+    assert store.supabase.tables[config.TABLE] == []
+    assert pq.read_table(path)["embedding"].null_count == 2
+
+    assert restore_snapshot(path, store.supabase) == 3
+    by_id = {row["id"]: row for row in store.supabase.tables[config.TABLE]}
+    assert by_id[1]["embedding"] and by_id[2]["embedding"] is None and by_id[3]["embedding"] is None
+
+
+def test_tombstone_is_stamped_by_the_database(store):
+    ids = [row["id"] for row in store.bulk_add(["one", "two"])]
+    assert retention.tombstone(store.supabase, ids + [999], namespace="other") == []
+    assert retention.tombstone(store.supabase, ids + [999]) == ids
+    assert retention.tombstone(store.supabase, ids) == []
+    assert store.supabase.calls.count("tombstone_project_memory") == 3
@@ -0,0 +1,70 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from memory_core import config, service
+
+
+@pytest.fixture
+def service_url(store, monkeypatch):
+    monkeypatch.setattr(config, "MEMORY_SERVICE_TOKEN", "s3cret")
+    monkeypatch.setattr(service, "get_store", lambda: store)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), service.MemoryRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def request(url, path, token=None, payload=None, headers=None):
+    headers = dict(headers or {})
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    data = None if payload is None else json.dumps(payload).encode()
+    req = urllib.request.Request(url + path, data=data, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_requests_without_the_service_token_are_rejected(service_url):
+    assert request(service_url, "/health")[0] == 200
+    assert request(service_url, "/stats")[0] == 401
+    assert request(service_url, "/stats", token="wrong")[0] == 401
+    assert request(service_url, "/add", payload={"content": "x"})[0] == 401
+    status, body = request(service_url, "/add", token="s3cret", payload={"content": "hello"})
+    assert status == 200
+    assert body["memory"]["content"] == "hello"
+
+
+def test_serve_refuses_to_start_without_a_token(monkeypatch):
+    monkeypatch.setattr(config, "MEMORY_SERVICE_TOKEN", "")
+    with pytest.raises(SystemExit):
+        service.serve(port=0)
+
+
+def namespace_of(store, memory):
+    return next(row["namespace"] for row in store.supabase.tables[config.TABLE] if row["id"] == memory["id"])
+
+
+def test_tokens_are_bound_to_their_namespace(store, service_url, monkeypatch):
+    monkeypatch.setattr(config, "MEMORY_SERVICE_TOKENS", '{"acme-token": "acme", "ui-token": "*"}')
+    status, body = request(service_url, "/add", token="acme-token", payload={"content": "acme note"})
+    assert status == 200
+    assert namespace_of(store, body["memory"]) == "acme"
+    status, _ = request(service_url, "/search", token="acme-token", payload={"query": "note"},
+                        headers={"X-Memory-Namespace": "other"})
+    assert status == 403
+    status, body = request(service_url, "/add", token="ui-token", payload={"content": "other note"},
+                           headers={"X-Memory-Namespace": "other"})
+    assert status == 200
+    assert namespace_of(store, body["memory"]) == "other"
+    # The single shared token only opens the default namespace
+    status, _ = request(service_url, "/stats", token="s3cret", headers={"X-Memory-Namespace": "acme"})
+    assert status == 403
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pytest
+
+from memory_core.index import normalize
+from memory_core.shared_index import SharedIndexReader, publish, unpublish
+
+
+@pytest.fixture
+def name():
+    name = f"memtest_{os.getpid()}"
+    yield name
+    unpublish(name)
+
+
+def test_search_skips_published_and_deleted_tombstones(name):
+    vectors = normalize(np.random.default_rng(0).standard_normal((20, 8), dtype=np.float32))
+    publish(name, list(range(20)), vectors, normalized=True, tombstones=[3])
+    reader = SharedIndexReader(name)
+    assert reader.attach()
+
+    hits = reader.search(vectors[3], -1.0, 19)
+    assert len(hits) == 19
+    assert 3 not in {hit["id"] for hit in hits}
+
+    reader.delete([5, 7])
+    hits = reader.search(vectors[5], -1.0, 5)
+    assert len(hits) == 5
+    assert not {3, 5, 7} & {hit["id"] for hit in hits}
+
+    # A generation published without row 5 no longer needs to skip it
+    keep = [i for i in range(20) if i != 5]
+    publish(name, keep, vectors[keep], normalized=True)
+    reader.search(vectors[0], -1.0, 1)
+    assert reader.tombstones == {7}
+
+
+def test_reader_sees_its_own_writes_before_the_next_publish(store, name, monkeypatch):
+    from memory_core import config
+    from memory_core.shared_index import publish_store
+
+    monkeypatch.setattr(config, "SHARED_INDEX_NAME", name)
+    store.bulk_add(["the depot opens at 6am"])
+    publish_store(name, store)
+    reader = store.ensure_index()
+    assert isinstance(reader, SharedIndexReader)
+
+    added = store.add("fuel cards are renewed in March")
+    assert [m["id"] for m in store.search("fuel cards are renewed in March", -1.0, 1)] == [added["id"]]
+
+    # Once a generation holds the row it is no longer kept privately
+    publish_store(name, store)
+    reader.search(np.zeros(config.EMBEDDING_DIM, dtype=np.float32), -1.0, 1)
+    assert len(reader._local) == 0
+    assert len(reader) == 2
@@ -0,0 +1,44 @@
+import numpy as np
+import pyarrow.parquet as pq
+
+from memory_core import config
+from memory_core.codec import to_pgvector
+from memory_core.snapshot import export_snapshot, read_snapshot, restore_snapshot
+
+
+def _rows(dim, count):
+    rng = np.random.default_rng(0)
+    return [
+        {"id": i + 1, "content": f"note {i}", "created_at": "2026-10-01T00:00:00+00:00", "namespace": "acme",
+         "tags": ["ops"] if i % 2 else [], "source": "import", "deleted_at": None,
+         "embedding": to_pgvector(rng.standard_normal(dim), 9)}
+        for i in range(count)
+    ]
+
+
+def test_restore_keeps_every_exported_column(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "EMBEDDING_DIM", 8)
+    table = store.supabase.tables[config.TABLE]
+    table += _rows(8, 5)
+    path = str(tmp_path / "acme.parquet")
+    assert export_snapshot(path, store.supabase, page_size=2, namespace="acme") == 5
+
+    expected = {row["id"]: dict(row) for row in table}
+    table.clear()
+    assert restore_snapshot(path, store.supabase) == 5
+    for row in store.supabase.tables[config.TABLE]:
+        for key in ("content", "created_at", "namespace", "tags", "source"):
+            assert row[key] == expected[row["id"]][key]
+
+
+def test_read_snapshot_joins_row_groups(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "EMBEDDING_DIM", 8)
+    store.supabase.tables[config.TABLE] += _rows(8, 5)
+    path = str(tmp_path / "acme.parquet")
+    export_snapshot(path, store.supabase, page_size=2, namespace="acme")
+    assert pq.ParquetFile(path).num_row_groups == 3
+
+    ids, contents, matrix = read_snapshot(path)
+    assert ids.tolist() == [1, 2, 3, 4, 5]
+    assert contents[4] == "note 4"
+    assert matrix.shape == (5, 8) and matrix.flags["C_CONTIGUOUS"]
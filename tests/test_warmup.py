@@ -0,0 +1,34 @@
+import pytest
+
+from memory_core import warmup
+
+
+@pytest.fixture
+def fresh_warmup(monkeypatch):
+    monkeypatch.setattr(warmup, "_ready", type(warmup._ready)())
+    monkeypatch.setattr(warmup, "_finished", type(warmup._finished)())
+    monkeypatch.setattr(warmup, "_thread", None)
+    monkeypatch.setattr(warmup, "_status", {"ready": False, "started_at": None, "seconds": None,
+                                            "steps": {}, "errors": {}, "check": None})
+
+
+def test_failed_step_leaves_warmup_degraded(store, monkeypatch, fresh_warmup):
+    def fail():
+        raise RuntimeError("openai down")
+
+    monkeypatch.setattr(store, "embed_query", lambda text: fail())
+    warmup.start(store)
+    assert warmup.wait(5) is False
+    status = warmup.status()
+    assert status["ready"] is False
+    assert status["degraded"] is True
+    assert "embedding" in status["errors"]
+
+
+def test_successful_warmup_is_ready(store, fresh_warmup):
+    warmup.start(store)
+    assert warmup.wait(5) is True
+    status = warmup.status()
+    assert status["degraded"] is False
+    # The fake Supabase has no match_project_memory function
+    assert status["check"]["rpc"] is False